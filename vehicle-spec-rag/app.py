@@ -1,61 +1,331 @@
 
+import math
 import os
+import time
 import uvicorn
 import json
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import shutil
+import threading
+import anyio.to_thread
 
-from vectorstore.chroma_db import ChromaDBService
+from vectorstore.base import create_vector_store
 from vectorstore.embeddings import EmbeddingService
 from vectorstore.retriever import Retriever
+from vectorstore.micro_batcher import MicroBatcher
+from vectorstore.bm25_index import BM25Index
+from vectorstore.reranker import RerankerService
+from vectorstore.spec_index import SpecIndex
+from vectorstore.aliases import CollectionAliases
+from pdf_processing.spec_extractor import SpecExtractor
 from services.ingestion import IngestionService
+from pdf_processing.chunker import TextChunker
+from services.jobs import IngestionJobManager, JobQueueFullError
+from services.answer_cache import AnswerCache
+from services.query_service import QueryService
+from services.admission import AdmissionController, AdmissionRejectedError
+from services.startup import StartupTracker
+from services.metrics import (REGISTRY, HTTP_REQUESTS, HTTP_REQUEST_SECONDS, SERVICE_READY,
+                              collect_request_spans, observe, server_timing_header)
 from llm.gemini_client import GeminiClient
-from llm.prompt_formatter import prompt_formatter_gemini
+from llm.fake_client import FakeLLMClient
+from llm.hedged_client import HedgedLLMClient
+from llm.errors import LLMError, LLMTimeoutError
+from llm.prompt_formatter import PromptBuilder
+from config import settings
 
 # --- Configuration ---
 HOST = "0.0.0.0"
 PORT = 3000
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CHROMA_DB_PATH = os.path.join(BASE_DIR, "data", "chroma_store")
+CHROMA_DB_PATH = settings.CHROMA_DB_PATH
+NUMPY_STORE_PATH = settings.NUMPY_STORE_PATH
+LEXICAL_INDEX_PATH = settings.LEXICAL_INDEX_PATH
+SPEC_INDEX_PATH = settings.SPEC_INDEX_PATH
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 
 # --- Global Services ---
 # Initialize globally to reuse across requests
 services = {}
 
+# Imported up front on the loader thread so /readyz can report what each one costs
+HEAVY_MODULES = ["torch", "sentence_transformers", "spacy.lang.en", "pymupdf"]
+WARMUP_QUERY = "Torque for brake caliper bolts"
+
+startup = StartupTracker()
+
+def _load_services(tracker: StartupTracker):
+    """
+    Builds every service on a background thread. Each service is published to
+    `services` as soon as it exists; readiness waits for all of them and the warm-up.
+    """
+    try:
+        with tracker.step("imports"):
+            optional = (["chromadb"] if settings.VECTOR_STORE_BACKEND == "chroma" else []) + (
+                ["google.generativeai"] if settings.LLM_BACKEND == "gemini" else [])
+            for module in HEAVY_MODULES + optional:
+                tracker.import_module(module)
+
+        with tracker.step("embedder"):
+            services["embedder"] = EmbeddingService(
+                cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                cache_max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                backend=settings.EMBEDDING_BACKEND,
+                num_threads=settings.EMBEDDING_NUM_THREADS,
+                min_cosine=settings.EMBEDDING_MIN_COSINE,
+                onnx_file_name=settings.EMBEDDING_ONNX_FILE or None
+            )
+        with tracker.step("vector_store"):
+            if settings.VECTOR_STORE_BACKEND == "numpy":
+                services["vector_store"] = create_vector_store(
+                    "numpy",
+                    NUMPY_STORE_PATH,
+                    quantization=settings.VECTOR_QUANTIZATION,
+                    rescore_multiplier=settings.VECTOR_RESCORE_MULTIPLIER,
+                    rescore_dtype=settings.VECTOR_RESCORE_DTYPE
+                )
+            else:
+                services["vector_store"] = create_vector_store(settings.VECTOR_STORE_BACKEND, CHROMA_DB_PATH)
+        with tracker.step("indexes"):
+            services["aliases"] = CollectionAliases(settings.COLLECTION_ALIASES_PATH)
+            live = services["aliases"].resolve("vehicle_manuals")
+            if settings.RETRIEVAL_MODE == "hybrid":
+                services["lexical_index"] = BM25Index(LEXICAL_INDEX_PATH, max_df=settings.LEXICAL_MAX_DF)
+                # Bootstrap from chunks indexed before the lexical index existed
+                if services["lexical_index"].count(live) != services["vector_store"].count(live):
+                    services["lexical_index"].rebuild_from(services["vector_store"], live)
+            if settings.SPEC_INDEX_ENABLED:
+                services["spec_index"] = SpecIndex(SPEC_INDEX_PATH, min_confidence=settings.SPEC_INDEX_MIN_CONFIDENCE)
+                # Bootstrap from chunks indexed before the spec index existed
+                if not services["spec_index"].exists(live) and services["vector_store"].count(live):
+                    services["spec_index"].rebuild_from(services["vector_store"], SpecExtractor(), live)
+        if settings.QUERY_MICRO_BATCHING:
+            services["query_batcher"] = MicroBatcher(
+                services["embedder"].encode_queries,
+                max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+                max_wait_ms=settings.QUERY_BATCH_MAX_WAIT_MS
+            )
+        services["retriever"] = Retriever(
+            services["vector_store"],
+            services["embedder"],
+            query_cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            batcher=services.get("query_batcher"),
+            lexical_index=services.get("lexical_index"),
+            mode=settings.RETRIEVAL_MODE,
+            rrf_k=settings.RRF_K,
+            candidates=settings.HYBRID_CANDIDATES,
+            aliases=services["aliases"]
+        )
+        with tracker.step("ingestion"):
+            services["ingestion"] = IngestionService(
+                services["vector_store"],
+                services["embedder"],
+                embed_batch_size=settings.INGESTION_EMBED_BATCH_SIZE,
+                queue_size=settings.INGESTION_QUEUE_SIZE,
+                chunker=TextChunker(batch_size=settings.CHUNKER_BATCH_SIZE, n_process=settings.CHUNKER_N_PROCESS),
+                lexical_index=services.get("lexical_index"),
+                spec_index=services.get("spec_index"),
+                aliases=services["aliases"]
+            )
+            # Versions retired by earlier rebuilds (here or in another process) are dropped once unused
+            services["aliases"].on_drop = services["ingestion"].drop_collection
+            services["aliases"].collect_garbage()
+            services["jobs"] = IngestionJobManager(
+                services["ingestion"],
+                max_workers=settings.INGESTION_WORKERS,
+                max_pending=settings.INGESTION_MAX_PENDING
+            )
+        with tracker.step("llm_client"):
+            llm_timeout = _llm_timeout()
+            client = _build_llm_client(settings.LLM_BACKEND, llm_timeout)
+            hedge_client = None
+            if settings.LLM_HEDGE_BACKEND and settings.LLM_HEDGE_BACKEND != settings.LLM_BACKEND:
+                hedge_client = _build_llm_client(settings.LLM_HEDGE_BACKEND, llm_timeout)
+            services["llm_client"] = HedgedLLMClient(
+                client,
+                hedge_client=hedge_client,
+                hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+                hedge_after_ms=settings.LLM_HEDGE_AFTER_MS,
+                min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+                hedging=settings.LLM_HEDGING,
+                # Primary + hedge per admitted call; a slot is held until both finish, so calls never queue
+                max_workers=2 * settings.LLM_MAX_CONCURRENCY
+            )
+        services["answer_cache"] = AnswerCache(
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ANSWER_CACHE_MAX_BYTES
+        )
+        if settings.RERANK_ENABLED:
+            with tracker.step("reranker"):
+                services["reranker"] = RerankerService(
+                    model_name=settings.RERANK_MODEL,
+                    budget_ms=settings.RERANK_BUDGET_MS
+                )
+        if settings.ADMISSION_CONTROL:
+            limits = _admission_limits()
+            services["admission"] = {
+                stage: AdmissionController(stage, max_concurrency, max_queue,
+                                           queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                                           retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS)
+                for stage, (max_concurrency, max_queue) in limits.items()
+            }
+        services["query_service"] = QueryService(
+            services["retriever"],
+            services["llm_client"],
+            answer_cache=services["answer_cache"],
+            reranker=services.get("reranker"),
+            rerank_candidates=settings.RERANK_CANDIDATES,
+            rerank_top_n=settings.RERANK_TOP_N,
+            spec_index=services.get("spec_index"),
+            prompt_builder=PromptBuilder(
+                token_budget=settings.PROMPT_TOKEN_BUDGET,
+                num_examples=settings.PROMPT_FEW_SHOT_EXAMPLES,
+                max_sentences_per_chunk=settings.PROMPT_MAX_SENTENCES_PER_CHUNK,
+                dedup_threshold=settings.PROMPT_DEDUP_THRESHOLD
+            ),
+            admission=services.get("admission"),
+            llm_timeout=llm_timeout,
+            extractive_fallback=settings.LLM_EXTRACTIVE_FALLBACK
+        )
+
+        if settings.STARTUP_WARMUP:
+            with tracker.step("warmup"):
+                _warm_up()
+        tracker.mark_ready()
+    except Exception as e:
+        # Services built so far stay usable (e.g. uploads without a Gemini key); /readyz reports the failure
+        tracker.mark_failed(e)
+
+def _llm_timeout() -> float:
+    """LLM_TIMEOUT_SECONDS, capped at the request deadline so no LLM call outlives its request."""
+    request_deadline = settings.REQUEST_DEADLINE_MS / 1000.0
+    if settings.LLM_TIMEOUT_SECONDS > request_deadline:
+        print(f"[WARN] LLM_TIMEOUT_SECONDS ({settings.LLM_TIMEOUT_SECONDS:g}) exceeds REQUEST_DEADLINE_MS "
+              f"({settings.REQUEST_DEADLINE_MS:g}); capping LLM calls at {request_deadline:g}s.")
+        return request_deadline
+    return settings.LLM_TIMEOUT_SECONDS
+
+def _admission_limits() -> dict[str, tuple[int, int]]:
+    """
+    (max concurrency, max queue) per admission stage, checked against API_WORKER_THREADS: a /query
+    holds a worker thread while queued, so a stage whose concurrency + queue reaches the pool size
+    would never fill its queue. Larger values are capped, leaving a thread for other requests.
+    """
+    limits = {"embedding": (settings.EMBEDDING_MAX_CONCURRENCY, settings.EMBEDDING_MAX_QUEUE),
+              "search": (settings.SEARCH_MAX_CONCURRENCY, settings.SEARCH_MAX_QUEUE),
+              "llm": (settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE)}
+    threads = settings.API_WORKER_THREADS
+    for stage, (max_concurrency, max_queue) in limits.items():
+        if max_concurrency + max_queue < threads:
+            continue
+        capped_concurrency = min(max_concurrency, threads - 1)
+        capped_queue = max(threads - 1 - capped_concurrency, 0)
+        print(f"[WARN] {stage} admission limits ({max_concurrency} running + {max_queue} queued) reach "
+              f"API_WORKER_THREADS ({threads}); capping at {capped_concurrency} + {capped_queue}.")
+        limits[stage] = (capped_concurrency, capped_queue)
+    return limits
+
+def _build_llm_client(backend: str, timeout: float):
+    """Creates the LLM client for a backend name ('gemini' or 'fake')."""
+    if backend == "fake":
+        return FakeLLMClient(latency_ms=settings.FAKE_LLM_LATENCY_MS,
+                             tail_latency_ms=settings.FAKE_LLM_TAIL_LATENCY_MS,
+                             tail_probability=settings.FAKE_LLM_TAIL_PROBABILITY,
+                             error_rate=settings.FAKE_LLM_ERROR_RATE)
+    return GeminiClient(timeout=timeout)
+
+def _warm_up():
+    """Runs one synthetic query through the models so the first real request is not the slow one."""
+    retriever: Retriever = services["retriever"]
+    # Direct encode (not the query cache) so the model itself is exercised
+    embedding = services["embedder"].encode_queries([WARMUP_QUERY])[0].tolist()
+    if services["vector_store"].count(services["aliases"].resolve("vehicle_manuals")):
+        items = retriever.search(WARMUP_QUERY, embedding, k=1)
+        if "reranker" in services and items:
+            services["reranker"].rerank(WARMUP_QUERY, items, top_n=1)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize services on startup."""
+    """Starts serving immediately and loads the services on a background thread."""
+    global startup
     print("[INFO] Starting up API...")
-    try:
-        services["embedder"] = EmbeddingService()
-        services["chroma"] = ChromaDBService(persist_directory=CHROMA_DB_PATH)
-        services["retriever"] = Retriever(services["chroma"], services["embedder"])
-        services["ingestion"] = IngestionService(services["chroma"], services["embedder"])
-        services["llm_client"] = GeminiClient()
-        print("[INFO] Services initialized successfully.")
-    except Exception as e:
-        print(f"[ERROR] Failed to initialize services: {e}")
-        # raise e 
-        # Don't raise in dev to allow server to start partially if needed, 
-        # but for this assignment, better to see error. 
-        # Actually, if we raise, uvicorn might keep restarting. 
-        # Printing error is enough for now. The endpoint checks for services.
-    
+    startup = StartupTracker()
+    # The pool sync endpoints (/query) run on; admission limits are sized against it
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.API_WORKER_THREADS
+    loader = threading.Thread(target=_load_services, args=(startup,), name="service-loader", daemon=True)
+    loader.start()
+
     yield
-    
+
     print("[INFO] Shutting down API...")
+    if "jobs" in services:
+        services["jobs"].shutdown()
+    if "query_batcher" in services:
+        services["query_batcher"].close()
+    if "reranker" in services:
+        services["reranker"].shutdown()
     services.clear()
 
+def _require(name: str):
+    """
+    Returns a service, or raises 503 (with Retry-After) while services are still
+    loading and 500 if startup failed before the service was built.
+    """
+    if name in services:
+        return services[name]
+    if startup.state == "starting":
+        raise HTTPException(status_code=503, detail="Service is starting up; models are still loading.",
+                            headers={"Retry-After": str(settings.STARTUP_RETRY_AFTER_SECONDS)})
+    raise HTTPException(status_code=500, detail=f"Service '{name}' failed to initialize: {startup.error}")
+
+def _overloaded(e: AdmissionRejectedError) -> HTTPException:
+    """429 when a stage's queue is full, 503 when the wait for a slot timed out; both with Retry-After."""
+    return HTTPException(status_code=429 if e.reason == "queue_full" else 503, detail=str(e),
+                         headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+def _request_deadline(deadline_ms: float | None) -> float:
+    """The request's absolute deadline (time.monotonic()): the client's budget, capped at REQUEST_DEADLINE_MS."""
+    budget_ms = settings.REQUEST_DEADLINE_MS
+    if deadline_ms is not None:
+        budget_ms = min(max(deadline_ms, 0), budget_ms)
+    return time.monotonic() + budget_ms / 1000.0
+
+def _llm_failed(e: LLMError) -> HTTPException:
+    """504 when the LLM missed the deadline, 502 when it failed (only reached with the extractive fallback off)."""
+    return HTTPException(status_code=504 if isinstance(e, LLMTimeoutError) else 502, detail=str(e))
+
 app = FastAPI(title="Vehicle Spec RAG API", lifespan=lifespan)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Counts and times every request; optionally returns its per-stage breakdown as Server-Timing."""
+    spans = collect_request_spans()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        seconds = time.perf_counter() - start
+        # Label by route template (/jobs/{job_id}), not the raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        HTTP_REQUEST_SECONDS.observe(seconds, method=request.method, route=route_path)
+    if settings.METRICS_SERVER_TIMING and spans:
+        response.headers["Server-Timing"] = server_timing_header(spans, seconds)
+    return response
+
 # --- Data Models ---
 class QueryRequest(BaseModel):
     query: str
@@ -63,6 +333,26 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     query: str
     answer: dict | list 
+    # Which path produced the answer: 'spec_index', 'answer_cache', 'rag' or 'extractive_fallback'
+    answered_by: str = "rag"
+    # Set for 'extractive_fallback': 'deadline' or 'llm_error'
+    fallback_reason: str | None = None
+
+class BatchQueryRequest(BaseModel):
+    queries: list[str]
+
+class BatchQueryItem(BaseModel):
+    query: str
+    status: str
+    answer: dict | list | None = None
+    error: str | None = None
+    path: str
+    cache: str
+    fallback_reason: str | None = None
+    prompt_tokens: int | None = None
+
+class BatchQueryResponse(BaseModel):
+    results: list[BatchQueryItem]
 
 # --- Endpoints ---
 
@@ -70,82 +360,246 @@ class QueryResponse(BaseModel):
 async def read_root():
     return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving, whether or not the models have loaded."""
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms, request and query counters."""
+    SERVICE_READY.set(1 if startup.ready else 0)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once every service is built and warmed up, 503 while loading
+    or after a failed startup. The body has per-module import and per-step timings.
+    """
+    state = startup.to_dict()
+    if startup.ready:
+        return state
+    return JSONResponse(status_code=503, content=state,
+                        headers={"Retry-After": str(settings.STARTUP_RETRY_AFTER_SECONDS)})
+
 @app.post("/query", response_model=QueryResponse)
-def query_specs(request: QueryRequest):
-    if not services:
-        raise HTTPException(status_code=500, detail="Services not initialized.")
-    if "llm_client" not in services:
-         raise HTTPException(status_code=500, detail="LLM Client failed to initialize.")
+def query_specs(request: QueryRequest, response: Response,
+                deadline_ms: float | None = Header(default=None, alias="X-Request-Deadline-Ms")):
+    query_service: QueryService = _require("query_service")
+    deadline = _request_deadline(deadline_ms)
 
     query_text = request.query
     print(f"[API] Received query: {query_text}")
     
     try:
-        # 1. Retrieve Context
-        retriever: Retriever = services["retriever"]
-        context_docs = retriever.retrieve(query_text, k=5)
-        
-        # Build context items dict
-        context_items = [{"sentence_chunk": doc} for doc in context_docs]
-        
-        # 2. Format Prompt
-        prompt = prompt_formatter_gemini(query_text, context_items)
-        
-        # 3. Generate Answer
-        llm_client: GeminiClient = services["llm_client"]
-        raw_response = llm_client.generate_content(prompt)
-        
-        # 4. Parse JSON
-        clean_response = raw_response.strip()
-        if clean_response.startswith("```json"):
-            clean_response = clean_response[7:]
-        if clean_response.startswith("```"):
-            clean_response = clean_response[3:]
-        if clean_response.endswith("```"):
-            clean_response = clean_response[:-3]
-        
-        clean_response = clean_response.strip()
-        
-        try:
-            answer_json = json.loads(clean_response)
-        except json.JSONDecodeError:
-            print(f"[ERROR] Failed to parse JSON: {clean_response}")
-            answer_json = {
-                "error": "Model response was not valid JSON", 
-                "raw_response": clean_response
-            }
+        result = query_service.answer(query_text, deadline)
+
+        response.headers["X-Cache"] = result["cache"]
+        response.headers["X-Answer-Path"] = result["path"]
+        if result["fallback_reason"]:
+            response.headers["X-Fallback-Reason"] = result["fallback_reason"]
+        if result["prompt_stats"]:
+            response.headers["X-Prompt-Tokens"] = str(result["prompt_stats"]["prompt_tokens"])
+        if result["similarity"] is not None:
+            response.headers["X-Cache-Similarity"] = f"{result['similarity']:.4f}"
+        if result["rerank"]:
+            response.headers["X-Rerank-Ms"] = f"{result['rerank']['ms']:.1f}"
+            response.headers["X-Rerank-Applied"] = str(result["rerank"]["applied"]).lower()
 
-        return QueryResponse(query=query_text, answer=answer_json)
+        return QueryResponse(query=query_text, answer=result["answer"], answered_by=result["path"],
+                             fallback_reason=result["fallback_reason"])
 
+    except AdmissionRejectedError as e:
+        print(f"[WARN] Rejected query: {e}")
+        raise _overloaded(e)
+    except LLMError as e:
+        print(f"[ERROR] LLM call failed: {e}")
+        raise _llm_failed(e)
     except Exception as e:
         print(f"[ERROR] Processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/upload")
-async def upload_manual(file: UploadFile = File(...)):
-    if not services:
-        raise HTTPException(status_code=500, detail="Services not initialized.")
-    
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_specs_batch(request: BatchQueryRequest,
+                            deadline_ms: float | None = Header(default=None, alias="X-Request-Deadline-Ms")):
+    """
+    Answers many queries in one request: one embedding call, one multi-vector search,
+    then concurrent LLM calls. Results keep the input order; failures are reported per item.
+    """
+    query_service: QueryService = _require("query_service")
+    deadline = _request_deadline(deadline_ms)
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries given.")
+    if len(request.queries) > settings.BATCH_QUERY_MAX_ITEMS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {settings.BATCH_QUERY_MAX_ITEMS} queries per batch.")
+
+    print(f"[API] Received batch of {len(request.queries)} queries")
+    try:
+        results = await query_service.answer_many_async(
+            request.queries,
+            max_concurrency=settings.BATCH_QUERY_LLM_CONCURRENCY,
+            deadline=deadline
+        )
+        return BatchQueryResponse(results=[BatchQueryItem(**item) for item in results])
+
+    except AdmissionRejectedError as e:
+        print(f"[WARN] Rejected batch query: {e}")
+        raise _overloaded(e)
+    except Exception as e:
+        print(f"[ERROR] Processing batch query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query/stream")
+async def query_specs_stream(request: QueryRequest,
+                             deadline_ms: float | None = Header(default=None, alias="X-Request-Deadline-Ms")):
+    """
+    Streams the answer as Server-Sent Events:
+    'context' (retrieved chunk metadata) right away, then 'token' events as the
+    LLM generates, then 'answer' with the parsed JSON (or 'error'). If the LLM
+    fails or misses the deadline, 'answer' carries the extractive fallback
+    ('path' and 'fallback_reason' say so) and the tokens sent so far should be discarded.
+    """
+    query_service: QueryService = _require("query_service")
+    deadline = _request_deadline(deadline_ms)
+
+    query_text = request.query
+    print(f"[API] Received streaming query: {query_text}")
+
+    try:
+        # Embedding and vector search are synchronous; keep them off the event loop
+        prepared = await run_in_threadpool(query_service.prepare, query_text)
+        # Turn the request away with a status code while that is still possible
+        if prepared["path"] == "rag":
+            query_service.check_admission("llm")
+    except AdmissionRejectedError as e:
+        print(f"[WARN] Rejected streaming query: {e}")
+        raise _overloaded(e)
+    except Exception as e:
+        print(f"[ERROR] Processing query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        yield _sse("context", {"query": query_text, "path": prepared["path"], "cache": prepared["cache"],
+                               "rerank": prepared["rerank"], "prompt_stats": prepared["prompt_stats"],
+                               "sources": QueryService.context_metadata(prepared)})
+        if prepared["path"] != "rag":
+            yield _sse("answer", {"query": query_text, "answer": prepared["answer"]})
+            return
+
+        parts = []
+        start = time.perf_counter()
+        try:
+            async for text in query_service.stream_llm(prepared["prompt"], deadline):
+                if not parts:
+                    observe("llm_first_token", time.perf_counter() - start)
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except AdmissionRejectedError as e:
+            yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
+            return
+        except LLMError as e:
+            print(f"[ERROR] Streaming from the LLM: {e}")
+            try:
+                result = query_service.fallback(prepared, e)
+            except LLMError:
+                yield _sse("error", {"detail": str(e)})
+                return
+            yield _sse("answer", {"query": query_text, "answer": result["answer"], "path": result["path"],
+                                  "fallback_reason": result["fallback_reason"]})
+            return
+        except Exception as e:
+            print(f"[ERROR] Streaming from the LLM: {e}")
+            yield _sse("error", {"detail": f"Error calling the LLM: {e}"})
+            return
+        observe("llm", time.perf_counter() - start)
+
+        result = query_service.finish(prepared, "".join(parts))
+        yield _sse("answer", {"query": query_text, "answer": result["answer"], "path": result["path"],
+                              "fallback_reason": result["fallback_reason"]})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Cache": prepared["cache"],
+        "X-Answer-Path": prepared["path"]
+    })
+
+def _save_upload(file: UploadFile, file_path: str):
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+@app.post("/upload", status_code=202)
+async def upload_manual(file: UploadFile = File(...), rebuild: bool = False):
+    """
+    Queues a manual for indexing. By default it is merged into the index incrementally;
+    with `?rebuild=true` the index is rebuilt from this manual alone in a shadow
+    collection and swapped in when complete, so queries are served throughout.
+    """
+    jobs: IngestionJobManager = _require("jobs")
+
+    try:
+        # Claim a queue slot before touching the disk, so a rejected upload writes nothing
+        job = jobs.reserve()
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(settings.INGESTION_RETRY_AFTER_SECONDS)})
+
+    # Each job gets its own directory: a re-upload of the same name cannot touch a file being
+    # ingested, and the basename (the manual's identity in the index) is unchanged
+    file_name = os.path.basename(file.filename)
+    upload_dir = os.path.join(settings.UPLOAD_DIR, job.job_id)
+    file_path = os.path.join(upload_dir, file_name)
     try:
-        # Save file temporarily
-        file_path = os.path.join(BASE_DIR, "data", file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        print(f"[API] Uploaded file: {file.filename}")
-        
-        # Trigger ingestion
-        ingestion: IngestionService = services["ingestion"]
-        num_chunks = ingestion.process_file(file_path)
-        
-        return JSONResponse(content={
-            "status": "success", 
-            "message": f"Successfully processed '{file.filename}'. Index rebuilt with {num_chunks} chunks."
-        })
-        
+        # Save file off the event loop; ingestion itself runs on the job queue
+        os.makedirs(upload_dir, exist_ok=True)
+        await run_in_threadpool(_save_upload, file, file_path)
     except Exception as e:
         print(f"[ERROR] Upload processing failed: {e}")
+        jobs.abandon(job, str(e))
+        shutil.rmtree(upload_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+    print(f"[API] Uploaded file: {file_name}")
+
+    # Queue ingestion and return immediately
+    jobs.start(job, file_path, cleanup_dir=upload_dir, incremental=not rebuild)
+
+    return JSONResponse(status_code=202, content={
+        "status": "queued",
+        "job_id": job.job_id,
+        "status_url": f"/jobs/{job.job_id}",
+        "message": f"Queued '{file_name}' for indexing."
+    })
+
+@app.get("/stats")
+async def get_stats():
+    embedder: EmbeddingService = _require("embedder")
+    retriever: Retriever = _require("retriever")
+    return {
+        "embedder": embedder.info(),
+        "embedding_cache": embedder.cache.stats() if embedder.cache else None,
+        "query_embedding_cache": retriever.query_cache.stats(),
+        "answer_cache": services["answer_cache"].stats() if "answer_cache" in services else None,
+        "query_batcher": retriever.batcher.stats() if retriever.batcher else None,
+        "reranker": services["reranker"].stats() if "reranker" in services else None,
+        "startup": startup.to_dict(),
+        "collections": services["aliases"].stats() if "aliases" in services else None,
+        "admission": {stage: controller.stats() for stage, controller in services.get("admission", {}).items()},
+        "llm": services["llm_client"].stats() if "llm_client" in services else None
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = _require("jobs").get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job.to_dict()
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host=HOST, port=PORT, reload=True)
@@ -0,0 +1,87 @@
+"""
+Benchmarks sentence splitting in TextChunker.
+
+Compares the previous implementation (one `nlp()` call per page, three passes
+and a pandas filter) against the batched single-pass `nlp.pipe` path on a
+synthetic manual, and reports pages/sec for each.
+
+Usage:
+    python benchmarks/bench_chunker.py --pages 1000 --n-process 1 2 4
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_processing.chunker import TextChunker
+
+COMPONENTS = ["brake caliper bolt", "lower ball joint nut", "tie-rod end nut", "wheel speed sensor bolt",
+              "stabilizer bar link nut", "shock absorber upper mount nut", "brake disc shield bolt"]
+
+def make_pages(num_pages: int, sentences_per_page: int = 40, seed: int = 0) -> list[dict]:
+    """Builds synthetic service-manual pages in the shape PDFTextExtractor returns."""
+    rng = random.Random(seed)
+    pages = []
+    for page_number in range(num_pages):
+        sentences = []
+        for _ in range(sentences_per_page):
+            component = rng.choice(COMPONENTS)
+            torque = rng.randint(10, 350)
+            sentences.append(f"Tighten the {component} to {torque} Nm using a calibrated torque wrench. "
+                             f"Inspect the {component} for damage before installation.")
+        text = " ".join(sentences)
+        pages.append({"page_number": page_number, "text": text})
+    return pages
+
+def legacy_chunk(chunker: TextChunker, pages_and_text: list[dict]) -> list[dict]:
+    """The pre-batching implementation: per-page nlp(), three passes, pandas filter."""
+    import pandas as pd
+
+    for item in pages_and_text:
+        item["sentences"] = [str(sentence) for sentence in chunker.nlp(item["text"]).sents]
+    for item in pages_and_text:
+        item["sentence_chunks"] = chunker._split_list(item["sentences"], chunker.sentence_chunk_size)
+    pages_and_chunks = []
+    for item in pages_and_text:
+        for sentence_chunk in item["sentence_chunks"]:
+            joined = "".join(sentence_chunk).replace("  ", " ").strip()
+            joined = re.sub(r'\.([A-Z])', r'. \1', joined)
+            pages_and_chunks.append({
+                "page_number": item["page_number"],
+                "sentence_chunk": joined,
+                "chunk_char_count": len(joined),
+                "chunk_word_count": len(joined.split(" ")),
+                "chunk_token_count": len(joined) / 4
+            })
+    df = pd.DataFrame(pages_and_chunks)
+    return df[df["chunk_token_count"] > chunker.min_token_length].to_dict(orient="records")
+
+def time_it(fn, pages: list[dict]) -> tuple[float, int]:
+    start = time.perf_counter()
+    chunks = fn(pages)
+    return time.perf_counter() - start, len(chunks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages)
+    print(f"[INFO] Benchmarking on {len(pages)} synthetic pages")
+
+    chunker = TextChunker()
+    seconds, num_chunks = time_it(lambda p: legacy_chunk(chunker, [dict(item) for item in p]), pages)
+    print(f"legacy              : {len(pages) / seconds:8.1f} pages/sec ({num_chunks} chunks, {seconds:.2f}s)")
+
+    for n_process in args.n_process:
+        chunker = TextChunker(batch_size=args.batch_size, n_process=n_process)
+        seconds, num_chunks = time_it(lambda p: list(chunker.iter_chunks(p)), pages)
+        print(f"nlp.pipe n_process={n_process}: {len(pages) / seconds:8.1f} pages/sec ({num_chunks} chunks, {seconds:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmarks the CPU embedding backends of EmbeddingService.
+
+For each backend (torch float32, dynamic int8, ONNX Runtime) encodes the same
+synthetic manual chunks and short queries on CPU and reports texts/sec, the
+speedup and the cosine agreement (min and mean over all texts, not just the
+startup validation set) relative to the first backend listed, torch by default.
+
+Usage:
+    python benchmarks/bench_embedding_backends.py --texts 2000 --threads 4 --backends torch int8 onnx
+    python benchmarks/bench_embedding_backends.py --onnx-file onnx/model_qint8_avx512_vnni.onnx
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.embeddings import EmbeddingService
+
+COMPONENTS = ["brake caliper bolt", "lower ball joint nut", "tie-rod end nut", "wheel speed sensor bolt",
+              "stabilizer bar link nut", "shock absorber upper mount nut", "oil drain plug", "spark plug"]
+
+def make_texts(num_texts: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    """Chunk-sized passages (about 10 sentences) and short queries."""
+    rng = random.Random(seed)
+    chunks, queries = [], []
+    for _ in range(num_texts):
+        sentences = []
+        for _ in range(10):
+            component = rng.choice(COMPONENTS)
+            sentences.append(rng.choice([f"Tighten the {component} to {rng.randint(10, 300)} N·m.",
+                                         f"Inspect the {component} for wear or damage.",
+                                         f"Remove the {component} and discard it."]))
+        chunks.append(" ".join(sentences))
+        queries.append(f"Torque for {rng.choice(COMPONENTS)}")
+    return chunks, queries
+
+def timed_encode(service: EmbeddingService, texts: list[str], batch_size: int) -> tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    embeddings = service.model.encode(texts, batch_size=batch_size, convert_to_tensor=False, show_progress_bar=False)
+    return np.asarray(embeddings), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads (0 = library default).")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--onnx-file", default=None)
+    args = parser.parse_args()
+
+    chunks, queries = make_texts(args.texts)
+    rows, reference = [], {}
+    for backend in args.backends:
+        # Threshold 0 so the benchmark always measures the requested backend
+        service = EmbeddingService(model_name=args.model, device="cpu", backend=backend, num_threads=args.threads,
+                                   min_cosine=0.0, onnx_file_name=args.onnx_file)
+        if service.backend != backend:
+            print(f"[WARN] Backend '{backend}' unavailable: {service.validation}")
+            continue
+        timed_encode(service, chunks[:args.batch_size], args.batch_size)  # warm-up
+        results = {}
+        for name, texts in (("chunks", chunks), ("queries", queries)):
+            embeddings, seconds = timed_encode(service, texts, args.batch_size)
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            reference.setdefault(name, embeddings)
+            cosines = np.sum(reference[name] * embeddings, axis=1)
+            results[name] = (len(texts) / seconds, float(cosines.min()), float(cosines.mean()))
+        rows.append((backend, results))
+        del service
+
+    baseline = {name: rate for name, (rate, _, _) in rows[0][1].items()} if rows else {}
+    print(f"\n{'backend':<10}{'texts':<9}{'texts/s':>10}{'speedup':>9}{'min cos':>10}{'mean cos':>10}")
+    for backend, results in rows:
+        for name, (rate, min_cos, mean_cos) in results.items():
+            print(f"{backend:<10}{name:<9}{rate:>10.1f}{rate / baseline[name]:>8.2f}x{min_cos:>10.4f}{mean_cos:>10.4f}")
+
+if __name__ == "__main__":
+    main()
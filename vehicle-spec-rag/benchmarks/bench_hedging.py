@@ -0,0 +1,73 @@
+"""
+Measures what request hedging does to LLM tail latency, offline: FakeLLMClient
+with a simulated long tail (a fraction of calls is much slower), called
+through HedgedLLMClient with hedging off and on. Reports latency percentiles,
+the share of calls that were hedged and how many missed the deadline (those
+would be answered by the extractive fallback).
+
+Usage:
+    python benchmarks/bench_hedging.py --requests 2000 --tail-probability 0.05 --tail-ms 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm.errors import LLMTimeoutError
+from llm.fake_client import FakeLLMClient
+from llm.hedged_client import HedgedLLMClient
+from llm.prompt_formatter import PromptBuilder
+
+async def run(client: HedgedLLMClient, prompt: str, num_requests: int, concurrency: int, deadline_s: float) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, missed = [], 0
+
+    async def one():
+        nonlocal missed
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.generate_content_async(prompt, time.monotonic() + deadline_s)
+            except LLMTimeoutError:
+                missed += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(num_requests)))
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "max": max(latencies),
+            "hedged": client.counts["hedged"] / num_requests, "missed": missed}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--tail-ms", type=float, default=2000)
+    parser.add_argument("--tail-probability", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    prompt, _ = PromptBuilder().build("Torque for lower ball joint nut", [
+        {"sentence_chunk": "Tighten the brake caliper bolts to 35 N·m. Tighten the lower ball joint nut to 175 N·m."}
+    ])
+    results = {}
+    for hedging in (False, True):
+        llm = FakeLLMClient(latency_ms=args.latency_ms, tail_latency_ms=args.tail_ms,
+                            tail_probability=args.tail_probability)
+        client = HedgedLLMClient(llm, hedge_percentile=args.percentile, hedge_after_ms=args.latency_ms * 4,
+                                 hedging=hedging)
+        results["hedged" if hedging else "single"] = asyncio.run(
+            run(client, prompt, args.requests, args.concurrency, args.deadline_ms / 1000))
+
+    print(f"\n{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'hedged':>9}{'missed':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['max']:>9.1f}"
+              f"{r['hedged']:>9.1%}{r['missed']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+End-to-end offline benchmark: ingestion, retrieval quality and query latency.
+
+Runs without network access:
+  - synthetic service-manual PDFs are generated with PyMuPDF, with the ten
+    torque specs from the prompt's few-shot examples planted on known pages
+    (the ground truth) among distractor specs and procedure text,
+  - FakeLLMClient stands in for Gemini,
+  - `--embedder hashing` (default) uses a deterministic feature-hashing
+    embedder; `--embedder mpnet` uses the real EmbeddingService if the model
+    is already in the local cache.
+
+Reports, as JSON (stdout and --output):
+  - ingestion pages/sec and chunks/sec per pipeline stage (busy time),
+  - retrieval recall@k and MRR for the ground-truth queries,
+  - QueryService.answer latency p50/p95/p99, throughput and answer accuracy
+    at each concurrency level (worker threads, like the sync /query endpoint),
+  - peak RSS.
+
+Usage:
+    python benchmarks/bench_offline.py --manuals 4 --pages 100 --concurrency 1 4 16 --output results.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from llm.fake_client import FakeLLMClient
+from llm.prompt_formatter import FEW_SHOT_EXAMPLES, PromptBuilder
+from pdf_processing.chunker import TextChunker
+from services.ingestion import IngestionService
+from services.query_service import QueryService
+from vectorstore.base import create_vector_store
+from vectorstore.bm25_index import BM25Index
+from vectorstore.micro_batcher import MicroBatcher
+from vectorstore.retriever import Retriever
+from vectorstore.spec_index import SpecIndex
+
+DISTRACTORS = ["oil drain plug", "spark plug", "wheel lug nut", "camshaft sprocket bolt", "crankshaft pulley bolt",
+               "cylinder head bolt", "exhaust manifold nut", "intake manifold bolt", "oil pan bolt",
+               "transmission mount bolt", "engine mount nut", "radiator support bolt", "steering gear bolt",
+               "rear axle nut", "brake master cylinder nut", "fuel rail bolt", "thermostat housing bolt",
+               "water pump bolt", "timing chain tensioner bolt", "flywheel bolt"]
+PROCEDURE = ["Raise and support the vehicle.", "Remove the wheel and tire assembly.",
+             "Disconnect the negative battery cable.", "Inspect the {c} for wear, corrosion or damage.",
+             "Clean the threads of the {c} before installation.", "Replace the {c} if it is damaged.",
+             "Apply threadlocker to the {c} threads.", "Install a new {c} whenever it is removed.",
+             "Refer to the illustration for the location of the {c}.", "Lower the vehicle."]
+
+# --- Synthetic manuals ---
+
+def spec_sentence(component: str, value: int) -> str:
+    return f"Tighten the {component} to {value} N·m ({round(value * 0.7376)} lb-ft) torque."
+
+def ground_truth() -> list[dict]:
+    """The few-shot torque specs as (component, value) targets."""
+    return [{"component": answer["component"], "value": answer["value"], "unit": answer["unit"]}
+            for _, answer in FEW_SHOT_EXAMPLES]
+
+def make_queries(targets: list[dict]) -> list[dict]:
+    """Three phrasings per target: the few-shot query and two paraphrases."""
+    queries = []
+    for (query, _), target in zip(FEW_SHOT_EXAMPLES, targets):
+        component = target["component"].lower()
+        for text in (query, f"What is the tightening torque of the {component}?", f"{component} torque spec"):
+            queries.append({"query": text, **target})
+    return queries
+
+def make_manual(path: str, num_pages: int, targets: list[dict], rng: random.Random,
+                sentences_per_page: int = 24) -> dict:
+    """
+    Writes one synthetic manual PDF.
+    Returns:
+        {component: page_number} for the targets planted in this manual.
+    """
+    import pymupdf
+
+    target_components = [t["component"].lower() for t in targets]
+    planted = {t["component"]: rng.randrange(num_pages) for t in targets}
+    doc = pymupdf.open()
+    for page_number in range(num_pages):
+        sentences = []
+        for _ in range(sentences_per_page):
+            if rng.random() < 0.3:
+                sentences.append(spec_sentence(rng.choice(DISTRACTORS), rng.randint(8, 300)))
+            else:
+                # Target components also show up in procedure text, without their torque
+                component = rng.choice(target_components if target_components and rng.random() < 0.1 else DISTRACTORS)
+                sentences.append(rng.choice(PROCEDURE).format(c=component))
+        for target in targets:
+            if planted[target["component"]] == page_number:
+                sentences.insert(rng.randrange(len(sentences) + 1),
+                                 spec_sentence(target["component"].lower(), int(target["value"])))
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(40, 40, 572, 800), " ".join(sentences), fontsize=8, fontname="helv")
+    doc.save(path)
+    doc.close()
+    return planted
+
+# --- Offline embedder ---
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder with EmbeddingService's interface.
+    Word unigrams and bigrams are hashed into `dim` signed buckets and the
+    vector is L2-normalized. No model download, a few microseconds per text.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+        self.model = self  # Retriever calls embedding_service.model.encode
+        self.cache = None
+
+    def _vector(self, text: str) -> np.ndarray:
+        words = re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, convert_to_tensor: bool = False, **kwargs):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.vstack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def generate_embeddings(self, chunks: list, batch_size: int = 32):
+        texts = [c["sentence_chunk"] for c in chunks] if chunks and isinstance(chunks[0], dict) else chunks
+        return self.encode(texts)
+
+    def encode_queries(self, queries: list[str]):
+        return self.encode(queries)
+
+def build_embedder(kind: str):
+    if kind == "hashing":
+        return HashingEmbedder()
+    from vectorstore.embeddings import EmbeddingService
+    return EmbeddingService(backend=settings.EMBEDDING_BACKEND, num_threads=settings.EMBEDDING_NUM_THREADS,
+                            min_cosine=settings.EMBEDDING_MIN_COSINE,
+                            onnx_file_name=settings.EMBEDDING_ONNX_FILE or None)
+
+# --- Measurements ---
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def percentiles(latencies_ms: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+            "mean_ms": round(float(np.mean(latencies_ms)), 2)}
+
+def ingest(ingestion: IngestionService, paths: list[str], num_pages: int) -> dict:
+    totals: dict[str, dict] = {}
+    chunks = 0
+    start = time.perf_counter()
+    for path in paths:
+        result = ingestion.process_file(path)
+        chunks += result["chunks"]
+        for stage, stats in result.get("stages", {}).items():
+            total = totals.setdefault(stage, {"items": 0, "busy_seconds": 0.0})
+            total["items"] += stats["items"]
+            total["busy_seconds"] += stats["busy_seconds"]
+    wall = time.perf_counter() - start
+
+    pages = num_pages * len(paths)
+    report = {"manuals": len(paths), "pages": pages, "chunks": chunks, "wall_seconds": round(wall, 3),
+              "pages_per_sec": round(pages / wall, 1), "chunks_per_sec": round(chunks / wall, 1), "stages": {}}
+    for stage, total in totals.items():
+        busy = total["busy_seconds"]
+        # Stages that finish within timer resolution get no rate
+        report["stages"][stage] = {"busy_seconds": round(busy, 3),
+                                   "pages_per_sec": round(pages / busy, 1) if busy >= 0.001 else None,
+                                   "chunks_per_sec": round(chunks / busy, 1) if busy >= 0.001 else None}
+    return report
+
+def is_relevant(item: dict, query: dict, planted: dict) -> bool:
+    pdf_file, page_number = planted[query["component"]]
+    return (item["pdf_file"] == pdf_file and item["page_number"] == page_number
+            and spec_sentence(query["component"].lower(), int(query["value"])).lower() in item["sentence_chunk"].lower())
+
+def retrieval_quality(retriever: Retriever, queries: list[dict], planted: dict, k: int) -> dict:
+    hits, reciprocal_ranks = 0, []
+    for query in queries:
+        embedding = retriever.embed_query(query["query"]).tolist()
+        items = retriever.search(query["query"], embedding, k)
+        rank = next((i for i, item in enumerate(items, start=1) if is_relevant(item, query, planted)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {"k": k, "queries": len(queries), "recall_at_k": round(hits / len(queries), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4)}
+
+def is_correct(answer, query: dict) -> bool:
+    answers = answer if isinstance(answer, list) else [answer]
+    return any(isinstance(a, dict) and str(a.get("value")) == query["value"] for a in answers)
+
+def query_load(query_service: QueryService, queries: list[dict], concurrency: int, num_requests: int) -> dict:
+    workload = [queries[i % len(queries)] for i in range(num_requests)]
+
+    def run(query: dict):
+        start = time.perf_counter()
+        try:
+            result = query_service.answer(query["query"])
+            return (time.perf_counter() - start) * 1000.0, is_correct(result["answer"], query), result["path"]
+        except Exception as e:
+            print(f"[ERROR] Query failed: {e}")
+            return (time.perf_counter() - start) * 1000.0, None, "error"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run, workload))
+    wall = time.perf_counter() - start
+
+    answered = [correct for _, correct, _ in results if correct is not None]
+    paths = {}
+    for _, _, path in results:
+        paths[path] = paths.get(path, 0) + 1
+    return {"concurrency": concurrency, "requests": num_requests, **percentiles([r[0] for r in results]),
+            "throughput_qps": round(num_requests / wall, 1), "errors": num_requests - len(answered),
+            "answer_accuracy": round(sum(answered) / max(len(answered), 1), 4), "paths": paths}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manuals", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=50, help="Pages per manual.")
+    parser.add_argument("--embedder", default="hashing", choices=["hashing", "mpnet"])
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("--retrieval", default=settings.RETRIEVAL_MODE, choices=["hybrid", "dense"])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Queries per concurrency level.")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--query-cache-size", type=int, default=0,
+                        help="Query embedding cache entries (0 measures the uncached path).")
+    parser.add_argument("--spec-index", action="store_true", help="Let the spec index answer confident lookups.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    targets = ground_truth()
+    queries = make_queries(targets)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Targets are spread over the manuals; every manual also mentions them without values
+        paths, planted = [], {}
+        for m in range(args.manuals):
+            path = os.path.join(tmp, f"synthetic-manual-{m}.pdf")
+            own = [t for i, t in enumerate(targets) if i % args.manuals == m]
+            for component, page_number in make_manual(path, args.pages, own, rng).items():
+                planted[component] = (os.path.basename(path), page_number)
+            paths.append(path)
+
+        embedder = build_embedder(args.embedder)
+        vector_store = create_vector_store(args.backend, os.path.join(tmp, "store"))
+        lexical_index = BM25Index(os.path.join(tmp, "bm25"), max_df=settings.LEXICAL_MAX_DF) if args.retrieval == "hybrid" else None
+        spec_index = SpecIndex(os.path.join(tmp, "specs")) if args.spec_index else None
+        ingestion = IngestionService(vector_store, embedder, embed_batch_size=settings.INGESTION_EMBED_BATCH_SIZE,
+                                     queue_size=settings.INGESTION_QUEUE_SIZE,
+                                     chunker=TextChunker(batch_size=settings.CHUNKER_BATCH_SIZE),
+                                     lexical_index=lexical_index, spec_index=spec_index)
+        ingestion_report = ingest(ingestion, paths, args.pages)
+        rss_after_ingestion = peak_rss_mb()
+
+        batcher = MicroBatcher(embedder.encode_queries, max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+                               max_wait_ms=settings.QUERY_BATCH_MAX_WAIT_MS) if settings.QUERY_MICRO_BATCHING else None
+        retriever = Retriever(vector_store, embedder, query_cache_size=args.query_cache_size, batcher=batcher,
+                              lexical_index=lexical_index, mode=args.retrieval, rrf_k=settings.RRF_K,
+                              candidates=settings.HYBRID_CANDIDATES)
+        query_service = QueryService(
+            retriever, FakeLLMClient(latency_ms=args.llm_latency_ms), k=args.k, spec_index=spec_index,
+            prompt_builder=PromptBuilder(token_budget=settings.PROMPT_TOKEN_BUDGET,
+                                         num_examples=settings.PROMPT_FEW_SHOT_EXAMPLES,
+                                         max_sentences_per_chunk=settings.PROMPT_MAX_SENTENCES_PER_CHUNK,
+                                         dedup_threshold=settings.PROMPT_DEDUP_THRESHOLD)
+        )
+
+        quality = retrieval_quality(retriever, queries, planted, args.k)
+        query_service.answer(queries[0]["query"])  # warm-up
+        load = [query_load(query_service, queries, c, args.requests) for c in args.concurrency]
+        if batcher:
+            batcher.close()
+
+    report = {
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "ingestion": ingestion_report,
+        "retrieval": quality,
+        "query": load,
+        "peak_rss_mb": {"after_ingestion": round(rss_after_ingestion, 1), "total": round(peak_rss_mb(), 1)}
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmarks quantized first-pass search in NumpyVectorStore.
+
+Indexes synthetic clustered unit vectors (768-d like all-mpnet-base-v2) once per
+mode, then reports for each mode:
+  - memory per 1M chunks of the in-RAM first-pass index and of the on-disk
+    rescoring matrix,
+  - recall@k against exact float32 search,
+  - mean query latency.
+
+Usage:
+    python benchmarks/bench_quantization.py --chunks 100000 --queries 200 --k 5 --multipliers 4 16 64
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.numpy_store import NumpyVectorStore
+
+def make_vectors(num_chunks: int, num_queries: int, dim: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Builds clustered unit vectors and queries that are noisy copies of random chunks."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(num_chunks // 200, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), num_chunks)] + 0.6 * rng.normal(size=(num_chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(0, num_chunks, num_queries)] + 0.3 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries
+
+def build_store(directory: str, vectors: np.ndarray, batch_size: int = 10000, **options) -> NumpyVectorStore:
+    store = NumpyVectorStore(persist_directory=directory, **options)
+    for start in range(0, len(vectors), batch_size):
+        store.upsert_documents([{"id": str(row), "sentence_chunk": "", "embedding": vectors[row],
+                                 "pdf_file": "synthetic.pdf", "page_number": 0}
+                                for row in range(start, min(start + batch_size, len(vectors)))])
+    store.flush()
+    return store
+
+def search(store: NumpyVectorStore, queries: np.ndarray, k: int) -> tuple[list[set], float]:
+    """Runs queries one at a time (as the API does) and returns result IDs and mean latency in ms."""
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(set(store.query([query], n_results=k)["ids"][0]))
+    return results, (time.perf_counter() - start) * 1000.0 / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--rescore-dtype", default="float16", choices=["float16", "float32"])
+    args = parser.parse_args()
+
+    vectors, queries = make_vectors(args.chunks, args.queries, args.dim)
+    per_million = 1_000_000 / args.chunks
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"[INFO] Indexing {args.chunks} x {args.dim} vectors...")
+        baseline = build_store(os.path.join(tmp, "none"), vectors)
+        truth, baseline_ms = search(baseline, queries, args.k)
+        stats = baseline.index_stats()
+
+        rows = [("float32 (exact)", stats["first_pass_bytes"], 0, 1.0, baseline_ms)]
+        for mode in ("int8", "binary"):
+            store = build_store(os.path.join(tmp, mode), vectors, quantization=mode, rescore_dtype=args.rescore_dtype)
+            for multiplier in args.multipliers:
+                store.rescore_multiplier = multiplier
+                found, ms = search(store, queries, args.k)
+                recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+                stats = store.index_stats()
+                rows.append((f"{mode} x{multiplier} -> {args.rescore_dtype}",
+                             stats["first_pass_bytes"], stats["rescore_bytes"], recall, ms))
+
+    print(f"\n{'mode':<28}{'RAM / 1M chunks':>18}{'disk / 1M chunks':>18}{f'recall@{args.k}':>11}{'ms/query':>10}")
+    for name, ram, disk, recall, ms in rows:
+        print(f"{name:<28}{ram * per_million / 2**20:>15.0f} MB{disk * per_million / 2**20:>15.0f} MB"
+              f"{recall:>11.3f}{ms:>10.2f}")
+
+if __name__ == "__main__":
+    main()
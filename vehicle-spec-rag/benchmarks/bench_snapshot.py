@@ -0,0 +1,77 @@
+"""
+Compares the old CSV export (embeddings as stringified lists, parsed back
+with ast.literal_eval) with the binary snapshot format (float32 .npy +
+Parquet + manifest) on synthetic chunks: write time, load time and size.
+
+Usage:
+    python benchmarks/bench_snapshot.py --chunks 20000 --dim 768
+"""
+import argparse
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.snapshot import Snapshot, write_snapshot
+
+def make_chunks(num_chunks: int, dim: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((num_chunks, dim)).astype(np.float32)
+    return [{"sentence_chunk": f"Tighten the bolt {i} to {i % 300} N·m.", "pdf_file": f"manual-{i % 40}.pdf",
+             "page_number": i % 500, "embedding": embedding.tolist()} for i, embedding in enumerate(embeddings)]
+
+def directory_size_mb(path: str) -> float:
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    chunks = make_chunks(args.chunks, args.dim)
+    workdir = tempfile.mkdtemp(prefix="bench_snapshot_")
+    try:
+        csv_path = os.path.join(workdir, "chunks.csv")
+        start = time.perf_counter()
+        pd.DataFrame(chunks).to_csv(csv_path, index=False)
+        csv_write = time.perf_counter() - start
+        start = time.perf_counter()
+        df = pd.read_csv(csv_path)
+        csv_matrix = np.asarray(df["embedding"].apply(ast.literal_eval).tolist(), dtype=np.float32)
+        csv_load = time.perf_counter() - start
+
+        snapshot_dir = os.path.join(workdir, "snapshot")
+        start = time.perf_counter()
+        write_snapshot(chunks, snapshot_dir)
+        snapshot_write = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot = Snapshot(snapshot_dir)
+        snapshot_open = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot_matrix = np.asarray(snapshot.embeddings)
+        snapshot.read()
+        snapshot_load = snapshot_open + time.perf_counter() - start
+
+        # Both round trips should give back the same matrix
+        max_error = float(np.abs(csv_matrix - snapshot_matrix).max())
+
+        print(f"\n{'format':<10}{'write s':>10}{'open s':>10}{'load s':>10}{'size MB':>10}")
+        print(f"{'csv':<10}{csv_write:>10.2f}{'-':>10}{csv_load:>10.2f}{directory_size_mb(csv_path):>10.1f}")
+        print(f"{'snapshot':<10}{snapshot_write:>10.2f}{snapshot_open:>10.3f}{snapshot_load:>10.2f}"
+              f"{directory_size_mb(snapshot_dir):>10.1f}")
+        print(f"\nload speedup: {csv_load / snapshot_load:.0f}x, max |csv - snapshot| = {max_error:.2e}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
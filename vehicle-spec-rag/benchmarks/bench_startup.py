@@ -0,0 +1,95 @@
+"""
+Measures API cold start.
+
+1. Import time of `app` per module, from `python -X importtime` (self and
+   cumulative microseconds, top N by cumulative time).
+2. With --serve: launches uvicorn in a fresh process and reports the seconds
+   until /healthz answers (the pod can take traffic) and until /readyz returns
+   200 (models loaded and warm), plus the per-step timings /readyz reports.
+
+Usage:
+    python benchmarks/bench_startup.py --top 25
+    python benchmarks/bench_startup.py --serve --port 3100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """Returns (module, self_us, cumulative_us) for every module imported by `import <module>`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BASE_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def _get(url: str) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+def time_to_ready(port: int, timeout: float) -> dict:
+    """Starts the API and polls the probes until it is ready (or failed / timed out)."""
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port)],
+                               cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    start = time.perf_counter()
+    healthy_at, body = None, {}
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if healthy_at is None and _get(f"http://127.0.0.1:{port}/healthz")[0] == 200:
+                    healthy_at = time.perf_counter() - start
+                if healthy_at is not None:
+                    status, body = _get(f"http://127.0.0.1:{port}/readyz")
+                    if status == 200 or body.get("status") == "failed":
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.05)
+        return {"healthy_after_s": healthy_at, "ready_after_s": time.perf_counter() - start, "readyz": body}
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--serve", action="store_true", help="Also time /healthz and /readyz of a live server.")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_us = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    print(f"[INFO] import {args.module}: {total_us / 1e6:.2f}s ({len(rows)} modules)\n")
+    print(f"{'module':<50}{'self ms':>10}{'cumul. ms':>12}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}")
+
+    if args.serve:
+        result = time_to_ready(args.port, args.timeout)
+        readyz = result["readyz"]
+        print(f"\n[INFO] /healthz after {result['healthy_after_s']}s, /readyz "
+              f"'{readyz.get('status')}' after {result['ready_after_s']:.2f}s")
+        for section in ("imports", "steps"):
+            for name, seconds in (readyz.get(section) or {}).items():
+                print(f"  {section[:-1]:<8}{name:<32}{seconds:>8.2f}s")
+
+if __name__ == "__main__":
+    main()
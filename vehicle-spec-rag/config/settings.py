@@ -0,0 +1,147 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Paths ---
+# Shared by the API and the bulk ingestion CLI
+CHROMA_DB_PATH = os.path.join(BASE_DIR, "data", "chroma_store")
+NUMPY_STORE_PATH = os.path.join(BASE_DIR, "data", "numpy_store")
+LEXICAL_INDEX_PATH = os.path.join(BASE_DIR, "data", "bm25_index")
+SPEC_INDEX_PATH = os.path.join(BASE_DIR, "data", "spec_index")
+# Maps logical collection names to the versioned collection being served (see vectorstore/aliases.py)
+COLLECTION_ALIASES_PATH = os.path.join(BASE_DIR, "data", "collection_aliases.json")
+
+# --- Ingestion ---
+# Number of background threads running ingestion jobs
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+# Jobs allowed to wait behind the running ones before /upload returns 429
+INGESTION_MAX_PENDING = int(os.getenv("INGESTION_MAX_PENDING", "8"))
+# Retry-After (seconds) sent with that 429
+INGESTION_RETRY_AFTER_SECONDS = int(os.getenv("INGESTION_RETRY_AFTER_SECONDS", "30"))
+# Each upload is saved under its own job directory here and removed once its job finishes
+UPLOAD_DIR = os.path.join(BASE_DIR, "data", "uploads")
+# Chunks per embedding/write batch in the streaming ingestion pipeline
+INGESTION_EMBED_BATCH_SIZE = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "256"))
+# Batches buffered between pipeline stages; bounds ingestion memory
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "4"))
+# Pages per spaCy nlp.pipe batch and worker processes for sentence splitting
+CHUNKER_BATCH_SIZE = int(os.getenv("CHUNKER_BATCH_SIZE", "64"))
+CHUNKER_N_PROCESS = int(os.getenv("CHUNKER_N_PROCESS", "1"))
+
+# --- Vector store ---
+# 'chroma' (HNSW, persisted in data/chroma_store) or 'numpy' (exact search, data/numpy_store)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+# NumPy backend only: 'none', 'int8' or 'binary' first-pass codes, the shortlist size
+# (k * multiplier) rescored at full precision, and the on-disk rescoring dtype
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+VECTOR_RESCORE_MULTIPLIER = int(os.getenv("VECTOR_RESCORE_MULTIPLIER", "4"))
+VECTOR_RESCORE_DTYPE = os.getenv("VECTOR_RESCORE_DTYPE", "float32")
+
+# --- Embeddings ---
+# On-disk embedding cache for chunk texts; set to an empty string to disable
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "data", "embedding_cache"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# CPU inference backend: 'torch' (float32), 'int8' (dynamic quantization) or 'onnx' (ONNX Runtime,
+# needs optimum[onnxruntime]). A backend is only used if it matches the float32 model's embeddings
+# with at least EMBEDDING_MIN_COSINE on a validation set, so existing vectors stay valid.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Inference threads (0 keeps the library default); optional ONNX file, e.g. onnx/model_qint8_avx512_vnni.onnx
+EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+EMBEDDING_MIN_COSINE = float(os.getenv("EMBEDDING_MIN_COSINE", "0.99"))
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+# Number of query embeddings kept in the Retriever's LRU cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# Micro-batching of concurrent query encodes: flush at N queries or after max wait
+QUERY_MICRO_BATCHING = os.getenv("QUERY_MICRO_BATCHING", "true").lower() == "true"
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+# --- Retrieval ---
+# 'hybrid' fuses dense and BM25 rankings with reciprocal rank fusion; 'dense' is embeddings only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# BM25 skips query terms found in more than this fraction of chunks (too common to help the ranking)
+LEXICAL_MAX_DF = float(os.getenv("LEXICAL_MAX_DF", "0.25"))
+# Candidates taken from each ranking before fusion, and the RRF rank constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Optional cross-encoder rerank: over-fetch candidates, keep the best top N within a time budget
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+
+# --- Query ---
+# Answer confident exact lookups from the structured spec index built at ingestion, skipping the LLM
+SPEC_INDEX_ENABLED = os.getenv("SPEC_INDEX_ENABLED", "true").lower() == "true"
+SPEC_INDEX_MIN_CONFIDENCE = float(os.getenv("SPEC_INDEX_MIN_CONFIDENCE", "0.85"))
+# Answer cache: cosine similarity for near-duplicate hits, TTL and size bounds
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Prompt assembly: estimated token budget, few-shot examples (0-10), sentences kept per chunk,
+# and the term overlap above which a chunk counts as a duplicate of a higher-ranked one
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+PROMPT_FEW_SHOT_EXAMPLES = int(os.getenv("PROMPT_FEW_SHOT_EXAMPLES", "3"))
+PROMPT_MAX_SENTENCES_PER_CHUNK = int(os.getenv("PROMPT_MAX_SENTENCES_PER_CHUNK", "4"))
+PROMPT_DEDUP_THRESHOLD = float(os.getenv("PROMPT_DEDUP_THRESHOLD", "0.8"))
+# 'gemini', or 'fake' for the deterministic offline FakeLLMClient (load tests, benchmarks)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "50"))
+# /query/batch: max queries per request and simultaneous LLM calls per batch
+BATCH_QUERY_MAX_ITEMS = int(os.getenv("BATCH_QUERY_MAX_ITEMS", "200"))
+BATCH_QUERY_LLM_CONCURRENCY = int(os.getenv("BATCH_QUERY_LLM_CONCURRENCY", "8"))
+
+# --- Admission control ---
+# Per-stage limits on concurrent calls plus a bounded FIFO wait queue. A full queue gets 429,
+# a caller that waited ADMISSION_QUEUE_TIMEOUT_SECONDS gets 503; both carry Retry-After.
+# /query holds one of API_WORKER_THREADS threads while it waits, so each stage's concurrency + queue
+# must stay below that or excess requests wait for a thread instead of getting 429; larger queues
+# are capped at startup.
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "40"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+EMBEDDING_MAX_QUEUE = int(os.getenv("EMBEDDING_MAX_QUEUE", "16"))
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_MAX_QUEUE = int(os.getenv("SEARCH_MAX_QUEUE", "16"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+# Deadline for one LLM call (or a whole streamed answer). Must not exceed REQUEST_DEADLINE_MS,
+# or a call outlives the request it serves; a larger value is capped at startup.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+
+# --- LLM deadlines and hedging ---
+# Time budget for a whole query. A client may ask for less with the X-Request-Deadline-Ms header.
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "15000"))
+# Send a duplicate LLM call when one runs past this percentile of recent call latencies
+# (LLM_HEDGE_AFTER_MS until LLM_HEDGE_MIN_SAMPLES calls have been seen)
+LLM_HEDGING = os.getenv("LLM_HEDGING", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "3000"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Where the duplicate goes: '' for the same backend as LLM_BACKEND, or 'gemini' / 'fake'
+LLM_HEDGE_BACKEND = os.getenv("LLM_HEDGE_BACKEND", "")
+# When the LLM fails or misses the deadline, answer from the top retrieved chunk (flagged
+# 'extractive_fallback') instead of returning an error
+LLM_EXTRACTIVE_FALLBACK = os.getenv("LLM_EXTRACTIVE_FALLBACK", "true").lower() == "true"
+# FakeLLMClient tail: this fraction of calls takes FAKE_LLM_TAIL_LATENCY_MS, and FAKE_LLM_ERROR_RATE fail
+FAKE_LLM_TAIL_LATENCY_MS = float(os.getenv("FAKE_LLM_TAIL_LATENCY_MS", "0"))
+FAKE_LLM_TAIL_PROBABILITY = float(os.getenv("FAKE_LLM_TAIL_PROBABILITY", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+
+# --- Startup ---
+# Run one synthetic query through the embedder (and reranker) before reporting ready,
+# so the first real request does not pay for lazy weight loading and kernel selection
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+# Seconds a client is told to wait (Retry-After) when it calls the API before models are loaded
+STARTUP_RETRY_AFTER_SECONDS = int(os.getenv("STARTUP_RETRY_AFTER_SECONDS", "5"))
+
+# --- Metrics ---
+# Add a Server-Timing header with the per-stage breakdown (embed, search, llm, ...) to each response
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
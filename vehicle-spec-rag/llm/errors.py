@@ -0,0 +1,5 @@
+class LLMError(Exception):
+    """An LLM call failed or returned no usable text."""
+
+class LLMTimeoutError(LLMError, TimeoutError):
+    """An LLM call did not finish before its deadline."""
@@ -0,0 +1,54 @@
+from pdf_processing.spec_extractor import SpecExtractor
+from vectorstore.spec_index import component_terms
+
+# The fields of a spec answer, as the prompt asks the model to return them
+ANSWER_FIELDS = ("component", "spec_type", "value", "unit")
+
+def best_spec(query: str, specs: list[dict]) -> dict | None:
+    """
+    Picks the spec whose component best matches the query (Jaccard overlap of component terms).
+    Returns:
+        The spec's answer fields, or None if no component shares a term with the query.
+    """
+    query_terms = component_terms(query)
+    best, best_score = None, 0.0
+    for spec in specs:
+        terms = component_terms(spec["component"])
+        score = len(query_terms & terms) / max(len(query_terms | terms), 1)
+        if score > best_score:
+            best, best_score = spec, score
+    return None if best is None else {k: best[k] for k in ANSWER_FIELDS}
+
+class ExtractiveAnswerer:
+    """
+    Answers a query without the LLM: runs the regex spec extractor over the top
+    retrieved chunk and returns the spec that best matches the query, in the
+    same shape the LLM would. Used as the fallback when the LLM misses its
+    deadline or fails, so it is cheap (a few milliseconds) but less reliable
+    than the model: it only looks at one chunk and cannot resolve ambiguity.
+    """
+
+    def __init__(self, extractor: SpecExtractor = None):
+        self.extractor = extractor or SpecExtractor()
+
+    def answer(self, query: str, context_items: list[dict]) -> dict | list:
+        """
+        Args:
+            query: The user query string.
+            context_items: Retrieved chunks, best first (only the first is used).
+        Returns:
+            A spec dict ('component', 'spec_type', 'value', 'unit'), or [] if the top chunk has no match.
+        """
+        if not context_items:
+            return []
+        top = context_items[0]
+        specs = self.extractor.extract_from_text(top["sentence_chunk"], top.get("pdf_file", "context"),
+                                                 top.get("page_number", 0))
+        return best_spec(query, specs) or []
+
+if __name__ == "__main__":
+    answerer = ExtractiveAnswerer()
+    print(answerer.answer("Torque for lower ball joint nut", [
+        {"sentence_chunk": "Tighten the brake caliper bolts to 35 N·m. Tighten the lower ball joint nut to 175 N·m.",
+         "pdf_file": "manual.pdf", "page_number": 12}
+    ]))
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import random
+import time
+
+from pdf_processing.spec_extractor import SpecExtractor
+from llm.extractive import best_spec
+from llm.errors import LLMError, LLMTimeoutError
+
+class FakeLLMClient:
+    """
+    Deterministic, offline stand-in for GeminiClient (same methods) for benchmarks and load tests.
+
+    It answers the way a well-behaved model would: it extracts the specs in the
+    prompt's context and returns, as fenced JSON, the one whose component best
+    matches the query. The same prompt always gives the same answer. A fixed
+    `latency_ms` per call (and `stream_chunk_ms` per streamed fragment) stands
+    in for network and generation time.
+
+    To mimic a real API's long tail, a `tail_probability` fraction of calls
+    takes `tail_latency_ms` instead, and an `error_rate` fraction raises
+    LLMError. Both are drawn from a seeded generator, so runs are repeatable.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, stream_chunk_ms: float = 5.0, model_name: str = "fake-llm",
+                 tail_latency_ms: float = 0.0, tail_probability: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0):
+        self.model_name = model_name
+        self.latency = latency_ms / 1000.0
+        self.stream_chunk = stream_chunk_ms / 1000.0
+        self.tail_latency = tail_latency_ms / 1000.0
+        self.tail_probability = tail_probability
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.extractor = SpecExtractor()
+        self.calls = 0
+        print(f"[INFO] Initializing FakeLLMClient ({latency_ms:.0f} ms per call)")
+
+    def _draw(self, timeout: float = None) -> tuple[float, bool]:
+        """
+        Returns this call's wait in seconds and whether it ends in a timeout (a latency
+        beyond `timeout`, like the SDK's request timeout), or raises LLMError for a simulated failure.
+        """
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise LLMError("Simulated LLM failure")
+        latency = self.latency
+        if self.tail_probability and self.rng.random() < self.tail_probability:
+            latency = self.tail_latency
+        if timeout is not None and latency > timeout:
+            return max(timeout, 0.0), True
+        return latency, False
+
+    @staticmethod
+    def _timed_out(timeout: float) -> LLMTimeoutError:
+        return LLMTimeoutError(f"Simulated LLM call timed out after {timeout:g}s")
+
+    @staticmethod
+    def _split_prompt(prompt: str) -> tuple[str, str]:
+        """Returns the (query, context) sections of a prompt built by PromptBuilder."""
+        query = prompt.rsplit("User Query:", 1)[-1].split("Return ONLY JSON:", 1)[0].strip()
+        context = prompt.rsplit("answer the user query:", 1)[-1].split("---------------------------------------------", 1)[0]
+        return query, context
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        query, context = self._split_prompt(prompt)
+        answer = best_spec(query, self.extractor.extract_from_text(context, "context", 0)) or []
+        # Fenced like Gemini's replies so the response parser does the same work
+        return f"```json\n{json.dumps(answer, indent=4)}\n```"
+
+    def generate_content(self, prompt: str, timeout: float = None) -> str:
+        """
+        Generates content based on the prompt.
+        Args:
+            prompt: The full prompt string.
+            timeout: Seconds after which the call raises LLMTimeoutError instead.
+        Returns:
+            The generated text response.
+        """
+        wait, timed_out = self._draw(timeout)
+        time.sleep(wait)
+        if timed_out:
+            raise self._timed_out(timeout)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt: str, timeout: float = None) -> str:
+        """Async variant of `generate_content`."""
+        wait, timed_out = self._draw(timeout)
+        await asyncio.sleep(wait)
+        if timed_out:
+            raise self._timed_out(timeout)
+        return self._answer(prompt)
+
+    async def stream_content_async(self, prompt: str, timeout: float = None):
+        """Yields the answer line by line, after the call latency (which `timeout` bounds)."""
+        wait, timed_out = self._draw(timeout)
+        await asyncio.sleep(wait)
+        if timed_out:
+            raise self._timed_out(timeout)
+        for line in self._answer(prompt).splitlines(keepends=True):
+            await asyncio.sleep(self.stream_chunk)
+            yield line
+
+if __name__ == "__main__":
+    from llm.prompt_formatter import PromptBuilder
+
+    prompt, _ = PromptBuilder().build("Torque for lower ball joint nut", [
+        {"sentence_chunk": "Tighten the brake caliper bolts to 35 N·m. Tighten the lower ball joint nut to 175 N·m."}
+    ])
+    print(FakeLLMClient(latency_ms=0).generate_content(prompt))
@@ -1,52 +1,115 @@
-import google.generativeai as genai
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from llm.errors import LLMError, LLMTimeoutError
+
 load_dotenv()
 
 class GeminiClient:
     """Client for interacting with Google's Gemini models."""
 
-    def __init__(self, api_key: str = None, model_name: str = "gemini-flash-latest"):
+    def __init__(self, api_key: str = None, model_name: str = "gemini-flash-latest", timeout: float = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("Gemini API Key must be provided or set in GEMINI_API_KEY environment variable.")
-        
+
+        # Deferred: the SDK pulls in grpc and protobuf, which is slow at import time
+        import google.generativeai as genai
+        from google.api_core.exceptions import DeadlineExceeded
+
         genai.configure(api_key=self.api_key)
         
         self.model_name = model_name
+        # Per-request deadline in seconds, enforced by the SDK (None = SDK default)
+        self.timeout = timeout
+        self.timeout_errors = (DeadlineExceeded, TimeoutError, asyncio.TimeoutError)
         print(f"[INFO] Initializing GeminiClient with model: {self.model_name}")
         self.model = genai.GenerativeModel(self.model_name)
 
-    def generate_content(self, prompt: str) -> str:
+    def _text(self, response) -> str:
+        """Returns a response's text, or raises LLMError if the model produced none."""
+        # Check if response has parts before accessing text
+        if response.parts:
+            try:
+                return response.text
+            except ValueError as ve:
+                # This specific error happens when accessing .text on an empty response
+                raise LLMError(f"Model returned no text. ({ve})") from ve
+
+        # Use safety_ratings or finish_reason to provide better error
+        if response.prompt_feedback:
+            print(f"[WARN] Prompt feedback: {response.prompt_feedback}")
+        if response.candidates and response.candidates[0].finish_reason:
+            raise LLMError(f"No content generated. Finish reason: {response.candidates[0].finish_reason}")
+        raise LLMError("No content generated (Safety block?)")
+
+    def _request_options(self, timeout: float = None) -> dict | None:
+        """SDK request options with a per-call timeout (falling back to the client's default)."""
+        timeout = timeout or self.timeout
+        return {"timeout": timeout} if timeout else None
+
+    def _error(self, e: Exception) -> LLMError:
+        """Wraps an SDK exception, keeping deadline overruns distinguishable."""
+        if isinstance(e, self.timeout_errors):
+            return LLMTimeoutError(f"Gemini call timed out: {e}")
+        return LLMError(f"Error calling Gemini: {e}")
+
+    def generate_content(self, prompt: str, timeout: float = None) -> str:
         """
         Generates content based on the prompt.
         Args:
             prompt: The full prompt string.
+            timeout: Seconds before the SDK abandons the request (default: the client's timeout).
         Returns:
             The generated text response.
+        Raises:
+            LLMError if the call fails or the model returns no text (LLMTimeoutError on a timeout).
         """
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Check if response has parts before accessing text
-            if response.parts:
-                return response.text
-            
-            # Use safety_ratings or finish_reason to provide better error
-            if response.prompt_feedback:
-                 print(f"[WARN] Prompt feedback: {response.prompt_feedback}")
-
-            if response.candidates and response.candidates[0].finish_reason:
-                return f"Error: No content generated. Finish reason: {response.candidates[0].finish_reason}"
-            
-            return "Error: No content generated (Safety block?)"
-            
-        except ValueError as ve:
-             # This specific error happens when accessing .text on empty response
-             return f"Error: Model returned no text. ({ve})"
+            response = self.model.generate_content(prompt, request_options=self._request_options(timeout))
+        except Exception as e:
+            raise self._error(e) from e
+        return self._text(response)
+
+    async def generate_content_async(self, prompt: str, timeout: float = None) -> str:
+        """
+        Async variant of `generate_content` that does not block the event loop.
+        Args:
+            prompt: The full prompt string.
+            timeout: Seconds before the SDK abandons the request (default: the client's timeout).
+        Returns:
+            The generated text response.
+        Raises:
+            LLMError if the call fails or the model returns no text (LLMTimeoutError on a timeout).
+        """
+        try:
+            response = await self.model.generate_content_async(prompt,
+                                                               request_options=self._request_options(timeout))
+        except Exception as e:
+            raise self._error(e) from e
+        return self._text(response)
+
+    async def stream_content_async(self, prompt: str, timeout: float = None):
+        """
+        Streams the generated text as it arrives.
+        Args:
+            prompt: The full prompt string.
+            timeout: Seconds before the SDK abandons the request (default: the client's timeout).
+        Yields:
+            Text fragments in generation order.
+        Raises:
+            LLMError if the call fails (LLMTimeoutError on a timeout).
+        """
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True,
+                                                               request_options=self._request_options(timeout))
+            async for chunk in response:
+                # Chunks without parts (e.g. a final safety/finish chunk) carry no text
+                if chunk.parts:
+                    yield chunk.text
         except Exception as e:
-            return f"Error calling Gemini: {e}"
+            raise self._error(e) from e
 
 if __name__ == "__main__":
     # Test block
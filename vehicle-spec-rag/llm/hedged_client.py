@@ -0,0 +1,394 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from llm.errors import LLMError, LLMTimeoutError
+from services.metrics import LLM_HEDGES, LLM_TIMEOUTS
+
+def _as_llm_error(e: BaseException) -> LLMError:
+    return e if isinstance(e, LLMError) else LLMError(f"LLM call failed: {e}")
+
+def _wait_time(start: float, delay: float | None, deadline: float | None) -> float | None:
+    """Seconds until the hedge is due or the deadline passes, whichever is first (None = no limit)."""
+    now = time.monotonic()
+    waits = [t - now for t in (start + delay if delay is not None else None, deadline) if t is not None]
+    return max(min(waits), 0.0) if waits else None
+
+def _expired(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+def _timeout(deadline: float | None) -> float | None:
+    """The remaining time to a deadline, passed to the client as its per-call timeout."""
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+def _when_settled(futures: list, callback):
+    """Calls `callback` once every future is done (right away if they all are)."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(done)
+
+class _Attempt:
+    """One sync client call on the executor; records when it actually started running."""
+
+    def __init__(self, executor: ThreadPoolExecutor, client, prompt: str, deadline: float | None, on_done):
+        self.started = None
+        self.future = executor.submit(self._run, client, prompt, deadline)
+        self.future.add_done_callback(on_done)
+
+    def _run(self, client, prompt: str, deadline: float | None) -> str:
+        self.started = time.monotonic()
+        if _expired(deadline):
+            raise LLMTimeoutError("Deadline passed before the LLM call started")
+        # The client's own timeout ends the call at the deadline instead of letting it run on unobserved
+        return client.generate_content(prompt, timeout=_timeout(deadline))
+
+class HedgedLLMClient:
+    """
+    Wraps an LLM client (GeminiClient, FakeLLMClient or anything with the same
+    methods, each taking a per-call `timeout`) with deadlines and request hedging.
+
+    Every method takes an absolute `deadline` (a time.monotonic() value) and
+    raises LLMTimeoutError once it passes, instead of waiting on a slow reply.
+    The remaining time is passed to the client as its timeout, so an abandoned
+    call ends at the deadline too.
+
+    If a call has not returned after the `hedge_percentile` of recent call
+    latencies (`hedge_after_ms` until `min_samples` calls were seen), a
+    duplicate is sent to `hedge_client` and whichever answers first wins; the
+    other is cancelled. Only the slowest few percent of calls are duplicated,
+    which is what sets the p99. A primary that fails outright is retried the
+    same way. Streams are hedged on the time to their first fragment.
+
+    Sync calls run on a pool of `max_workers` threads. A hedge is only sent
+    when a thread is free, and `generate_content` reports through `on_settled`
+    when every call it started has finished, so callers can hold their
+    admission slot until then.
+    """
+
+    def __init__(self, client, hedge_client=None, hedge_percentile: float = 95.0, hedge_after_ms: float = 2000.0,
+                 min_samples: int = 20, window: int = 500, hedging: bool = True, max_workers: int = 32):
+        self.client = client
+        # The duplicate goes here: the same client by default, or e.g. another model or region
+        self.hedge_client = hedge_client or client
+        self.model_name = client.model_name
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after_ms / 1000.0
+        self.min_samples = min_samples
+        # Recent primary latencies per kind: whole calls, and time to a stream's first fragment
+        self._latencies = {"call": deque(maxlen=window), "first_token": deque(maxlen=window)}
+        # Sync calls run here so the caller can stop waiting; primary + hedge take up to two threads per call
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._busy = 0
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0, "errors": 0, "timeouts": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _record(self, kind: str, seconds: float):
+        with self._lock:
+            self._latencies[kind].append(seconds)
+
+    def hedge_delay(self, kind: str = "call") -> float | None:
+        """Seconds to wait before hedging a call of this kind ('call' or 'first_token'); None if hedging is off."""
+        if not self.hedging:
+            return None
+        with self._lock:
+            samples = list(self._latencies[kind])
+        if len(samples) < self.min_samples:
+            return self.hedge_after
+        return float(np.percentile(samples, self.hedge_percentile))
+
+    def _hedge_sent(self):
+        self._count("hedged")
+        LLM_HEDGES.inc(outcome="sent")
+
+    def _hedge_won(self):
+        self._count("hedge_wins")
+        LLM_HEDGES.inc(outcome="won")
+
+    def _timed_out(self, start: float) -> LLMTimeoutError:
+        self._count("timeouts")
+        LLM_TIMEOUTS.inc()
+        return LLMTimeoutError(f"LLM call missed its deadline after {time.monotonic() - start:.2f}s")
+
+    def _failed(self, error: LLMError) -> LLMError:
+        """Counts a call whose every attempt failed (a client-side timeout counts as a timeout)."""
+        if isinstance(error, LLMTimeoutError):
+            self._count("timeouts")
+            LLM_TIMEOUTS.inc()
+        else:
+            self._count("errors")
+        return error
+
+    def _attempt_done(self, _):
+        with self._lock:
+            self._busy -= 1
+
+    def _submit(self, client, prompt: str, deadline: float | None, only_if_free: bool = False) -> _Attempt | None:
+        """Starts a sync call on the pool. With `only_if_free`, returns None instead of queueing behind busy threads."""
+        with self._lock:
+            if only_if_free and self._busy >= self.max_workers:
+                self.counts["hedges_skipped"] += 1
+                return None
+            self._busy += 1
+        try:
+            return _Attempt(self._executor, client, prompt, deadline, self._attempt_done)
+        except Exception:
+            with self._lock:
+                self._busy -= 1
+            raise
+
+    def generate_content(self, prompt: str, deadline: float = None, on_settled=None) -> str:
+        """
+        Generates content based on the prompt, hedging a slow call.
+        Args:
+            prompt: The full prompt string.
+            deadline: time.monotonic() value after which to give up (None = wait for the client).
+            on_settled: Called once every call started here has finished, which can be after this
+                method returned or raised (a running sync call cannot be interrupted).
+        Returns:
+            The generated text of whichever call finished first.
+        Raises:
+            LLMTimeoutError at the deadline; LLMError if every attempt failed.
+        """
+        attempts: list[_Attempt] = []
+        try:
+            self._count("calls")
+            start = time.monotonic()
+            if _expired(deadline):
+                raise self._timed_out(start)
+            delay = self.hedge_delay("call")
+            primary = self._submit(self.client, prompt, deadline)
+            attempts.append(primary)
+            pending, hedge, error = {primary.future: primary}, None, None
+
+            def send_hedge() -> bool:
+                nonlocal hedge
+                hedge = self._submit(self.hedge_client, prompt, deadline, only_if_free=True)
+                if hedge is None:
+                    return False
+                attempts.append(hedge)
+                pending[hedge.future] = hedge
+                self._hedge_sent()
+                return True
+
+            while True:
+                if not pending:
+                    # The primary failed fast; the hedge doubles as a retry
+                    if delay is not None and not attempts[1:] and not _expired(deadline) and send_hedge():
+                        continue
+                    raise self._failed(error)
+                hedge_due = delay is not None and not attempts[1:]
+                done, _ = wait(set(pending), timeout=_wait_time(start, delay if hedge_due else None, deadline),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    attempt = pending.pop(future)
+                    if future.exception() is None:
+                        if attempt is primary:
+                            # From when the call started running, not when it was queued
+                            self._record("call", time.monotonic() - attempt.started)
+                        else:
+                            self._hedge_won()
+                        return future.result()
+                    error = _as_llm_error(future.exception())
+                if done:
+                    continue
+                if _expired(deadline):
+                    raise self._timed_out(start)
+                if hedge_due and not send_hedge():
+                    delay = None  # no free thread; keep waiting on the primary alone
+        finally:
+            for attempt in attempts:
+                # Only stops calls still waiting for a thread; running ones end at their client timeout
+                attempt.future.cancel()
+            primary = attempts[0] if attempts else None
+            if primary and not primary.future.done() and primary.started is not None:
+                # Lower bound of the primary's latency, so slow calls still push the hedge delay up
+                self._record("call", time.monotonic() - primary.started)
+            if on_settled:
+                _when_settled([attempt.future for attempt in attempts], on_settled)
+
+    async def generate_content_async(self, prompt: str, deadline: float = None) -> str:
+        """Async variant of `generate_content`; the losing or overdue call is cancelled."""
+        self._count("calls")
+        start = time.monotonic()
+        if _expired(deadline):
+            raise self._timed_out(start)
+        delay = self.hedge_delay("call")
+
+        def call(client) -> asyncio.Future:
+            return asyncio.ensure_future(client.generate_content_async(prompt, timeout=_timeout(deadline)))
+
+        primary = call(self.client)
+        hedge, pending, error = None, {primary}, None
+        try:
+            while True:
+                if not pending:
+                    if hedge is None and delay is not None and not _expired(deadline):
+                        hedge = call(self.hedge_client)
+                        pending.add(hedge)
+                        self._hedge_sent()
+                        continue
+                    raise self._failed(error)
+                done, pending = await asyncio.wait(pending, timeout=_wait_time(start, None if hedge else delay,
+                                                                                deadline),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is primary:
+                            self._record("call", time.monotonic() - start)
+                        else:
+                            self._hedge_won()
+                        return task.result()
+                    error = _as_llm_error(task.exception())
+                if done:
+                    continue
+                if _expired(deadline):
+                    raise self._timed_out(start)
+                if hedge is None and delay is not None:
+                    hedge = call(self.hedge_client)
+                    pending.add(hedge)
+                    self._hedge_sent()
+        finally:
+            if not primary.done():
+                self._record("call", time.monotonic() - start)
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _first_fragment(self, prompt: str, deadline: float | None):
+        """
+        Starts the stream (and a hedged duplicate if the first fragment is slow).
+        Returns:
+            (iterator, first fragment or None for an empty stream) of the stream that answered first.
+        """
+        start = time.monotonic()
+        if _expired(deadline):
+            raise self._timed_out(start)
+        delay = self.hedge_delay("first_token")
+        streams = {}
+
+        def open_stream(client) -> asyncio.Future:
+            fragments = client.stream_content_async(prompt, timeout=_timeout(deadline)).__aiter__()
+            task = asyncio.ensure_future(fragments.__anext__())
+            streams[task] = fragments
+            return task
+
+        primary = open_stream(self.client)
+        hedge, pending, error, winner = None, {primary}, None, None
+        try:
+            while True:
+                if not pending:
+                    if hedge is None and delay is not None and not _expired(deadline):
+                        hedge = open_stream(self.hedge_client)
+                        pending.add(hedge)
+                        self._hedge_sent()
+                        continue
+                    raise self._failed(error)
+                done, pending = await asyncio.wait(pending, timeout=_wait_time(start, None if hedge else delay,
+                                                                                deadline),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exception = task.exception()
+                    if exception is None or isinstance(exception, StopAsyncIteration):
+                        winner = task
+                        if task is primary:
+                            self._record("first_token", time.monotonic() - start)
+                        else:
+                            self._hedge_won()
+                        return streams[task], None if exception else task.result()
+                    error = _as_llm_error(exception)
+                if done:
+                    continue
+                if _expired(deadline):
+                    raise self._timed_out(start)
+                if hedge is None and delay is not None:
+                    hedge = open_stream(self.hedge_client)
+                    pending.add(hedge)
+                    self._hedge_sent()
+        finally:
+            if not primary.done():
+                self._record("first_token", time.monotonic() - start)
+            # Close every stream but the winner; a generator cannot be closed while its __anext__ is running
+            for task, fragments in streams.items():
+                if task is winner:
+                    continue
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                if hasattr(fragments, "aclose"):
+                    await fragments.aclose()
+
+    async def stream_content_async(self, prompt: str, deadline: float = None):
+        """
+        Streams the generated text as it arrives. The whole stream must finish by `deadline`.
+        Yields:
+            Text fragments in generation order, from whichever stream produced its first fragment first.
+        Raises:
+            LLMTimeoutError at the deadline; LLMError if the stream fails.
+        """
+        self._count("calls")
+        start = time.monotonic()
+        fragments, text = await self._first_fragment(prompt, deadline)
+        try:
+            while text is not None:
+                yield text
+                remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+                try:
+                    text = await asyncio.wait_for(fragments.__anext__(), remaining)
+                except StopAsyncIteration:
+                    text = None
+                except asyncio.TimeoutError:
+                    raise self._timed_out(start) from None
+                except LLMError:
+                    raise
+                except Exception as e:
+                    raise _as_llm_error(e) from e
+        finally:
+            if hasattr(fragments, "aclose"):
+                await fragments.aclose()
+
+    def stats(self) -> dict:
+        delays = {kind: self.hedge_delay(kind) for kind in self._latencies}
+        with self._lock:
+            return {"hedging": self.hedging, "hedge_percentile": self.hedge_percentile,
+                    "hedge_delay_ms": {kind: None if d is None else round(d * 1000, 1) for kind, d in delays.items()},
+                    "samples": len(self._latencies["call"]), "busy_threads": self._busy, **self.counts}
+
+if __name__ == "__main__":
+    from llm.fake_client import FakeLLMClient
+    from llm.prompt_formatter import PromptBuilder
+
+    prompt, _ = PromptBuilder().build("Torque for lower ball joint nut", [
+        {"sentence_chunk": "Tighten the brake caliper bolts to 35 N·m. Tighten the lower ball joint nut to 175 N·m."}
+    ])
+    # One call in five takes 2 s; hedging after 200 ms answers most of those in ~250 ms
+    client = HedgedLLMClient(FakeLLMClient(latency_ms=50, tail_latency_ms=2000, tail_probability=0.2, seed=1),
+                             hedge_after_ms=200)
+    for _ in range(10):
+        start = time.perf_counter()
+        try:
+            client.generate_content(prompt, deadline=time.monotonic() + 1.0)
+            print(f"[INFO] Answered in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except LLMTimeoutError as e:
+            # Both the call and its hedge were slow; the API would answer extractively here
+            print(f"[WARN] {e}")
+    print(client.stats())
@@ -1,19 +1,32 @@
-
-def prompt_formatter_gemini(query: str, context_items: list[dict]) -> str:
-    """
-    Formats the query and context into a prompt for the Gemini model.
-    
-    Args:
-        query: User query string.
-        context_items: List of dicts containing 'sentence_chunk'.
-        
-    Returns:
-        Formatted prompt string.
-    """
-    # Convert context items to bullet list
-    context = "- " + "\n- ".join([item["sentence_chunk"] for item in context_items])
-
-    prompt = f"""
+import json
+import math
+import re
+
+# (query, answer) pairs shown to the model as the expected answer style
+FEW_SHOT_EXAMPLES = [
+    ("Torque for brake caliper bolts",
+     {"component": "Brake Caliper Bolt", "spec_type": "Torque", "value": "35", "unit": "Nm"}),
+    ("Torque for brake disc shield bolts",
+     {"component": "Brake Disc Shield Bolt", "spec_type": "Torque", "value": "17", "unit": "Nm"}),
+    ("Torque for lower arm forward and rearward nuts",
+     {"component": "Lower Arm Forward and Rearward Nuts", "spec_type": "Torque", "value": "350", "unit": "Nm"}),
+    ("Torque for lower ball joint nut",
+     {"component": "Lower Ball Joint Nut", "spec_type": "Torque", "value": "175", "unit": "Nm"}),
+    ("Torque for shock absorber lower nuts",
+     {"component": "Shock Absorber Lower Nuts", "spec_type": "Torque", "value": "90", "unit": "Nm"}),
+    ("Torque for shock absorber upper mount nuts",
+     {"component": "Shock Absorber Upper Mount Nuts", "spec_type": "Torque", "value": "63", "unit": "Nm"}),
+    ("Torque for tie-rod end nut",
+     {"component": "Tie-Rod End Nut", "spec_type": "Torque", "value": "115", "unit": "Nm"}),
+    ("Torque for stabilizer bar bracket nuts",
+     {"component": "Stabilizer Bar Bracket Nuts", "spec_type": "Torque", "value": "55", "unit": "Nm"}),
+    ("Torque for stabilizer bar link nuts",
+     {"component": "Stabilizer Bar Link Nuts", "spec_type": "Torque", "value": "70", "unit": "Nm"}),
+    ("Torque for wheel speed sensor bolt",
+     {"component": "Wheel Speed Sensor Bolt", "spec_type": "Torque", "value": "18", "unit": "Nm"}),
+]
+
+PROMPT_HEADER = """
 You are an expert automotive service manual assistant.
 You extract structured specifications from noisy context.
 
@@ -24,97 +37,9 @@ Follow these rules:
 - If multiple matching components exist, output multiple JSON objects.
 
 Below are examples of the expected answer style:
+"""
 
-Example 1:
-Query: Torque for brake caliper bolts
-Answer: {{
-    "component": "Brake Caliper Bolt",
-    "spec_type": "Torque",
-    "value": "35",
-    "unit": "Nm"
-}}
-
-Example 2:
-Query: Torque for brake disc shield bolts
-Answer: {{
-    "component": "Brake Disc Shield Bolt",
-    "spec_type": "Torque",
-    "value": "17",
-    "unit": "Nm"
-}}
-
-Example 3:
-Query: Torque for lower arm forward and rearward nuts
-Answer: {{
-    "component": "Lower Arm Forward and Rearward Nuts",
-    "spec_type": "Torque",
-    "value": "350",
-    "unit": "Nm"
-}}
-
-Example 4:
-Query: Torque for lower ball joint nut
-Answer: {{
-    "component": "Lower Ball Joint Nut",
-    "spec_type": "Torque",
-    "value": "175",
-    "unit": "Nm"
-}}
-
-Example 5:
-Query: Torque for shock absorber lower nuts
-Answer: {{
-    "component": "Shock Absorber Lower Nuts",
-    "spec_type": "Torque",
-    "value": "90",
-    "unit": "Nm"
-}}
-
-Example 6:
-Query: Torque for shock absorber upper mount nuts
-Answer: {{
-    "component": "Shock Absorber Upper Mount Nuts",
-    "spec_type": "Torque",
-    "value": "63",
-    "unit": "Nm"
-}}
-
-Example 7:
-Query: Torque for tie-rod end nut
-Answer: {{
-    "component": "Tie-Rod End Nut",
-    "spec_type": "Torque",
-    "value": "115",
-    "unit": "Nm"
-}}
-
-Example 8:
-Query: Torque for stabilizer bar bracket nuts
-Answer: {{
-    "component": "Stabilizer Bar Bracket Nuts",
-    "spec_type": "Torque",
-    "value": "55",
-    "unit": "Nm"
-}}
-
-Example 9:
-Query: Torque for stabilizer bar link nuts
-Answer: {{
-    "component": "Stabilizer Bar Link Nuts",
-    "spec_type": "Torque",
-    "value": "70",
-    "unit": "Nm"
-}}
-
-Example 10:
-Query: Torque for wheel speed sensor bolt
-Answer: {{
-    "component": "Wheel Speed Sensor Bolt",
-    "spec_type": "Torque",
-    "value": "18",
-    "unit": "Nm"
-}}
-
+PROMPT_FOOTER = """
 ---------------------------------------------
 Now use the following context items to answer the user query:
 
@@ -127,4 +52,145 @@ User Query:
 Return ONLY JSON:
 """
 
-    return prompt
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_STOP_WORDS = {"a", "an", "the", "for", "of", "on", "in", "to", "and", "or", "is", "are", "what", "with", "how"}
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about 4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+def _truncate(line: str, max_chars: int) -> str | None:
+    """Cuts a context line to at most `max_chars` at a word boundary; None if not even one word fits."""
+    if max_chars < 3:
+        return None
+    cut = line[:max_chars + 1].rsplit(None, 1)[0]
+    return cut if len(cut) <= max_chars and cut != "-" else None
+
+def format_examples(num_examples: int) -> str:
+    """Renders the first `num_examples` few-shot examples."""
+    blocks = []
+    for i, (query, answer) in enumerate(FEW_SHOT_EXAMPLES[:num_examples], start=1):
+        blocks.append(f"Example {i}:\nQuery: {query}\nAnswer: {json.dumps(answer, indent=4)}\n")
+    return "\n".join(blocks)
+
+def _terms(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS}
+
+class PromptBuilder:
+    """
+    Builds the Gemini prompt within a token budget.
+
+    Retrieved chunks are taken in rank order. Near-duplicates of an earlier
+    chunk are dropped, each chunk is trimmed to the sentences that share the
+    most terms with the query (matching sentences that contain numbers rank
+    higher, since specs are numbers), and chunks are added until the budget
+    is used up. A sentence too long for what is left is cut at a word
+    boundary, and a chunk that does not fit is skipped for smaller ones.
+    """
+
+    def __init__(self, token_budget: int = 1500, num_examples: int = 10, max_sentences_per_chunk: int = 4,
+                 dedup_threshold: float = 0.8):
+        self.token_budget = token_budget
+        self.num_examples = max(0, min(num_examples, len(FEW_SHOT_EXAMPLES)))
+        self.max_sentences_per_chunk = max_sentences_per_chunk
+        self.dedup_threshold = dedup_threshold
+        # The header and examples are identical for every request
+        self._prefix = PROMPT_HEADER + "\n" + format_examples(self.num_examples)
+
+    def _is_duplicate(self, terms: set, kept_terms: list[set]) -> bool:
+        """True if the chunk overlaps an already kept chunk (Jaccard or containment) above the threshold."""
+        for other in kept_terms:
+            common = len(terms & other)
+            if not common:
+                continue
+            if common / len(terms | other) >= self.dedup_threshold or common / min(len(terms), len(other)) >= 0.95:
+                return True
+        return False
+
+    def _ranked_sentences(self, text: str, query_terms: set) -> tuple[list[tuple[int, str]], int]:
+        """
+        Returns the chunk's top `max_sentences_per_chunk` sentences as (position, sentence),
+        most query-relevant first, and the chunk's total sentence count.
+        """
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+        def score(i: int) -> int:
+            words = _terms(sentences[i])
+            matches = words & query_terms
+            return len(matches) + sum(1 for word in words if word[0].isdigit()) if matches else 0
+
+        ranked = sorted(range(len(sentences)), key=lambda i: (-score(i), i))[:self.max_sentences_per_chunk]
+        return [(i, sentences[i]) for i in ranked], len(sentences)
+
+    def build(self, query: str, context_items: list[dict]) -> tuple[str, dict]:
+        """
+        Formats the query and context into a prompt for the Gemini model.
+        Args:
+            query: User query string.
+            context_items: Retrieved chunks (dicts with 'sentence_chunk'), best first.
+        Returns:
+            (prompt, stats) where stats has the estimated 'prompt_tokens' and
+            'context_tokens', the number of 'examples', and counts of chunks
+            received, used, dropped as duplicates and trimmed.
+        """
+        query_terms = _terms(query)
+        fixed_tokens = estimate_tokens(self._prefix + PROMPT_FOOTER.format(context="", query=query))
+        remaining = self.token_budget - fixed_tokens
+
+        lines, kept_terms = [], []
+        stats = {"chunks_in": len(context_items), "chunks_used": 0, "chunks_deduped": 0, "chunks_trimmed": 0}
+        for item in context_items:
+            terms = _terms(item["sentence_chunk"])
+            if self._is_duplicate(terms, kept_terms):
+                stats["chunks_deduped"] += 1
+                continue
+
+            ranked, total = self._ranked_sentences(item["sentence_chunk"], query_terms)
+            if not total:
+                continue
+            # Drop the least relevant sentences until the chunk fits
+            while True:
+                line = "- " + " ".join(sentence for _, sentence in sorted(ranked))
+                if estimate_tokens(line + "\n") <= remaining or len(ranked) == 1:
+                    break
+                ranked = ranked[:-1]
+            trimmed = len(ranked) < total
+            if estimate_tokens(line + "\n") > remaining:
+                # One sentence over the budget left (e.g. a flattened spec table without punctuation)
+                line, trimmed = _truncate(line, 4 * remaining - 1), True
+                if line is None:
+                    # A smaller chunk further down may still fit
+                    continue
+
+            lines.append(line)
+            kept_terms.append(terms)
+            remaining -= estimate_tokens(line + "\n")
+            stats["chunks_used"] += 1
+            stats["chunks_trimmed"] += int(trimmed)
+            if remaining <= 0:
+                break
+
+        context = "\n".join(lines)
+        prompt = self._prefix + PROMPT_FOOTER.format(context=context, query=query)
+        stats.update(prompt_tokens=estimate_tokens(prompt), context_tokens=estimate_tokens(context),
+                     examples=self.num_examples)
+        return prompt, stats
+
+def prompt_formatter_gemini(query: str, context_items: list[dict]) -> str:
+    """
+    Formats the query and context into a prompt for the Gemini model, with all
+    examples and every chunk verbatim (no token budget, dedup or trimming;
+    use PromptBuilder.build for that).
+
+    Args:
+        query: User query string.
+        context_items: List of dicts containing 'sentence_chunk'.
+
+    Returns:
+        Formatted prompt string.
+    """
+    # Convert context items to bullet list
+    context = "- " + "\n- ".join([item["sentence_chunk"] for item in context_items])
+    return PROMPT_HEADER + "\n" + format_examples(len(FEW_SHOT_EXAMPLES)) + PROMPT_FOOTER.format(context=context,
+                                                                                                query=query)
@@ -0,0 +1,34 @@
+import json
+
+def strip_code_fences(raw_response: str) -> str:
+    """Removes the markdown code fences Gemini tends to wrap JSON in."""
+    clean_response = raw_response.strip()
+    if clean_response.startswith("```json"):
+        clean_response = clean_response[7:]
+    if clean_response.startswith("```"):
+        clean_response = clean_response[3:]
+    if clean_response.endswith("```"):
+        clean_response = clean_response[:-3]
+    return clean_response.strip()
+
+def parse_json_response(raw_response: str) -> dict | list:
+    """
+    Parses the model's answer into JSON.
+    Args:
+        raw_response: Raw text returned by the LLM.
+    Returns:
+        The parsed JSON, or a dict with 'error' and 'raw_response' if it is not valid JSON.
+    """
+    clean_response = strip_code_fences(raw_response)
+    try:
+        return json.loads(clean_response)
+    except json.JSONDecodeError:
+        print(f"[ERROR] Failed to parse JSON: {clean_response}")
+        return {
+            "error": "Model response was not valid JSON",
+            "raw_response": clean_response
+        }
+
+def is_error_answer(answer: dict | list) -> bool:
+    """True if the parsed answer is the parse-error placeholder."""
+    return isinstance(answer, dict) and "error" in answer
@@ -1,22 +1,63 @@
 import re
-import pandas as pd
 from tqdm.auto import tqdm
-from spacy.lang.en import English
 
 class TextChunker:
     """Service for splitting text into sentence chunks."""
 
-    def __init__(self, sentence_chunk_size: int = 10, min_token_length: int = 30):
+    def __init__(self, sentence_chunk_size: int = 10, min_token_length: int = 30,
+                 batch_size: int = 64, n_process: int = 1):
+        from spacy.lang.en import English
+
         self.nlp = English()
         self.nlp.add_pipe("sentencizer")
         self.sentence_chunk_size = sentence_chunk_size
         self.min_token_length = min_token_length
+        # Pages per spaCy batch and worker processes for nlp.pipe
+        self.batch_size = batch_size
+        self.n_process = n_process
 
     @staticmethod
     def _split_list(input_list: list, slice_size: int) -> list:
         """Splits a list into sublists of size slice_size."""
         return [input_list[i:i + slice_size] for i in range(0, len(input_list), slice_size)]
 
+    @staticmethod
+    def _make_chunk(page_number: int, sentence_chunk: list[str]) -> dict:
+        """Joins a group of sentences into a chunk dict with size statistics."""
+        chunk_dict = {}
+        chunk_dict["page_number"] = page_number
+
+        # Join sentences into a paragaph
+        joined_sentence_chunk = "".join(sentence_chunk).replace("  ", " ").strip()
+        joined_sentence_chunk = re.sub(r'\.([A-Z])', r'. \1', joined_sentence_chunk)
+
+        chunk_dict["sentence_chunk"] = joined_sentence_chunk
+
+        chunk_dict["chunk_char_count"] = len(joined_sentence_chunk)
+        chunk_dict["chunk_word_count"] = len([word for word in joined_sentence_chunk.split(" ")])
+        chunk_dict["chunk_token_count"] = len(joined_sentence_chunk) / 4
+        return chunk_dict
+
+    def iter_chunks(self, pages_and_text):
+        """
+        Splits, groups and filters pages in a single pass, yielding chunk dicts
+        as soon as each page is processed. Pages are fed through spaCy's batched
+        `nlp.pipe` (across `n_process` worker processes when > 1), and the input
+        is consumed lazily so this can sit inside a streaming pipeline.
+        Args:
+            pages_and_text: Iterable of page dicts containing 'text' and 'page_number'.
+        """
+        texts_and_pages = ((item["text"], item["page_number"]) for item in pages_and_text)
+        docs = self.nlp.pipe(texts_and_pages, as_tuples=True,
+                             batch_size=self.batch_size, n_process=self.n_process)
+
+        for doc, page_number in docs:
+            sentences = [str(sentence) for sentence in doc.sents]
+            for sentence_chunk in self._split_list(input_list=sentences, slice_size=self.sentence_chunk_size):
+                chunk_dict = self._make_chunk(page_number, sentence_chunk)
+                if chunk_dict["chunk_token_count"] > self.min_token_length:
+                    yield chunk_dict
+
     def chunk(self, pages_and_text: list[dict]) -> list[dict]:
         """
         Chunks the extracted text into groups of sentences.
@@ -26,46 +67,11 @@ class TextChunker:
             List of dicts containing chunked text and metadata.
         """
         print("[INFO] Starting text chunking...")
-        
-        # 1. Split text into sentences
-        for item in tqdm(pages_and_text, desc="Splitting into sentences"):
-            item["sentences"] = list(self.nlp(item["text"]).sents)
-            item["sentences"] = [str(sentence) for sentence in item["sentences"]]
-            item["page_sentence_count_spacy"] = len(item["sentences"])
-
-        # 2. Chunk sentences
-        for item in tqdm(pages_and_text, desc="Grouping sentences"):
-            item["sentence_chunks"] = self._split_list(input_list=item["sentences"],
-                                                       slice_size=self.sentence_chunk_size)
-            item["num_chunks"] = len(item["sentence_chunks"])
-
-        # 3. Create chunk dicts
-        pages_and_chunks = []
-        for item in tqdm(pages_and_text, desc="Creating chunk objects"):
-            for sentence_chunk in item["sentence_chunks"]:
-                chunk_dict = {}
-                chunk_dict["page_number"] = item["page_number"]
-                
-                # Join sentences into a paragaph
-                joined_sentence_chunk = "".join(sentence_chunk).replace("  ", " ").strip()
-                joined_sentence_chunk = re.sub(r'\.([A-Z])', r'. \1', joined_sentence_chunk)
-
-                chunk_dict["sentence_chunk"] = joined_sentence_chunk
-
-                chunk_dict["chunk_char_count"] = len(joined_sentence_chunk)
-                chunk_dict["chunk_word_count"] = len([word for word in joined_sentence_chunk.split(" ")])
-                chunk_dict["chunk_token_count"] = len(joined_sentence_chunk) / 4
-
-                pages_and_chunks.append(chunk_dict)
-
-        # 4. Filter short chunks
-        df = pd.DataFrame(pages_and_chunks)
-        print(f"[INFO] Initial chunks: {len(df)}")
-        
-        pages_and_chunks_over_min_token_len = df[df["chunk_token_count"] > self.min_token_length].to_dict(orient="records")
-        print(f"[INFO] Chunks after filtering (token > {self.min_token_length}): {len(pages_and_chunks_over_min_token_len)}")
 
-        return pages_and_chunks_over_min_token_len
+        pages_and_chunks = list(self.iter_chunks(tqdm(pages_and_text, desc="Chunking pages")))
+        print(f"[INFO] Chunks after filtering (token > {self.min_token_length}): {len(pages_and_chunks)}")
+
+        return pages_and_chunks
 
 if __name__ == "__main__":
     import os
@@ -1,5 +1,4 @@
 import os
-import pymupdf
 from tqdm.auto import tqdm
 
 class PDFTextExtractor:
@@ -10,31 +9,64 @@ class PDFTextExtractor:
         """Formats text by replacing newlines and stripping whitespace."""
         return text.replace("\n", " ").strip()
 
-    def extract(self, pdf_path: str) -> list[dict]:
-        """Extracts text from a single PDF and returns a list of page-level text data."""
-        all_pages_text = []
+    @staticmethod
+    def _extract_tables(page) -> list[list[list]]:
+        """Returns the rows of every table PyMuPDF detects on the page (empty if detection fails)."""
+        try:
+            return [table.extract() for table in page.find_tables().tables]
+        except Exception as e:
+            print(f"[WARN] Table detection failed on page {page.number}: {e}")
+            return []
 
+    def iter_pages(self, pdf_path: str, progress_callback=None, detect_tables: bool = False,
+                   show_progress: bool = True):
+        """
+        Lazily extracts a PDF page by page, yielding one page-level dict at a time
+        so downstream stages can start before the whole document is parsed.
+        Args:
+            pdf_path: Path to the PDF file.
+            progress_callback: Optional callable(pages_done, total_pages) invoked after each page.
+            detect_tables: Also run PyMuPDF table detection and add the rows under 'tables'.
+            show_progress: Show a tqdm progress bar.
+        """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-        print(f"\n[INFO] Extracting text from: {pdf_path}")
-        doc = pymupdf.open(pdf_path)
+        import pymupdf
+
+        if show_progress:
+            print(f"\n[INFO] Extracting text from: {pdf_path}")
+        with pymupdf.open(pdf_path) as doc:
+            total_pages = len(doc)
+            pages = tqdm(doc, desc=f"Processing {os.path.basename(pdf_path)}", disable=not show_progress)
+            for page_number, page in enumerate(pages):
+                text = page.get_text()
+                formatted_text = self._format_text(text)
 
-        for page_number, page in enumerate(tqdm(doc, desc=f"Processing {os.path.basename(pdf_path)}")):
-            text = page.get_text()
-            formatted_text = self._format_text(text)
+                page_data = {
+                    "pdf_file": os.path.basename(pdf_path),
+                    "page_number": page_number,
+                    "page_char_count": len(formatted_text),
+                    "page_word_count": len(formatted_text.split(" ")),
+                    "page_sentence_count_raw": len(formatted_text.split(". ")),
+                    "page_token_count": len(formatted_text) / 4,  # Approximate token count
+                    "text": formatted_text
+                }
+                if detect_tables:
+                    page_data["tables"] = self._extract_tables(page)
+                yield page_data
 
-            all_pages_text.append({
-                "pdf_file": os.path.basename(pdf_path),
-                "page_number": page_number,
-                "page_char_count": len(formatted_text),
-                "page_word_count": len(formatted_text.split(" ")),
-                "page_sentence_count_raw": len(formatted_text.split(". ")),
-                "page_token_count": len(formatted_text) / 4,  # Approximate token count
-                "text": formatted_text
-            })
+                if progress_callback:
+                    progress_callback(page_number + 1, total_pages)
 
-        return all_pages_text
+    def extract(self, pdf_path: str, progress_callback=None) -> list[dict]:
+        """
+        Extracts text from a single PDF and returns a list of page-level text data.
+        Args:
+            pdf_path: Path to the PDF file.
+            progress_callback: Optional callable(pages_done, total_pages) invoked after each page.
+        """
+        return list(self.iter_pages(pdf_path, progress_callback))
 
 if __name__ == "__main__":
     # Example usage
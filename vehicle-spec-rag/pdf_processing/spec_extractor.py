@@ -0,0 +1,192 @@
+import re
+
+# Canonical unit -> spec type, and the spellings manuals use for each unit
+UNIT_SPEC_TYPES = {
+    "Nm": "Torque", "lb-ft": "Torque", "lb-in": "Torque", "kgf-m": "Torque",
+    "L": "Capacity", "mL": "Capacity", "qt": "Capacity",
+    "kPa": "Pressure", "psi": "Pressure", "bar": "Pressure",
+    "mm": "Dimension",
+}
+UNIT_ALIASES = {
+    "Nm": [r"N\s*[·.\-•]?\s*m", r"Nm", r"newton[\s\-]?met(?:er|re)s?"],
+    "lb-ft": [r"lb[sf]?\s*[·.\-•]?\s*ft", r"ft\s*[·.\-•]?\s*lb[sf]?", r"foot[\s\-]pounds?"],
+    "lb-in": [r"lb[sf]?\s*[·.\-•]?\s*in", r"in\s*[·.\-•]?\s*lb[sf]?", r"inch[\s\-]pounds?"],
+    "kgf-m": [r"kgf?\s*[·.\-•]?\s*m"],
+    "L": [r"L", r"lit(?:er|re)s?"],
+    "mL": [r"ml", r"mL", r"cc"],
+    "qt": [r"qts?", r"quarts?"],
+    "kPa": [r"kPa"],
+    "psi": [r"psi"],
+    "bar": [r"bar"],
+    "mm": [r"mm"],
+}
+_UNIT_PATTERNS = [(unit, re.compile(rf"^(?:{'|'.join(aliases)})$", re.IGNORECASE if unit not in ("L", "mL") else 0))
+                  for unit, aliases in UNIT_ALIASES.items()]
+_UNIT_ALTERNATION = "|".join(alias for aliases in UNIT_ALIASES.values() for alias in aliases)
+
+NUMBER = r"\d+(?:[.,]\d+)?(?:\s*[-–~]\s*\d+(?:[.,]\d+)?)?"
+# "<component> [leaders] <value> <unit>", e.g. "Brake caliper bolt .......... 35 N·m (26 lb-ft)".
+# Parentheses and dots are allowed so "bolt A (M10x1.25)" stays in one capture.
+SPEC_PATTERN = re.compile(
+    rf"(?P<component>[A-Za-z][A-Za-z0-9\-/ ,().]{{2,80}}?)\s*(?:\.{{2,}}|:|=|–|—)?\s*"
+    rf"(?P<value>{NUMBER})\s*(?P<unit>{_UNIT_ALTERNATION})(?![A-Za-z])"
+)
+VALUE_PATTERN = re.compile(rf"^\s*(?P<value>{NUMBER})\s*(?P<unit>{_UNIT_ALTERNATION})?\s*(?:\(.*\))?\s*$")
+
+# Imperative verbs that open a clause; the component is the object that follows ("tighten the lug nuts")
+_VERBS = {"tighten", "retighten", "torque", "install", "reinstall", "remove", "check", "inspect", "adjust",
+          "fill", "refill", "inflate", "replace", "loosen", "set", "measure", "apply", "add", "drain",
+          "secure", "fasten", "attach", "connect", "disconnect", "use", "ensure", "make"}
+# Words stripped from the edges of a component phrase
+_LEADING_WORDS = {"and", "or", "then", "the", "to", "a", "an", "of", "for", "each", "all", "new", "specified"}
+_TRAILING_WORDS = {"and", "or", "then", "the", "to", "at", "is", "are", "of", "with", "torque", "tightening",
+                   "specification", "spec", "approximately", "approx"}
+_MINOR_WORDS = {"and", "or", "of", "to", "for", "the", "a", "an", "with", "in", "on"}
+# A phrase made only of these names a kind of spec, not a component ("Torque: 35 Nm")
+_SPEC_WORDS = {"torque", "pressure", "capacity", "capacities", "tightening", "specification", "specifications",
+               "spec", "specs", "value", "values", "amount", "total", "approximately", "approx"}
+# Fasteners too generic to identify anything on their own ("Tighten the bolts to 35 N·m")
+_GENERIC_PARTS = {"bolt", "bolts", "nut", "nuts", "screw", "screws", "stud", "studs", "fastener", "fasteners"}
+# Document references that precede stray numbers ("Page 12 400 mm")
+_REFERENCE_WORDS = {"page", "fig", "figure", "table", "step", "section", "chapter", "see", "refer"}
+# Words that make the phrase a sentence rather than a name ("Check the oil level is between 2 and 5 mm")
+_CLAUSE_WORDS = {"is", "are", "be", "was", "were", "will", "should", "must", "between", "if", "when", "until", "than"}
+
+def normalize_unit(unit: str) -> str | None:
+    """Maps a unit spelling ('N·m', 'ft-lbs', 'litres', ...) to its canonical form, or None if unknown."""
+    unit = unit.strip()
+    for canonical, pattern in _UNIT_PATTERNS:
+        if pattern.match(unit):
+            return canonical
+    return None
+
+def _trim(words: list[str]) -> list[str]:
+    start, end = 0, len(words)
+    while start < end and (words[start].lower() in _LEADING_WORDS or words[start].isdigit()):
+        start += 1
+    while end > start and (words[end - 1].lower() in _TRAILING_WORDS or words[end - 1].isdigit()):
+        end -= 1
+    return words[start:end]
+
+def _object_phrase(words: list[str]) -> list[str]:
+    """The noun phrase a clause acts on: the words after its last verb ("Remove the wheel and tighten the lug nuts")."""
+    verbs = [i for i, word in enumerate(words) if word.lower() in _VERBS]
+    if not verbs:
+        return _trim(words)
+    phrase = _trim(words[verbs[-1] + 1:])
+    if not phrase:
+        # "Remove bolt A and tighten to 45 Nm": the object was named by the previous clause
+        phrase = _trim(words[verbs[-2] + 1 if len(verbs) > 1 else 0:verbs[-1]])
+    return phrase
+
+def normalize_component(name: str) -> str:
+    """Cleans a captured component phrase and title-cases it like the prompt examples."""
+    name = re.sub(r"\([^)]*\)", " ", name)
+    # An unmatched ")" closes a conversion that started before the capture ("(129 lb-ft) Engine oil ...")
+    name = name.rsplit(")", 1)[-1]
+    name = re.sub(r"[\s,:]+", " ", name).strip(" -/(")
+    # Only the trailing clause names the component ("Remove the wheel. Tighten the lug nut")
+    name = re.split(r"\.\s|;\s", name)[-1].strip(" .")
+    words = []
+    for i, word in enumerate(_object_phrase(name.split())):
+        if i and word.lower() in _MINOR_WORDS and not (len(word) == 1 and word.isupper()):
+            words.append(word.lower())
+        elif word.isupper() and len(word) > 1:
+            words.append(word)  # keep acronyms such as ABS or EGR
+        else:
+            words.append("-".join(part[:1].upper() + part[1:].lower() for part in word.split("-")))
+    return " ".join(words)
+
+def _normalize_value(value: str) -> str:
+    return re.sub(r"\s*[-–~]\s*", "-", value.replace(",", ".")).strip()
+
+def _is_component(name: str) -> bool:
+    """True for a real component noun phrase, False for sentence fragments left over by the regex."""
+    words = name.lower().split()
+    if not words or len(words) > 8:
+        return False
+    # At least one real word that is not a spec word ("Torque", "V", "Capacity")
+    if not any(sum(ch.isalpha() for ch in word) >= 3 and word not in _SPEC_WORDS and word not in _MINOR_WORDS
+               for word in words):
+        return False
+    if words[0] in _REFERENCE_WORDS or any(word in _CLAUSE_WORDS for word in words):
+        return False
+    # A bare number inside the phrase is another value, not part of a name ("Charge to 12 V")
+    if any(re.fullmatch(r"\d+(?:[.,]\d+)?", word) for word in words):
+        return False
+    return not all(word in _GENERIC_PARTS for word in words)
+
+class SpecExtractor:
+    """
+    Pulls (component, spec_type, value, unit) records out of manual text and
+    detected tables, with normalized component names and canonical units.
+    """
+
+    def extract_from_text(self, text: str, pdf_file: str, page_number: int) -> list[dict]:
+        """
+        Extracts specs written inline, e.g. "Tighten the lower ball joint nut to 175 N·m".
+        A value in parentheses right after another one (the imperial conversion) is skipped.
+        """
+        specs = []
+        for match in SPEC_PATTERN.finditer(text):
+            if match.group("component").rstrip().endswith("("):
+                continue  # a conversion in parentheses, "35 N·m (26 lb-ft)"
+            unit = normalize_unit(match.group("unit"))
+            component = normalize_component(match.group("component"))
+            if unit is None or not _is_component(component):
+                continue
+            specs.append(self._make_spec(component, unit, match.group("value"), pdf_file, page_number, "text"))
+        return specs
+
+    def extract_from_tables(self, tables: list[list[list]], pdf_file: str, page_number: int) -> list[dict]:
+        """
+        Extracts specs from table rows (as returned by PyMuPDF `Table.extract()`).
+        Handles rows with a unit in the value cell ("35 N·m") and tables whose
+        header row names the unit of each column ("Item | N·m | lb-ft").
+        """
+        specs = []
+        for rows in tables:
+            if not rows:
+                continue
+            header_units = [normalize_unit(str(cell or "")) for cell in rows[0]]
+            for row in rows[1:] if any(header_units) else rows:
+                cells = [str(cell or "").replace("\n", " ").strip() for cell in row]
+                component_cell = next((cell for cell in cells if cell and not VALUE_PATTERN.match(cell)), None)
+                if component_cell is None:
+                    continue
+                component = normalize_component(component_cell)
+                if not _is_component(component):
+                    continue
+                for column, cell in enumerate(cells):
+                    match = VALUE_PATTERN.match(cell)
+                    if not match:
+                        continue
+                    unit = normalize_unit(match.group("unit")) if match.group("unit") else (
+                        header_units[column] if column < len(header_units) else None)
+                    if unit:
+                        # Conversion columns (N·m and lb-ft) are kept too; lookups prefer metric
+                        specs.append(self._make_spec(component, unit, match.group("value"), pdf_file, page_number, "table"))
+        return specs
+
+    @staticmethod
+    def _make_spec(component: str, unit: str, value: str, pdf_file: str, page_number: int, source: str) -> dict:
+        return {
+            "component": component,
+            "spec_type": UNIT_SPEC_TYPES[unit],
+            "value": _normalize_value(value),
+            "unit": unit,
+            "pdf_file": pdf_file,
+            "page_number": int(page_number),
+            "source": source
+        }
+
+if __name__ == "__main__":
+    extractor = SpecExtractor()
+    sample = ("Install the brake caliper. Tighten the brake caliper bolts to 35 N·m (26 lb-ft). "
+              "Lower ball joint nut ........ 175 N·m (129 lb-ft) "
+              "Engine oil capacity with filter: 4.7 L")
+    for spec in extractor.extract_from_text(sample, "sample.pdf", 0):
+        print(spec)
+    table = [["Component", "N·m", "lb-ft"], ["Tie-rod end nut", "115", "85"], ["Wheel speed sensor bolt", "18", "13"]]
+    for spec in extractor.extract_from_tables([table], "sample.pdf", 1):
+        print(spec)
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+class AdmissionRejectedError(Exception):
+    """Raised when a stage is saturated: its wait queue is full or the wait timed out."""
+
+    def __init__(self, stage: str, reason: str, retry_after: float):
+        super().__init__(f"The {stage} stage is overloaded ({reason.replace('_', ' ')}); retry in {retry_after:g}s.")
+        self.stage = stage
+        # 'queue_full' (reject immediately) or 'timeout' (waited too long for a slot)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Waiter:
+    """One queued caller: a thread waiting on an Event or a coroutine awaiting a Future."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+class AdmissionController:
+    """
+    Caps concurrent calls into one stage (embedding, vector search, LLM).
+
+    Up to `max_concurrency` calls run at once. Further callers wait in a FIFO
+    queue of at most `max_queue` entries; a free slot is handed directly to the
+    oldest waiter. A caller is rejected with AdmissionRejectedError when the
+    queue is full or after waiting `queue_timeout` seconds, so a burst is
+    turned away early instead of piling up threads behind a slow dependency.
+
+    Threads (`admit`) and coroutines (`admit_async`) share the same slots;
+    coroutines wait without holding a thread.
+    """
+
+    def __init__(self, stage: str, max_concurrency: int, max_queue: int = 0, queue_timeout: float = 5.0,
+                 retry_after: float = 1.0):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        ADMISSION_IN_FLIGHT.set(self.active, stage=self.stage)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), stage=self.stage)
+
+    def _reject(self, reason: str):
+        """Counts a rejection and raises it. Called with the lock held."""
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(stage=self.stage, reason=reason)
+        raise AdmissionRejectedError(self.stage, reason, self.retry_after)
+
+    def _try_enter(self, loop: asyncio.AbstractEventLoop = None) -> _Waiter | None:
+        """Takes a free slot (returns None) or queues the caller (returns its waiter). Called with the lock held."""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            self._publish()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+        waiter = _Waiter(loop)
+        self._waiters.append(waiter)
+        self._publish()
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Leaves the queue after a timeout or cancellation. Returns True if a slot
+        was handed over in the meantime (the caller now owns it). Called with the lock held.
+        """
+        if waiter.granted:
+            return True
+        self._waiters.remove(waiter)
+        self._publish()
+        return False
+
+    def release(self):
+        """Frees a slot, handing it to the oldest waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.admitted += 1
+                waiter.wake()
+            else:
+                self.active -= 1
+            self._publish()
+
+    def check(self):
+        """Raises AdmissionRejectedError if a new caller would be turned away right now (no slot is taken)."""
+        with self._lock:
+            if self.active >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+                self._reject("queue_full")
+
+    def acquire(self):
+        """
+        Takes a slot, waiting in the queue if needed (blocking the thread). The caller
+        must `release` it, possibly from another thread once its work has really finished.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            waiter = self._try_enter()
+        if waiter is not None:
+            waiter.event.wait(self.queue_timeout)
+            with self._lock:
+                if not self._abandon(waiter):
+                    self._reject("timeout")
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, stage=self.stage)
+
+    @contextmanager
+    def admit(self):
+        """Runs the block in a slot, waiting in the queue if needed (blocking the thread)."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def admit_async(self):
+        """Like `admit`, but waits on the event loop instead of blocking a thread."""
+        start = time.perf_counter()
+        with self._lock:
+            waiter = self._try_enter(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if not self._abandon(waiter):
+                        self._reject("timeout")
+            except asyncio.CancelledError:
+                # The client went away while queued; give back a slot that was already handed over
+                with self._lock:
+                    granted = self._abandon(waiter)
+                if granted:
+                    self.release()
+                raise
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, stage=self.stage)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_concurrency": self.max_concurrency, "max_queue": self.max_queue, "in_flight": self.active,
+                    "queued": len(self._waiters), "admitted": self.admitted, "rejected": dict(self.rejected)}
@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from vectorstore.query_cache import QueryEmbeddingCache
+
+class AnswerCache:
+    """
+    Caches parsed LLM answers for exact and near-duplicate queries.
+
+    Exact matches are found by normalized query text; near-duplicates by cosine
+    similarity of query embeddings above `similarity_threshold`. Every entry is
+    tagged with the index version it was answered against, and the whole cache is
+    dropped as soon as a lookup sees a newer version. Answers computed against
+    any other version than the current one are not stored. Entries expire after
+    `ttl_seconds` and the least recently used ones are evicted once either
+    `max_entries` or the approximate `max_bytes` budget is exceeded.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600,
+                 max_entries: int = 1000, max_bytes: int = 16 * 1024 * 1024):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_stores = 0
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        # Stacked unit vectors of all entries, rebuilt lazily after changes
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+        self._matrix = None
+
+    def _check_version(self, index_version):
+        if self._version != index_version:
+            if self._entries:
+                self.invalidations += 1
+                print(f"[INFO] Index version changed ({self._version} -> {index_version}). Clearing answer cache.")
+            self._entries.clear()
+            self._bytes = 0
+            self._matrix = None
+            self._version = index_version
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            self._remove(key)
+
+    def _nearest(self, unit_vector: np.ndarray) -> tuple[str | None, float]:
+        if not self._entries:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.vstack([self._entries[key]["embedding"] for key in self._matrix_keys])
+        similarities = self._matrix @ unit_vector
+        best = int(np.argmax(similarities))
+        return self._matrix_keys[best], float(similarities[best])
+
+    def lookup(self, query: str, query_embedding, index_version) -> tuple[dict | list, float] | None:
+        """
+        Finds a cached answer for the query.
+        Args:
+            query: The user query string.
+            query_embedding: The query's embedding vector.
+            index_version: Current version of the collection being queried.
+        Returns:
+            Tuple of (answer, similarity) on a hit, otherwise None.
+        """
+        key = QueryEmbeddingCache.normalize(query)
+        now = time.time()
+        with self._lock:
+            self._check_version(index_version)
+            self._purge_expired(now)
+
+            similarity = 1.0
+            if key not in self._entries:
+                key, similarity = self._nearest(self._unit(query_embedding))
+                if key is None or similarity < self.similarity_threshold:
+                    self.misses += 1
+                    return None
+                self.semantic_hits += 1
+            else:
+                self.hits += 1
+
+            self._entries.move_to_end(key)
+            return self._entries[key]["answer"], similarity
+
+    def store(self, query: str, query_embedding, index_version, answer: dict | list):
+        """Caches an answer computed against `index_version`, unless the index has changed since."""
+        key = QueryEmbeddingCache.normalize(query)
+        embedding = self._unit(query_embedding)
+        size = len(json.dumps(answer)) + embedding.nbytes + len(key)
+        with self._lock:
+            # Only lookups move the version: an answer read before a concurrent ingestion is
+            # stale, and letting it reset the version would wipe the cache twice
+            if index_version != self._version:
+                self.stale_stores += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": embedding,
+                "expires_at": time.time() + self.ttl_seconds,
+                "size": size
+            }
+            self._bytes += size
+            self._matrix = None
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self):
+        """Drops all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._matrix = None
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "stale_stores": self.stale_stores,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else None
+        }
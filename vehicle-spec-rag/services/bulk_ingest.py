@@ -0,0 +1,377 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Ensure we can import modules from project root when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from services.ingestion import IngestionService
+from vectorstore.aliases import CollectionAliases
+from vectorstore.base import VectorStore, create_vector_store
+from vectorstore.bm25_index import BM25Index
+from vectorstore.spec_index import SpecIndex
+
+# Extract/chunk state of each worker process, built once by _init_worker
+_worker = {}
+
+def _init_worker(chunker_batch_size: int):
+    from pdf_processing.chunker import TextChunker
+    from pdf_processing.extract_text import PDFTextExtractor
+    from pdf_processing.spec_extractor import SpecExtractor
+
+    _worker["extractor"] = PDFTextExtractor()
+    _worker["chunker"] = TextChunker(batch_size=chunker_batch_size)
+    _worker["spec_extractor"] = SpecExtractor()
+
+def extract_and_chunk(file_path: str, extract_specs: bool) -> dict:
+    """
+    Worker task: hashes, extracts and chunks one manual (and pulls its specs).
+    Returns:
+        Dict with 'pdf_file', 'file_hash', 'pages', 'chunks' (with IDs, no embeddings),
+        'specs' and the worker 'seconds'.
+    """
+    start = time.perf_counter()
+    pdf_file = os.path.basename(file_path)
+    file_hash = IngestionService._hash_file(file_path)
+    spec_extractor = _worker["spec_extractor"]
+    specs, pages = [], 0
+
+    def iter_pages():
+        nonlocal pages
+        for page in _worker["extractor"].iter_pages(file_path, detect_tables=extract_specs, show_progress=False):
+            pages += 1
+            if extract_specs:
+                specs.extend(spec_extractor.extract_from_tables(page.get("tables", []), pdf_file, page["page_number"]))
+            yield page
+
+    chunks, seen_ids = [], set()
+    for chunk in _worker["chunker"].iter_chunks(iter_pages()):
+        chunk["pdf_file"] = pdf_file
+        chunk["file_hash"] = file_hash
+        chunk["id"] = VectorStore.make_chunk_id(pdf_file, chunk["page_number"], chunk["sentence_chunk"])
+        if chunk["id"] in seen_ids:
+            continue
+        seen_ids.add(chunk["id"])
+        if extract_specs:
+            specs.extend(spec_extractor.extract_from_text(chunk["sentence_chunk"], pdf_file, chunk["page_number"]))
+        chunks.append(chunk)
+
+    return {"pdf_file": pdf_file, "file_hash": file_hash, "pages": pages, "chunks": chunks, "specs": specs,
+            "seconds": time.perf_counter() - start}
+
+class IngestCheckpoint:
+    """
+    JSON record of finished manuals, keyed by file name, with the size and mtime
+    they were ingested at. Written atomically after every durable flush.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f).get("files", {})
+            done = sum(1 for entry in self.files.values() if entry["status"] == "done")
+            print(f"[INFO] Resuming from checkpoint {path} ({done} manuals already done).")
+
+    @staticmethod
+    def _fingerprint(file_path: str) -> dict:
+        stat = os.stat(file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_done(self, file_path: str) -> bool:
+        entry = self.files.get(os.path.basename(file_path))
+        return bool(entry) and entry["status"] == "done" and all(
+            entry.get(key) == value for key, value in self._fingerprint(file_path).items())
+
+    def mark(self, file_path: str, status: str, **details):
+        self.files[os.path.basename(file_path)] = {"status": status, **self._fingerprint(file_path), **details}
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"files": self.files}, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+class BulkIngester:
+    """
+    Indexes a whole corpus of manuals.
+
+    Extraction and chunking run in a process pool. Chunks from all manuals are
+    pooled and embedded in large shared batches, then written to the vector
+    store (and BM25 index) in bulk. A manual is finalized once all its new
+    chunks are written: unchanged chunks are re-stamped, stale ones deleted
+    and its specs replaced. The stores are flushed and only then is the
+    manual recorded in the checkpoint, so an interrupted run resumes at the
+    first unfinished manual. Chunks a crashed run already wrote are
+    recognized by their content IDs and not embedded again.
+    """
+
+    def __init__(self, vector_store: VectorStore, embedding_service, checkpoint: IngestCheckpoint,
+                 lexical_index: BM25Index = None, spec_index: SpecIndex = None, workers: int = 4,
+                 flush_chunks: int = 2048, embed_batch_size: int = 64, chunker_batch_size: int = 64,
+                 collection_name: str = "vehicle_manuals"):
+        self.vector_store = vector_store
+        self.embedding_service = embedding_service
+        self.checkpoint = checkpoint
+        self.lexical_index = lexical_index
+        self.spec_index = spec_index
+        self.workers = workers
+        # Pooled chunks that trigger an embed + write, and the model's batch size
+        self.flush_chunks = flush_chunks
+        self.embed_batch_size = embed_batch_size
+        self.chunker_batch_size = chunker_batch_size
+        self.collection_name = collection_name
+        self._buffer: list[tuple[dict, dict]] = []
+        self._ready: list[dict] = []
+        self._report: dict = {}
+
+    def _accept(self, file_path: str, result: dict, submitted_at: float):
+        """Diffs a chunked manual against the store and queues its new chunks for embedding."""
+        existing_ids, _ = self.vector_store.get_file_state(result["pdf_file"], self.collection_name)
+        new_chunks = [c for c in result["chunks"] if c["id"] not in existing_ids]
+        state = {"file_path": file_path, "result": result, "existing_ids": existing_ids,
+                 "new": len(new_chunks), "pending": len(new_chunks), "submitted_at": submitted_at}
+        self._buffer.extend((state, chunk) for chunk in new_chunks)
+        if not new_chunks:
+            self._ready.append(state)
+
+    def _write_buffer(self):
+        """Embeds all pooled chunks in one call and writes them in bulk."""
+        if not self._buffer:
+            return
+        chunks = [chunk for _, chunk in self._buffer]
+        start = time.perf_counter()
+        embeddings = self.embedding_service.generate_embeddings([c["sentence_chunk"] for c in chunks],
+                                                                batch_size=self.embed_batch_size)
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk["embedding"] = embedding.tolist()
+        self._report["embed_seconds"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.vector_store.upsert_documents(chunks, self.collection_name)
+        if self.lexical_index:
+            self.lexical_index.upsert([c["id"] for c in chunks], [c["sentence_chunk"] for c in chunks],
+                                      self.collection_name)
+        self._report["store_seconds"] += time.perf_counter() - start
+
+        for state, _ in self._buffer:
+            state["pending"] -= 1
+            if state["pending"] == 0:
+                self._ready.append(state)
+        self._buffer = []
+
+    def _flush(self):
+        """Writes pooled chunks, finalizes complete manuals, persists the stores, then checkpoints."""
+        self._write_buffer()
+        if not self._ready:
+            return
+        start = time.perf_counter()
+        for state in self._ready:
+            result = state["result"]
+            seen_ids = {c["id"] for c in result["chunks"]}
+            unchanged = [c for c in result["chunks"] if c["id"] in state["existing_ids"]]
+            stale_ids = list(state["existing_ids"] - seen_ids)
+            self.vector_store.update_metadatas(unchanged, self.collection_name)
+            self.vector_store.delete_documents(stale_ids, self.collection_name)
+            if self.lexical_index:
+                self.lexical_index.delete(stale_ids, self.collection_name)
+            if self.spec_index:
+                self.spec_index.replace_file(result["pdf_file"], result["specs"], self.collection_name)
+            state["deleted"] = len(stale_ids)
+
+        self.vector_store.flush(self.collection_name)
+        if self.lexical_index:
+            self.lexical_index.flush(self.collection_name)
+        if self.spec_index:
+            self.spec_index.flush(self.collection_name)
+        self._report["store_seconds"] += time.perf_counter() - start
+
+        # Only now is the work durable
+        now = time.perf_counter()
+        for state in self._ready:
+            result = state["result"]
+            entry = {"pages": result["pages"], "chunks": len(result["chunks"]), "added": state["new"],
+                     "unchanged": len(result["chunks"]) - state["new"], "deleted": state["deleted"],
+                     "extract_chunk_seconds": round(result["seconds"], 3),
+                     "total_seconds": round(now - state["submitted_at"], 3)}
+            self.checkpoint.mark(state["file_path"], "done", **entry)
+            self._report["per_file"].append({"pdf_file": result["pdf_file"], **entry})
+        self.checkpoint.save()
+        self._ready = []
+
+    def run(self, file_paths: list[str]) -> dict:
+        """
+        Ingests every manual not already done according to the checkpoint.
+        Returns:
+            Report with totals, throughput, per-file timings and failures.
+        """
+        self._report = {"embed_seconds": 0.0, "store_seconds": 0.0, "per_file": [], "failures": [],
+                        "skipped": 0, "interrupted": False}
+        todo = []
+        for path in file_paths:
+            if self.checkpoint.is_done(path):
+                self._report["skipped"] += 1
+            else:
+                todo.append(path)
+        print(f"[INFO] {len(todo)} manuals to ingest, {self._report['skipped']} already done.")
+
+        start = time.perf_counter()
+        extract_specs = self.spec_index is not None
+        # 'spawn' keeps workers free of the parent's model threads and works the same on every OS
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker, initargs=(self.chunker_batch_size,))
+        in_flight = {}
+        try:
+            while todo or in_flight:
+                # Keep a bounded number of manuals in flight so chunk memory stays bounded
+                while todo and len(in_flight) < self.workers * 2:
+                    path = todo.pop(0)
+                    in_flight[pool.submit(extract_and_chunk, path, extract_specs)] = (path, time.perf_counter())
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, submitted_at = in_flight.pop(future)
+                    try:
+                        self._accept(path, future.result(), submitted_at)
+                    except Exception as e:
+                        print(f"[ERROR] Failed to process {path}: {e}")
+                        self.checkpoint.mark(path, "failed", error=str(e))
+                        self._report["failures"].append({"pdf_file": os.path.basename(path), "error": str(e)})
+                if len(self._buffer) >= self.flush_chunks:
+                    self._flush()
+                    done_count = len(self._report["per_file"])
+                    print(f"[INFO] {done_count} manuals done, {len(todo) + len(in_flight)} remaining.")
+        except KeyboardInterrupt:
+            print("[WARN] Interrupted; saving finished manuals. Re-run the same command to resume.")
+            self._report["interrupted"] = True
+        finally:
+            pool.shutdown(wait=not self._report["interrupted"], cancel_futures=True)
+
+        # Manuals whose chunks all arrived are finished even after an interrupt
+        self._flush()
+        self.checkpoint.save()
+        return self._summarize(time.perf_counter() - start)
+
+    def _summarize(self, wall_seconds: float) -> dict:
+        report = self._report
+        per_file = report["per_file"]
+        pages = sum(f["pages"] for f in per_file)
+        chunks = sum(f["chunks"] for f in per_file)
+        return {
+            "manuals_done": len(per_file),
+            "manuals_skipped": report["skipped"],
+            "manuals_failed": len(report["failures"]),
+            "interrupted": report["interrupted"],
+            "pages": pages,
+            "chunks": chunks,
+            "added": sum(f["added"] for f in per_file),
+            "deleted": sum(f["deleted"] for f in per_file),
+            "wall_seconds": round(wall_seconds, 3),
+            "pages_per_sec": round(pages / wall_seconds, 1) if wall_seconds else None,
+            "chunks_per_sec": round(chunks / wall_seconds, 1) if wall_seconds else None,
+            "embed_seconds": round(report["embed_seconds"], 3),
+            "store_seconds": round(report["store_seconds"], 3),
+            "per_file": per_file,
+            "failures": report["failures"]
+        }
+
+def find_manuals(paths: list[str], recursive: bool = False) -> list[str]:
+    """Expands files and directories into a sorted list of PDFs, keeping one per file name."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                found.extend(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+            else:
+                found.extend(os.path.join(path, name) for name in os.listdir(path))
+        else:
+            found.append(path)
+
+    # Chunks are keyed by file name, so two manuals with the same name would overwrite each other
+    manuals, names = [], {}
+    for path in sorted(p for p in found if p.lower().endswith(".pdf")):
+        name = os.path.basename(path)
+        if name in names:
+            print(f"[WARN] Skipping {path}: same file name as {names[name]}.")
+            continue
+        names[name] = path
+        manuals.append(path)
+    return manuals
+
+def print_report(report: dict, top: int = 20):
+    print(f"\n[RESULT] {report['manuals_done']} manuals ingested, {report['manuals_skipped']} skipped, "
+          f"{report['manuals_failed']} failed{' (interrupted)' if report['interrupted'] else ''}")
+    print(f"[RESULT] {report['pages']} pages, {report['chunks']} chunks ({report['added']} new, "
+          f"{report['deleted']} deleted) in {report['wall_seconds']:.1f}s: {report['pages_per_sec']} pages/s, "
+          f"{report['chunks_per_sec']} chunks/s (embed {report['embed_seconds']:.1f}s, "
+          f"store {report['store_seconds']:.1f}s)")
+    if report["per_file"]:
+        print(f"\n{'slowest manuals':<48}{'pages':>7}{'chunks':>8}{'new':>7}{'extract+chunk':>15}{'total':>9}")
+        for f in sorted(report["per_file"], key=lambda f: -f["total_seconds"])[:top]:
+            print(f"{f['pdf_file'][:46]:<48}{f['pages']:>7}{f['chunks']:>8}{f['added']:>7}"
+                  f"{f['extract_chunk_seconds']:>14.2f}s{f['total_seconds']:>8.2f}s")
+    for failure in report["failures"]:
+        print(f"[FAILED] {failure['pdf_file']}: {failure['error']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-ingest a corpus of PDF manuals (resumable).")
+    parser.add_argument("paths", nargs="+", help="PDF files and/or directories of PDFs.")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--collection", default="vehicle_manuals")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Extract/chunk processes.")
+    parser.add_argument("--flush-chunks", type=int, default=2048, help="Pooled chunks per embed + write.")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="Model batch size.")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (default: data/bulk_ingest_<collection>.json).")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and re-check every manual.")
+    parser.add_argument("--report", default=None, help="Also write the full report as JSON.")
+    args = parser.parse_args()
+
+    manuals = find_manuals(args.paths, args.recursive)
+    # Write into the version currently served; a later rebuild starts a new checkpoint
+    collection = CollectionAliases(settings.COLLECTION_ALIASES_PATH).resolve(args.collection)
+    checkpoint_path = args.checkpoint or os.path.join(settings.BASE_DIR, "data", f"bulk_ingest_{collection}.json")
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    # Same stores and settings as the API; run it while the API is stopped (its indexes load at startup)
+    from vectorstore.embeddings import EmbeddingService
+
+    embedder = EmbeddingService(cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                                cache_max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                                backend=settings.EMBEDDING_BACKEND, num_threads=settings.EMBEDDING_NUM_THREADS,
+                                min_cosine=settings.EMBEDDING_MIN_COSINE,
+                                onnx_file_name=settings.EMBEDDING_ONNX_FILE or None)
+    if settings.VECTOR_STORE_BACKEND == "numpy":
+        vector_store = create_vector_store("numpy", settings.NUMPY_STORE_PATH,
+                                           quantization=settings.VECTOR_QUANTIZATION,
+                                           rescore_multiplier=settings.VECTOR_RESCORE_MULTIPLIER,
+                                           rescore_dtype=settings.VECTOR_RESCORE_DTYPE)
+    else:
+        vector_store = create_vector_store(settings.VECTOR_STORE_BACKEND, settings.CHROMA_DB_PATH)
+
+    ingester = BulkIngester(
+        vector_store,
+        embedder,
+        IngestCheckpoint(checkpoint_path),
+        lexical_index=BM25Index(settings.LEXICAL_INDEX_PATH) if settings.RETRIEVAL_MODE == "hybrid" else None,
+        spec_index=SpecIndex(settings.SPEC_INDEX_PATH, min_confidence=settings.SPEC_INDEX_MIN_CONFIDENCE)
+        if settings.SPEC_INDEX_ENABLED else None,
+        workers=args.workers,
+        flush_chunks=args.flush_chunks,
+        embed_batch_size=args.embed_batch_size,
+        chunker_batch_size=settings.CHUNKER_BATCH_SIZE,
+        collection_name=collection
+    )
+    report = ingester.run(manuals)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {args.report}")
+    sys.exit(130 if report["interrupted"] else 1 if report["failures"] else 0)
@@ -1,61 +1,242 @@
-
 import os
-import shutil
-from typing import List
+import hashlib
 
 from pdf_processing.extract_text import PDFTextExtractor
 from pdf_processing.chunker import TextChunker
+from pdf_processing.spec_extractor import SpecExtractor
 from vectorstore.embeddings import EmbeddingService
-from vectorstore.chroma_db import ChromaDBService
+from vectorstore.base import VectorStore
+from vectorstore.bm25_index import BM25Index
+from vectorstore.spec_index import SpecIndex
+from vectorstore.aliases import CollectionAliases
+from services.pipeline import StreamingPipeline
+from services.metrics import span, observe, INGESTED_CHUNKS
 
 class IngestionService:
     """Orchestrates the data ingestion pipeline."""
 
-    def __init__(self, chroma_service: ChromaDBService, embedding_service: EmbeddingService):
-        self.chroma_service = chroma_service
+    def __init__(self, vector_store: VectorStore, embedding_service: EmbeddingService,
+                 embed_batch_size: int = 256, queue_size: int = 4, chunker: TextChunker = None,
+                 lexical_index: BM25Index = None, spec_index: SpecIndex = None,
+                 aliases: CollectionAliases = None):
+        self.vector_store = vector_store
+        # Optional alias map: full rebuilds go to a shadow version that is swapped in when complete
+        self.aliases = aliases
+        # Optional BM25 index kept in step with the vector store for hybrid retrieval
+        self.lexical_index = lexical_index
+        # Optional structured spec index, filled from chunk text and detected tables
+        self.spec_index = spec_index
+        self.spec_extractor = SpecExtractor()
         self.embedding_service = embedding_service
         self.pdf_extractor = PDFTextExtractor()
-        self.chunker = TextChunker()
+        self.chunker = chunker or TextChunker()
+        # Chunks per embedding/write batch and max batches buffered between stages
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+
+    @staticmethod
+    def _hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+        """Returns the SHA-256 hex digest of a file's bytes."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _report(progress, stage: str, done: int, total: int | None):
+        """Forwards a progress update if a callback was given."""
+        if progress:
+            progress(stage, done, total)
 
-    def process_file(self, file_path: str, collection_name: str = "vehicle_manuals"):
+    def process_file(self, file_path: str, collection_name: str = "vehicle_manuals", incremental: bool = True,
+                     progress=None) -> dict:
         """
-        Full pipeline:
-        1. Extract Text
-        2. Chunk Text
+        Full pipeline, streamed so the stages overlap:
+        1. Extract Text (page by page)
+        2. Chunk Text (batches of `embed_batch_size` chunks)
         3. Embed Chunks
-        4. Reset DB & Store
+        4. Store
+
+        Pages, chunk batches and embedding batches flow through bounded queues
+        (`queue_size` items deep), so embeddings are written while later pages are
+        still being parsed and peak memory does not grow with the manual size.
+
+        In incremental mode (default) chunk IDs are content hashes of the manual,
+        page and chunk text. Only new chunks are embedded and upserted, chunks that
+        disappeared from the manual are deleted, and other manuals are untouched.
+        Re-uploading an unchanged manual is a no-op.
+        With incremental=False the collection is rebuilt from this file. With
+        aliases the rebuild is written into a new shadow version and the alias is
+        swapped to it only once it is complete, so queries keep hitting the old
+        version meanwhile; without aliases the collection is reset in place.
+
+        Args:
+            file_path: Path to the PDF manual.
+            collection_name: Target collection.
+            incremental: Diff against the indexed chunks instead of rebuilding.
+            progress: Optional callable(stage, done, total) where stage is one of
+                'pages_extracted', 'chunks_embedded' or 'vectors_written'.
+
+        Returns:
+            Dict with counts of total, added, deleted and unchanged chunks, per
+            pipeline stage the items produced and wall/busy seconds under 'stages',
+            and the physical 'collection' written to.
         """
+        if self.aliases is None:
+            if not incremental:
+                self.reset_collection(collection_name)
+            return self._ingest(file_path, collection_name, incremental, progress)
+
+        if incremental:
+            # Pin the live version so a concurrent swap cannot drop it under the writes
+            with self.aliases.acquire(collection_name) as physical:
+                return self._ingest(file_path, physical, incremental, progress)
+
+        shadow = self.aliases.new_version(collection_name)
+        print(f"[INFO] Rebuilding '{collection_name}' into shadow collection '{shadow}'")
+        try:
+            result = self._ingest(file_path, shadow, incremental, progress)
+        except Exception:
+            self.drop_collection(shadow)
+            raise
+        self.aliases.swap(collection_name, shadow)
+        return result
+
+    def reset_collection(self, collection_name: str):
+        """Empties a collection and its lexical and spec indexes in place."""
+        self.vector_store.reset_collection(collection_name)
+        if self.lexical_index:
+            self.lexical_index.reset(collection_name)
+        if self.spec_index:
+            self.spec_index.reset(collection_name)
+
+    def drop_collection(self, collection_name: str):
+        """Deletes a (retired or abandoned) collection from the vector store and both indexes."""
+        self.vector_store.drop_collection(collection_name)
+        if self.lexical_index:
+            self.lexical_index.drop(collection_name)
+        if self.spec_index:
+            self.spec_index.drop(collection_name)
+
+    def _ingest(self, file_path: str, collection_name: str, incremental: bool, progress) -> dict:
+        """Runs the pipeline for one file against a physical collection (see `process_file`)."""
         print(f"[INFO] Starting ingestion for: {file_path}")
-        
-        # 1. Extract
-        pdf_data = self.pdf_extractor.extract(file_path)
-        print(f"[INFO] Extracted {len(pdf_data)} pages.")
-        
-        # 2. Chunk
-        # TextChunker.chunk expects a list of dicts with 'text' and 'page_number'
-        # which is exactly what PDFTextExtractor.extract returns.
-        all_chunks = self.chunker.chunk(pdf_data)
-        
-        # Add pdf_file metadata
-        for chunk in all_chunks:
-            chunk["pdf_file"] = os.path.basename(file_path)
-        
-        print(f"[INFO] Created {len(all_chunks)} chunks.")
-        
-        
-        # 3. Embed
-        # Extract just texts for embedding
-        texts = [c["sentence_chunk"] for c in all_chunks]
-        embeddings = self.embedding_service.generate_embeddings(texts)
-        
-        # Add embeddings back to chunk dicts
-        for i, chunk in enumerate(all_chunks):
-            # Convert numpy to list for Chroma
-            chunk["embedding"] = embeddings[i].tolist()
-
-        # 4. Reset & Store
-        self.chroma_service.reset_collection(collection_name)
-        self.chroma_service.add_documents(all_chunks, collection_name)
-        
+        pdf_file = os.path.basename(file_path)
+        file_hash = self._hash_file(file_path)
+
+        existing_ids, existing_hash = set(), None
+        if incremental:
+            existing_ids, existing_hash = self.vector_store.get_file_state(pdf_file, collection_name)
+            if existing_ids and existing_hash == file_hash:
+                print(f"[INFO] '{pdf_file}' is unchanged. Skipping ingestion.")
+                return {"pdf_file": pdf_file, "chunks": len(existing_ids), "added": 0,
+                        "deleted": 0, "unchanged": len(existing_ids), "collection": collection_name}
+            write_fn = self.vector_store.upsert_documents
+        else:
+            # The target is empty: freshly reset, or a new shadow version
+            write_fn = self.vector_store.add_documents
+
+        seen_ids = set()
+        counts = {"chunks": 0, "added": 0, "unchanged": 0}
+        specs = []
+
+        def tables_to_specs(pages):
+            for page in pages:
+                specs.extend(self.spec_extractor.extract_from_tables(page.get("tables", []), pdf_file, page["page_number"]))
+                yield page
+
+        # 2. Chunk: group chunks into batches, skipping duplicate IDs
+        def chunk_stage(pages):
+            batch = []
+            if self.spec_index:
+                pages = tables_to_specs(pages)
+            for chunk in self.chunker.iter_chunks(pages):
+                chunk["pdf_file"] = pdf_file
+                chunk["file_hash"] = file_hash
+                chunk["id"] = VectorStore.make_chunk_id(pdf_file, chunk["page_number"], chunk["sentence_chunk"])
+                # Identical text on the same page maps to the same ID; keep one copy.
+                if chunk["id"] in seen_ids:
+                    continue
+                seen_ids.add(chunk["id"])
+                if self.spec_index:
+                    specs.extend(self.spec_extractor.extract_from_text(chunk["sentence_chunk"], pdf_file, chunk["page_number"]))
+                batch.append(chunk)
+                if len(batch) >= self.embed_batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        # 3. Embed only the chunks that are not indexed yet
+        def embed_stage(batches):
+            for batch in batches:
+                new_chunks = [c for c in batch if c["id"] not in existing_ids]
+                if new_chunks:
+                    embeddings = self.embedding_service.generate_embeddings([c["sentence_chunk"] for c in new_chunks])
+                    for chunk, embedding in zip(new_chunks, embeddings):
+                        # Convert numpy to list for the vector store
+                        chunk["embedding"] = embedding.tolist()
+                counts["chunks"] += len(batch)
+                counts["added"] += len(new_chunks)
+                self._report(progress, "chunks_embedded", counts["added"], None)
+                yield batch
+
+        # 4. Store new chunks; stamp surviving ones with the new file hash
+        # so the next upload of the same file can short-circuit.
+        def store_stage(batches):
+            written = 0
+            for batch in batches:
+                new_chunks = [c for c in batch if "embedding" in c]
+                unchanged_chunks = [c for c in batch if "embedding" not in c]
+                if new_chunks:
+                    write_fn(new_chunks, collection_name)
+                    if self.lexical_index:
+                        self.lexical_index.upsert([c["id"] for c in new_chunks],
+                                                  [c["sentence_chunk"] for c in new_chunks], collection_name)
+                    written += len(new_chunks)
+                    self._report(progress, "vectors_written", written, None)
+                self.vector_store.update_metadatas(unchanged_chunks, collection_name)
+                counts["unchanged"] += len(unchanged_chunks)
+                yield len(batch)
+
+        for stage in ("pages_extracted", "chunks_embedded", "vectors_written"):
+            self._report(progress, stage, 0, None)
+
+        # 1. Extract (the pipeline source)
+        pages = self.pdf_extractor.iter_pages(
+            file_path,
+            progress_callback=lambda done, total: self._report(progress, "pages_extracted", done, total),
+            detect_tables=self.spec_index is not None
+        )
+        pipeline = StreamingPipeline(
+            [("chunk", chunk_stage), ("embed", embed_stage), ("store", store_stage)],
+            queue_size=self.queue_size
+        )
+        for _ in pipeline.run(pages, source_name="extract"):
+            pass
+        print(f"[INFO] Pipeline stage stats: {pipeline.stats}")
+        # Stages overlap, so each one is reported by its own busy time for this file
+        for name, stats in pipeline.stats.items():
+            observe(f"ingest_{name}", stats["busy_seconds"])
+
+        # Remove chunks that no longer exist in the manual
+        stale_ids = existing_ids - seen_ids
+        with span("ingest_finalize"):
+            self.vector_store.delete_documents(list(stale_ids), collection_name)
+            self.vector_store.flush(collection_name)
+            if self.lexical_index:
+                self.lexical_index.delete(list(stale_ids), collection_name)
+                self.lexical_index.flush(collection_name)
+            if self.spec_index:
+                self.spec_index.replace_file(pdf_file, specs, collection_name)
+                self.spec_index.flush(collection_name)
+        INGESTED_CHUNKS.inc(counts["added"], result="added")
+        INGESTED_CHUNKS.inc(counts["unchanged"], result="unchanged")
+        INGESTED_CHUNKS.inc(len(stale_ids), result="deleted")
+
+        print(f"[INFO] {counts['added']} new, {counts['unchanged']} unchanged, {len(stale_ids)} stale chunks.")
         print("[INFO] Ingestion complete.")
-        return len(all_chunks)
+        return {"pdf_file": pdf_file, "chunks": counts["chunks"], "added": counts["added"],
+                "deleted": len(stale_ids), "unchanged": counts["unchanged"], "stages": pipeline.stats,
+                "collection": collection_name}
@@ -0,0 +1,176 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from services.ingestion import IngestionService
+
+# Progress stages reported by IngestionService.process_file
+STAGES = ("pages_extracted", "chunks_embedded", "vectors_written")
+
+class JobQueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept more jobs."""
+
+class IngestionJob:
+    """Tracks the status and per-stage progress of one ingestion run."""
+
+    def __init__(self, file_path: str = None):
+        self.job_id = uuid.uuid4().hex
+        # None while the upload is still being saved (see IngestionJobManager.reserve)
+        self.file_path = file_path
+        # Directory deleted once the job finishes (a per-job upload directory)
+        self.cleanup_dir = None
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.stages = {stage: {"done": 0, "total": None, "started_at": None, "updated_at": None}
+                       for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, done: int, total: int | None = None):
+        """Records progress for a stage. Used as the ingestion progress callback."""
+        now = time.time()
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"done": 0, "total": None, "started_at": None, "updated_at": None})
+            if entry["started_at"] is None:
+                entry["started_at"] = now
+            entry["done"] = done
+            entry["total"] = total
+            entry["updated_at"] = now
+
+    def to_dict(self) -> dict:
+        """Returns a JSON-serialisable snapshot including per-stage throughput."""
+        with self._lock:
+            stages = {}
+            for stage, entry in self.stages.items():
+                elapsed = None
+                if entry["started_at"] is not None:
+                    elapsed = entry["updated_at"] - entry["started_at"]
+                stages[stage] = {
+                    "done": entry["done"],
+                    "total": entry["total"],
+                    "seconds": round(elapsed, 3) if elapsed is not None else None,
+                    "per_second": round(entry["done"] / elapsed, 2) if elapsed else None
+                }
+
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "file": os.path.basename(self.file_path) if self.file_path else None,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": round(end - self.started_at, 3) if self.started_at else None,
+                "stages": stages,
+                "result": self.result,
+                "error": self.error
+            }
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a bounded background thread pool so uploads
+    never block the API event loop.
+    """
+
+    def __init__(self, ingestion_service: IngestionService, max_workers: int = 1,
+                 max_pending: int = 8, max_history: int = 100):
+        self.ingestion_service = ingestion_service
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def _trim_history(self):
+        """Drops the oldest finished jobs beyond max_history."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def reserve(self) -> IngestionJob:
+        """
+        Claims a queue slot for a job whose file has not been saved yet, so a full
+        queue is reported before anything is written to disk. Follow with `start`
+        (or `abandon` if saving the file fails).
+        Returns:
+            The queued IngestionJob, without a file yet.
+        Raises:
+            JobQueueFullError: If running plus queued jobs exceed the configured bound.
+        """
+        with self._lock:
+            if self._active_count() >= self.max_workers + self.max_pending:
+                raise JobQueueFullError("Ingestion queue is full. Try again later.")
+            job = IngestionJob()
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        return job
+
+    def start(self, job: IngestionJob, file_path: str, cleanup_dir: str = None, **process_kwargs):
+        """
+        Hands a reserved job its file and queues it for ingestion.
+        Args:
+            job: A job returned by `reserve`.
+            file_path: Path to the uploaded PDF.
+            cleanup_dir: Directory to delete once the job finishes (e.g. the job's upload directory).
+            process_kwargs: Extra keyword arguments for IngestionService.process_file.
+        """
+        job.file_path = file_path
+        job.cleanup_dir = cleanup_dir
+        self._executor.submit(self._run, job, process_kwargs)
+        print(f"[INFO] Queued ingestion job {job.job_id} for: {file_path}")
+
+    def abandon(self, job: IngestionJob, error: str):
+        """Marks a reserved job as failed before it started, freeing its slot."""
+        job.error = error
+        job.finished_at = time.time()
+        job.status = "failed"
+
+    def submit(self, file_path: str, **process_kwargs) -> IngestionJob:
+        """
+        Queues a file that is already on disk for ingestion.
+        Args:
+            file_path: Path to the PDF.
+            process_kwargs: Extra keyword arguments for IngestionService.process_file.
+        Returns:
+            The queued IngestionJob.
+        Raises:
+            JobQueueFullError: If running plus queued jobs exceed the configured bound.
+        """
+        job = self.reserve()
+        self.start(job, file_path, **process_kwargs)
+        return job
+
+    def _run(self, job: IngestionJob, process_kwargs: dict):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = self.ingestion_service.process_file(job.file_path, progress=job.update, **process_kwargs)
+            status = "completed"
+        except Exception as e:
+            print(f"[ERROR] Ingestion job {job.job_id} failed: {e}")
+            job.error = str(e)
+            status = "failed"
+        if job.cleanup_dir:
+            shutil.rmtree(job.cleanup_dir, ignore_errors=True)
+        job.finished_at = time.time()
+        job.status = status
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        """Returns the job with the given ID, if it is still tracked."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = False):
+        """Stops accepting work and releases the worker threads."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
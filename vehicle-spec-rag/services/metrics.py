@@ -0,0 +1,215 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits (sub-millisecond) to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """A named metric with a fixed set of label names and one series per label combination."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(self._labels(key), value))
+        return lines
+
+    def _render_series(self, labels: dict, value) -> list[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, rendered as _bucket / _sum / _count series."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts plus one overflow slot, sum and count
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def _render_series(self, labels: dict, series: dict) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in one stage of a query or an ingestion (embedding, search, LLM call, ...).",
+    ("stage",)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "rag_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency until the response headers are sent.",
+    ("method", "route")
+)
+QUERIES = REGISTRY.counter(
+    "rag_queries_total", "Queries by the path that answered them (spec_index, answer_cache, rag).", ("path",)
+)
+SERVICE_READY = REGISTRY.gauge("rag_ready", "1 once every service is loaded and warmed up, else 0.")
+INGESTED_CHUNKS = REGISTRY.counter(
+    "rag_ingested_chunks_total", "Chunks seen during ingestion, by outcome (added, unchanged, deleted).", ("result",)
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "rag_admission_in_flight", "Calls currently running in a rate-limited stage (embedding, search, llm).", ("stage",)
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "rag_admission_queue_depth", "Calls waiting for a slot in a rate-limited stage.", ("stage",)
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "rag_admission_rejected_total", "Calls turned away by admission control, by reason (queue_full, timeout).",
+    ("stage", "reason")
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "rag_admission_wait_seconds", "Time admitted calls waited in the queue for a slot.", ("stage",)
+)
+LLM_TIMEOUTS = REGISTRY.counter("rag_llm_timeouts_total", "LLM calls abandoned at their deadline.")
+LLM_HEDGES = REGISTRY.counter(
+    "rag_llm_hedges_total", "Hedged duplicate LLM calls, by outcome ('sent', 'won' = answered first).", ("outcome",)
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "rag_llm_fallbacks_total", "Answers served by the extractive fallback instead of the LLM, by reason.", ("reason",)
+)
+
+# Spans recorded while handling the current request, for the Server-Timing header
+_request_spans: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_spans", default=None)
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a block as one stage: observed in the stage histogram and, inside a
+    request that collects timings, added to that request's breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, seconds))
+
+def observe(stage: str, seconds: float):
+    """Records a stage duration measured elsewhere (e.g. a pipeline stage's busy time)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+def collect_request_spans() -> list:
+    """
+    Starts collecting spans for the current request. Spans from threads that
+    inherit this context (run_in_threadpool, asyncio.to_thread) are included.
+    Returns:
+        The list spans are appended to as (stage, seconds).
+    """
+    spans = []
+    _request_spans.set(spans)
+    return spans
+
+def server_timing_header(spans: list, total_seconds: float = None) -> str:
+    """Formats spans as a Server-Timing header value; repeated stages are summed."""
+    totals: dict[str, float] = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    if total_seconds is not None:
+        totals["total"] = total_seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
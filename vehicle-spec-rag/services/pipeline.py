@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+# Marks the end of a stream on a queue
+_DONE = object()
+
+class StreamingPipeline:
+    """
+    Runs a chain of generator stages, each on its own thread, connected by
+    bounded queues. A slow stage applies backpressure to the ones before it,
+    so memory is bounded by queue depth and wall-clock time approaches that of
+    the slowest stage rather than the sum of all stages.
+
+    Each stage is a callable that takes an iterator of inputs and returns an
+    iterator of outputs, which lets stages batch or filter freely.
+
+    `stats` has per stage the items produced, the wall-clock 'seconds' and the
+    'busy_seconds' spent working, i.e. not blocked on an empty input queue or
+    a full output queue.
+    """
+
+    def __init__(self, stages: list[tuple[str, Callable[[Iterator], Iterable]]], queue_size: int = 4):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = {}
+        self._error = None
+        self._stop = threading.Event()
+
+    def _put(self, q: queue.Queue, item, stats: dict) -> bool:
+        """Puts onto a bounded queue, giving up if the pipeline was stopped."""
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats["waiting"] += time.perf_counter() - start
+
+    def _drain(self, q: queue.Queue, stats: dict):
+        """Yields items from a queue until the end marker or until the pipeline stops."""
+        while True:
+            start = time.perf_counter()
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            finally:
+                stats["waiting"] += time.perf_counter() - start
+            if item is _DONE:
+                return
+            yield item
+
+    def _pump(self, name: str, produce: Callable[[dict], Iterable], out_q: queue.Queue):
+        """Runs one stage and forwards its outputs downstream."""
+        stats = self.stats.setdefault(name, {"items": 0, "seconds": 0.0, "busy_seconds": 0.0, "waiting": 0.0})
+        start = time.perf_counter()
+        try:
+            for item in produce(stats):
+                stats["items"] += 1
+                if not self._put(out_q, item, stats):
+                    return
+            self._put(out_q, _DONE, stats)
+        except BaseException as e:
+            print(f"[ERROR] Pipeline stage '{name}' failed: {e}")
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+        finally:
+            seconds = time.perf_counter() - start
+            stats["seconds"] = round(seconds, 3)
+            stats["busy_seconds"] = round(max(seconds - stats.pop("waiting"), 0.0), 3)
+
+    def run(self, source: Iterable, source_name: str = "source"):
+        """
+        Starts all stages and yields the outputs of the last one.
+        Re-raises the first stage failure once all threads have stopped.
+        Args:
+            source: Iterable feeding the first stage. It is consumed on its own thread.
+            source_name: Name used for the source in `stats`.
+        """
+        self.stats = {}
+        self._error = None
+        self._stop = threading.Event()
+        threads = []
+
+        out_q = queue.Queue(maxsize=self.queue_size)
+        threads.append(threading.Thread(target=self._pump, args=(source_name, lambda stats: source, out_q),
+                                        name=f"pipeline-{source_name}", daemon=True))
+
+        for name, stage in self.stages:
+            in_q = out_q
+            out_q = queue.Queue(maxsize=self.queue_size)
+            produce = (lambda fn, q: lambda stats: fn(self._drain(q, stats)))(stage, in_q)
+            threads.append(threading.Thread(target=self._pump, args=(name, produce, out_q),
+                                            name=f"pipeline-{name}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            yield from self._drain(out_q, {"waiting": 0.0})
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,331 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
+
+from vectorstore.retriever import Retriever
+from vectorstore.reranker import RerankerService
+from vectorstore.spec_index import SpecIndex
+from services.answer_cache import AnswerCache
+from services.admission import AdmissionController
+from services.metrics import span, QUERIES, LLM_FALLBACKS
+from llm.errors import LLMError, LLMTimeoutError
+from llm.extractive import ExtractiveAnswerer
+from llm.gemini_client import GeminiClient
+from llm.hedged_client import HedgedLLMClient
+from llm.prompt_formatter import PromptBuilder
+from llm.response_parser import parse_json_response, is_error_answer
+
+@asynccontextmanager
+async def _no_admission():
+    yield
+
+class QueryService:
+    """
+    Answers spec questions. Each answer comes from one of four paths, reported as 'path':
+    'spec_index' (confident structured lookup, no embedding or LLM call),
+    'answer_cache' (a recent answer to the same or a near-identical query),
+    'rag' (retrieve context, prompt the LLM, parse the JSON answer) or
+    'extractive_fallback' (the LLM failed or missed the deadline; the spec is
+    picked from the top retrieved chunk by regex, see ExtractiveAnswerer, and
+    'fallback_reason' says why).
+    """
+
+    def __init__(self, retriever: Retriever, llm_client: GeminiClient, answer_cache: AnswerCache = None,
+                 k: int = 5, collection_name: str = "vehicle_manuals", reranker: RerankerService = None,
+                 rerank_candidates: int = 20, rerank_top_n: int = 3, spec_index: SpecIndex = None,
+                 prompt_builder: PromptBuilder = None, admission: dict[str, AdmissionController] = None,
+                 llm_timeout: float = None, extractive_fallback: bool = True):
+        self.retriever = retriever
+        # Plain clients are wrapped (without hedging) so every LLM call can be abandoned at its deadline
+        if not isinstance(llm_client, HedgedLLMClient):
+            llm_client = HedgedLLMClient(llm_client, hedging=False)
+        self.llm_client = llm_client
+        self.answer_cache = answer_cache
+        self.k = k
+        # With a reranker, over-fetch candidates and keep only the best few for the prompt
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.rerank_top_n = rerank_top_n
+        self.spec_index = spec_index
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        self.collection_name = collection_name
+        # Optional per-stage admission control ('embedding', 'search', 'llm') and per-call LLM timeout
+        self.admission = admission or {}
+        self.llm_timeout = llm_timeout
+        self.extractive = ExtractiveAnswerer() if extractive_fallback else None
+
+    def _admit(self, stage: str):
+        """Holds a slot of the stage's admission controller for the block (no-op without one)."""
+        controller = self.admission.get(stage)
+        return controller.admit() if controller else nullcontext()
+
+    def _admit_async(self, stage: str):
+        controller = self.admission.get(stage)
+        return controller.admit_async() if controller else _no_admission()
+
+    def check_admission(self, stage: str):
+        """Raises AdmissionRejectedError if the stage would turn a new call away right now."""
+        if stage in self.admission:
+            self.admission[stage].check()
+
+    def _deadline(self, deadline: float = None) -> float | None:
+        """The deadline for an LLM call starting now: the request's deadline, capped at `llm_timeout` seconds."""
+        if self.llm_timeout:
+            cap = time.monotonic() + self.llm_timeout
+            deadline = cap if deadline is None else min(deadline, cap)
+        return deadline
+
+    async def _generate_async(self, prompt: str, deadline: float = None) -> str:
+        """One async LLM call under admission control, abandoned at the deadline (LLMTimeoutError)."""
+        async with self._admit_async("llm"):
+            with span("llm"):
+                return await self.llm_client.generate_content_async(prompt, self._deadline(deadline))
+
+    async def stream_llm(self, prompt: str, deadline: float = None):
+        """
+        Streams the LLM's answer under admission control. The whole stream must
+        finish by the deadline (and within `llm_timeout` seconds).
+        Yields:
+            Text fragments in generation order.
+        """
+        async with self._admit_async("llm"):
+            async for text in self.llm_client.stream_content_async(prompt, self._deadline(deadline)):
+                yield text
+
+    def _index_version(self) -> tuple[str, int]:
+        # The physical collection is part of the version, so an alias swap also invalidates cached answers
+        physical = self.retriever.aliases.resolve(self.collection_name) if self.retriever.aliases else self.collection_name
+        return physical, self.retriever.vector_store.get_index_version(physical)
+
+    @staticmethod
+    def _new_prepared(query: str, query_embedding=None, index_version: tuple = None) -> dict:
+        return {"query": query, "query_embedding": query_embedding, "index_version": index_version,
+                "path": "rag", "cache": "MISS", "similarity": None, "spec_confidence": None,
+                "answer": None, "context": [], "prompt": None, "prompt_stats": None, "rerank": None,
+                "fallback_reason": None}
+
+    def _spec_answer(self, query: str) -> dict | None:
+        """Returns a prepared dict answered from the spec index, or None if the lookup is not confident."""
+        if not self.spec_index:
+            return None
+        with span("spec_lookup"), self.retriever.collection(self.collection_name) as physical:
+            specs, confidence = self.spec_index.lookup(query, physical)
+        if not specs:
+            return None
+        print(f"[INFO] Spec index answered (confidence {confidence:.2f}) query: '{query}'")
+        prepared = self._new_prepared(query)
+        # A single spec is returned as one object, like the prompt examples
+        prepared.update(path="spec_index", answer=specs[0] if len(specs) == 1 else specs, spec_confidence=confidence)
+        return prepared
+
+    def _start(self, query: str, query_embedding, index_version: tuple) -> dict:
+        """Builds the prepared dict for a query and fills in the answer on an answer cache hit."""
+        prepared = self._new_prepared(query, query_embedding, index_version)
+
+        if self.answer_cache:
+            with span("answer_cache_lookup"):
+                cached = self.answer_cache.lookup(query, query_embedding, index_version)
+            if cached:
+                answer, similarity = cached
+                print(f"[INFO] Answer cache hit (similarity {similarity:.4f}) for query: '{query}'")
+                prepared.update(path="answer_cache", cache="HIT", answer=answer, similarity=similarity)
+        return prepared
+
+    def _fetch_size(self) -> int:
+        return self.rerank_candidates if self.reranker else self.k
+
+    def _build_prompt(self, prepared: dict, candidates: list[dict]):
+        """Reranks the retrieved candidates (if enabled) and formats the prompt."""
+        context_items = candidates
+        if self.reranker:
+            # Falls back to the candidates' vector order if scoring runs over budget
+            with span("rerank"):
+                context_items, prepared["rerank"] = self.reranker.rerank(prepared["query"], candidates,
+                                                                         self.rerank_top_n)
+
+        # 2. Format Prompt (deduplicated and trimmed to the token budget)
+        prepared["context"] = context_items
+        with span("prompt_build"):
+            prepared["prompt"], prepared["prompt_stats"] = self.prompt_builder.build(prepared["query"], context_items)
+        print(f"[INFO] Prompt: {prepared['prompt_stats']['prompt_tokens']} tokens, "
+              f"{prepared['prompt_stats']['chunks_used']}/{len(context_items)} chunks.")
+
+    def prepare(self, query: str) -> dict:
+        """
+        Runs everything before the LLM call: check the spec index, embed, check the answer cache,
+        retrieve and build the prompt.
+        Args:
+            query: The user query string.
+        Returns:
+            Dict with 'query', 'path', 'cache' ('HIT' or 'MISS') and 'answer' when the spec index
+            or answer cache answered ('spec_confidence' or 'similarity' says how closely), otherwise
+            'context' (retrieved chunks with metadata), 'prompt' and 'prompt_stats'
+            (estimated token counts, see PromptBuilder.build). 'rerank' holds
+            {'applied', 'ms'} when a reranker ran.
+        """
+        spec_answer = self._spec_answer(query)
+        if spec_answer:
+            QUERIES.inc(path=spec_answer["path"])
+            return spec_answer
+
+        with self._admit("embedding"):
+            query_embedding = self.retriever.embed_query(query)
+        # Read the version before retrieving, so an answer racing an ingestion is never cached as current
+        prepared = self._start(query, query_embedding, self._index_version())
+        QUERIES.inc(path=prepared["path"])
+        if prepared["path"] != "rag":
+            return prepared
+
+        # 1. Retrieve Context
+        with self._admit("search"):
+            candidates = self.retriever.search(query, query_embedding.tolist(), self._fetch_size(),
+                                               self.collection_name)
+        self._build_prompt(prepared, candidates)
+        return prepared
+
+    def prepare_many(self, queries: list[str]) -> list[dict]:
+        """
+        `prepare` for a batch: one encode call for all uncached queries and one
+        multi-vector search for all answer cache misses.
+        Returns:
+            One prepared dict per query, in input order.
+        """
+        prepared_list = [self._spec_answer(query) for query in queries]
+        pending = [i for i, prepared in enumerate(prepared_list) if prepared is None]
+        if pending:
+            with self._admit("embedding"):
+                embeddings = self.retriever.embed_queries([queries[i] for i in pending])
+            index_version = self._index_version()
+            for i, embedding in zip(pending, embeddings):
+                prepared_list[i] = self._start(queries[i], embedding, index_version)
+
+        misses = [prepared for prepared in prepared_list if prepared["path"] == "rag"]
+        if misses:
+            with self._admit("search"):
+                candidate_lists = self.retriever.search_many(
+                    [prepared["query"] for prepared in misses],
+                    [prepared["query_embedding"].tolist() for prepared in misses],
+                    self._fetch_size(),
+                    self.collection_name
+                )
+            for prepared, candidates in zip(misses, candidate_lists):
+                self._build_prompt(prepared, candidates)
+        for prepared in prepared_list:
+            QUERIES.inc(path=prepared["path"])
+        return prepared_list
+
+    def finish(self, prepared: dict, raw_response: str) -> dict:
+        """
+        Parses the raw LLM response for a prepared query and caches a valid answer.
+        A response that is not valid JSON is answered by the extractive fallback instead.
+        """
+        with span("parse"):
+            answer = parse_json_response(raw_response)
+
+        if is_error_answer(answer) and self.extractive:
+            return self.fallback(prepared, LLMError(f"{answer['error']}: {answer.get('raw_response', '')[:200]!r}"))
+        if self.answer_cache and not is_error_answer(answer):
+            self.answer_cache.store(prepared["query"], prepared["query_embedding"], prepared["index_version"], answer)
+
+        prepared["answer"] = answer
+        return prepared
+
+    def fallback(self, prepared: dict, error: LLMError) -> dict:
+        """
+        Answers a prepared query from its top retrieved chunk after the LLM failed
+        or missed its deadline. The answer is not cached.
+        Raises:
+            The LLM's error again if the extractive fallback is disabled.
+        """
+        if not self.extractive:
+            raise error
+        reason = "deadline" if isinstance(error, LLMTimeoutError) else "llm_error"
+        print(f"[WARN] {error}; answering extractively for query: '{prepared['query']}'")
+        LLM_FALLBACKS.inc(reason=reason)
+        with span("extractive"):
+            answer = self.extractive.answer(prepared["query"], prepared["context"])
+        prepared.update(path="extractive_fallback", answer=answer, fallback_reason=reason)
+        return prepared
+
+    def answer(self, query: str, deadline: float = None) -> dict:
+        """
+        Answers a single query.
+        Args:
+            query: The user query string.
+            deadline: time.monotonic() value by which the answer is due (None = `llm_timeout` only).
+        Returns:
+            Dict with 'query', 'answer', 'path' ('spec_index', 'answer_cache', 'rag' or
+            'extractive_fallback', with 'fallback_reason' 'deadline' or 'llm_error'),
+            'cache' ('HIT' or 'MISS') and, on a cache hit, the cosine 'similarity' of the cached query.
+        """
+        prepared = self.prepare(query)
+        if prepared["path"] != "rag":
+            return prepared
+
+        # 3. Generate Answer (hedged if slow, abandoned at the deadline)
+        # The slot is held until every call started for this answer has finished, not just until
+        # the answer is back: an abandoned call keeps its thread until its client timeout.
+        controller = self.admission.get("llm")
+        if controller:
+            controller.acquire()
+        try:
+            with span("llm"):
+                raw_response = self.llm_client.generate_content(prepared["prompt"], self._deadline(deadline),
+                                                                on_settled=controller.release if controller else None)
+        except LLMError as e:
+            return self.fallback(prepared, e)
+
+        # 4. Parse JSON
+        return self.finish(prepared, raw_response)
+
+    async def answer_many_async(self, queries: list[str], max_concurrency: int = 8,
+                                deadline: float = None) -> list[dict]:
+        """
+        Answers a batch of queries. Embedding and retrieval are batched, then the
+        LLM calls for cache misses run concurrently, at most `max_concurrency` at a time.
+        Args:
+            queries: The user query strings.
+            max_concurrency: Limit on simultaneous LLM calls.
+            deadline: time.monotonic() value by which every answer is due; late ones fall back.
+        Returns:
+            One dict per query, in input order, with 'query', 'status' ('ok' or 'error'),
+            'answer', 'error', 'path', 'cache', 'fallback_reason' and 'prompt_tokens'.
+            A failed item does not fail the batch.
+        """
+        prepared_list = await asyncio.to_thread(self.prepare_many, queries)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # Repeated queries in one batch build the same prompt; share a single LLM call
+        responses: dict[str, asyncio.Task] = {}
+
+        async def generate(prompt: str) -> str:
+            async with semaphore:
+                return await self._generate_async(prompt, deadline)
+
+        async def run(prepared: dict) -> dict:
+            item = {"query": prepared["query"], "status": "ok", "answer": None, "error": None,
+                    "path": prepared["path"], "cache": prepared["cache"], "fallback_reason": None,
+                    "prompt_tokens": prepared["prompt_stats"]["prompt_tokens"] if prepared["prompt_stats"] else None}
+            try:
+                if prepared["path"] == "rag":
+                    if prepared["prompt"] not in responses:
+                        responses[prepared["prompt"]] = asyncio.ensure_future(generate(prepared["prompt"]))
+                    try:
+                        self.finish(prepared, await responses[prepared["prompt"]])
+                    except LLMError as e:
+                        self.fallback(prepared, e)
+                item.update(answer=prepared["answer"], path=prepared["path"],
+                            fallback_reason=prepared["fallback_reason"])
+                if is_error_answer(prepared["answer"]):
+                    item.update(status="error", error=prepared["answer"].get("error"))
+            except Exception as e:
+                print(f"[ERROR] Batch item failed for query '{prepared['query']}': {e}")
+                item.update(status="error", error=str(e))
+            return item
+
+        return await asyncio.gather(*(run(prepared) for prepared in prepared_list))
+
+    @staticmethod
+    def context_metadata(prepared: dict) -> list[dict]:
+        """Returns the source metadata of the retrieved chunks (without their text)."""
+        return [{"pdf_file": item["pdf_file"], "page_number": item["page_number"], "distance": item["distance"]}
+                for item in prepared["context"]]
@@ -0,0 +1,73 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupTracker:
+    """
+    Tracks background service loading for the readiness probe.
+
+    The API starts serving (and answers /healthz) immediately; models load on a
+    background thread that records how long each heavy import and each startup
+    step took. /readyz reports 'ready' only once every service is built and warm.
+    """
+
+    def __init__(self):
+        self.state = "starting"  # starting -> ready | failed
+        self.error = None
+        self.imports: dict[str, float] = {}
+        self.steps: dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._ready_seconds = None
+        self._lock = threading.Lock()
+
+    def import_module(self, name: str):
+        """Imports a module and records its import time (0 if something already imported it)."""
+        already_loaded = name in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        seconds = 0.0 if already_loaded else time.perf_counter() - start
+        with self._lock:
+            self.imports[name] = seconds
+        print(f"[INFO] Imported {name} in {seconds:.2f}s")
+        return module
+
+    @contextmanager
+    def step(self, name: str):
+        """Times one startup step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.steps[name] = seconds
+            print(f"[INFO] Startup step '{name}' took {seconds:.2f}s")
+
+    def mark_ready(self):
+        with self._lock:
+            self.state = "ready"
+            self._ready_seconds = time.perf_counter() - self._started
+        print(f"[INFO] Services ready after {self._ready_seconds:.2f}s.")
+
+    def mark_failed(self, error: Exception):
+        with self._lock:
+            self.state = "failed"
+            self.error = f"{type(error).__name__}: {error}"
+        print(f"[ERROR] Failed to initialize services: {error}")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.state,
+                "error": self.error,
+                "uptime_seconds": round(time.perf_counter() - self._started, 3),
+                "ready_after_seconds": round(self._ready_seconds, 3) if self._ready_seconds is not None else None,
+                "imports": {name: round(seconds, 3) for name, seconds in self.imports.items()},
+                "steps": {name: round(seconds, 3) for name, seconds in self.steps.items()}
+            }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other as top-level packages (from vectorstore.x import Y), like the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+from services.answer_cache import AnswerCache
+
+def test_answer_from_before_an_ingestion_is_not_stored():
+    cache = AnswerCache()
+    cache.lookup("brake caliper torque", [1.0, 0.0], ("manuals", 1))
+    # An ingestion lands while that query waits on the LLM; a newer query sees version 2
+    cache.lookup("lug nut torque", [0.0, 1.0], ("manuals", 2))
+    cache.store("lug nut torque", [0.0, 1.0], ("manuals", 2), ["100 Nm"])
+    cache.store("brake caliper torque", [1.0, 0.0], ("manuals", 1), ["35 Nm"])
+
+    assert cache.lookup("lug nut torque", [0.0, 1.0], ("manuals", 2)) == (["100 Nm"], 1.0)
+    assert cache.lookup("brake caliper torque", [1.0, 0.0], ("manuals", 2)) is None
+    assert cache.stats()["invalidations"] == 0
+    assert cache.stats()["stale_stores"] == 1
+
+def test_newer_version_clears_the_cache():
+    cache = AnswerCache()
+    cache.lookup("lug nut torque", [0.0, 1.0], ("manuals", 1))
+    cache.store("lug nut torque", [0.0, 1.0], ("manuals", 1), ["100 Nm"])
+    assert cache.lookup("lug nut torque", [0.0, 1.0], ("manuals", 2)) is None
+    assert cache.stats()["invalidations"] == 1
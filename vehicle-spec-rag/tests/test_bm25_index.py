@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from vectorstore.bm25_index import BM25Index
+
+DOCS = {
+    "caliper": "Tighten the brake caliper bolts to 35 Nm torque",
+    "ball-joint": "Tighten the lower ball joint nut to 175 Nm torque",
+    "lug": "Tighten the wheel lug nuts to 100 Nm torque",
+    "oil": "Engine oil capacity with filter is 4.7 L",
+}
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path), max_df=0.5)
+    index.upsert(list(DOCS), list(DOCS.values()))
+    return index
+
+def reference_scores(index: BM25Index, docs: dict, terms: list[str]) -> dict:
+    """Plain-Python BM25 over the given terms, to check the vectorized scores against."""
+    tokenized = {doc_id: index.tokenize(text) for doc_id, text in docs.items()}
+    avg_length = sum(map(len, tokenized.values())) / len(docs)
+    scores = {}
+    for term in terms:
+        df = sum(term in tokens for tokens in tokenized.values())
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for doc_id, tokens in tokenized.items():
+            tf = tokens.count(term)
+            if tf:
+                norm = tf + index.k1 * (1 - index.b + index.b * len(tokens) / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (index.k1 + 1) / norm
+    return scores
+
+def test_scores_match_plain_bm25(index):
+    expected = reference_scores(index, DOCS, ["lower", "ball", "joint"])
+    results = index.search("lower ball joint")
+    assert [doc_id for doc_id, _ in results] == ["ball-joint"]
+    assert results[0][1] == pytest.approx(expected["ball-joint"], rel=1e-5)
+
+def test_common_terms_are_skipped(index):
+    # "torque" and "nm" are in 3 of 4 chunks, "the" is a stop word: only "wheel" is scored
+    results = index.search("the wheel torque nm")
+    assert [doc_id for doc_id, _ in results] == ["lug"]
+
+def test_rarest_term_kept_when_all_are_common(index):
+    assert {doc_id for doc_id, _ in index.search("torque nm")} == {"caliper", "ball-joint", "lug"}
+
+def test_reindex_and_delete(index):
+    index.upsert(["oil"], ["Wheel bearing preload 2 Nm"])
+    index.delete(["lug"])
+    assert [doc_id for doc_id, _ in index.search("wheel")] == ["oil"]
+    assert index.search("capacity") == []
+    assert index.count() == 3
+
+def test_persisted_index_reloads(index, tmp_path):
+    index.flush()
+    assert BM25Index(str(tmp_path), max_df=0.5).search("lug nuts") == index.search("lug nuts")
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from vectorstore.numpy_store import NumpyVectorStore
+
+def chunk(chunk_id: str, vector: list[float], page: int = 1) -> dict:
+    return {"id": chunk_id, "sentence_chunk": f"chunk {chunk_id}", "embedding": vector,
+            "pdf_file": "manual.pdf", "page_number": page}
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_changed_embedding_does_not_touch_rows_being_read(tmp_path, quantization):
+    store = NumpyVectorStore(str(tmp_path), quantization=quantization)
+    store.upsert_documents([chunk("a", [1.0, 0.0]), chunk("b", [0.0, 1.0])])
+    # What an in-flight query holds
+    before = store._get("vehicle_manuals")
+    old_matrix = before.matrix[:before.size].copy()
+
+    store.upsert_documents([chunk("a", [0.0, 1.0]), chunk("c", [1.0, 0.0])])
+
+    assert np.array_equal(before.matrix[:before.size], old_matrix)
+    after = store._get("vehicle_manuals")
+    assert after is not before
+    results = store.query([[0.0, 1.0]], n_results=3)
+    assert set(results["ids"][0][:2]) == {"a", "b"} and results["ids"][0][2] == "c"
+
+def test_same_embedding_updates_metadata_in_place(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.upsert_documents([chunk("a", [1.0, 0.0])])
+    before = store._get("vehicle_manuals")
+
+    store.upsert_documents([chunk("a", [1.0, 0.0], page=7)])
+
+    assert store._get("vehicle_manuals") is before
+    assert store.query([[1.0, 0.0]], n_results=1)["metadatas"][0][0]["page_number"] == 7
@@ -0,0 +1,23 @@
+from llm.prompt_formatter import PromptBuilder
+
+# A flattened spec table: no sentence punctuation, so it is one long "sentence"
+TABLE = " ".join(f"Wheel hub bolt M{i} 35 Nm item {i}" for i in range(250)) + " lug nut torque"
+LUG_NUTS = "Tighten the wheel lug nuts to 100 Nm."
+
+def test_oversized_top_sentence_is_cut_to_the_budget():
+    builder = PromptBuilder(token_budget=1500)
+    prompt, stats = builder.build("wheel lug nut torque", [{"sentence_chunk": TABLE}])
+    assert stats["prompt_tokens"] <= 1500
+    assert stats["chunks_used"] == 1 and stats["chunks_trimmed"] == 1
+    # Cut at a word boundary
+    context_line = prompt.split("- Wheel hub bolt", 1)[1].split("\n", 1)[0]
+    assert TABLE.startswith("Wheel hub bolt" + context_line + " ")
+
+def test_chunk_that_does_not_fit_does_not_end_the_context():
+    builder = PromptBuilder(token_budget=1500)
+    fixed = builder.build("wheel lug nut torque", [])[1]["prompt_tokens"]
+    builder = PromptBuilder(token_budget=fixed + 20)
+    unsplittable = {"sentence_chunk": "x" * 400}
+    prompt, stats = builder.build("wheel lug nut torque", [unsplittable, {"sentence_chunk": LUG_NUTS}])
+    assert LUG_NUTS in prompt
+    assert stats["chunks_used"] == 1 and stats["prompt_tokens"] <= fixed + 20
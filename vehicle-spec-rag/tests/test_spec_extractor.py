@@ -0,0 +1,46 @@
+import pytest
+
+from pdf_processing.spec_extractor import SpecExtractor
+from vectorstore.spec_index import SpecIndex
+
+def extract(text: str) -> list[tuple]:
+    return [(s["component"], s["value"], s["unit"]) for s in SpecExtractor().extract_from_text(text, "manual.pdf", 1)]
+
+@pytest.mark.parametrize("text", [
+    "Torque: 35 Nm",
+    "Tighten the bolts to 35 N·m",
+    "Check the oil level is between 2 and 5 mm",
+    "Page 12 400 mm",
+    "V and 10 Nm",
+])
+def test_fragments_are_not_components(text):
+    assert extract(text) == []
+
+def test_leading_clause_is_dropped():
+    assert extract("Remove the wheel and tighten the lug nuts to 100 N·m") == [("Lug Nuts", "100", "Nm")]
+
+def test_object_of_previous_clause():
+    assert extract("Remove bolt A (M10x1.25) and tighten to 45 Nm") == [("Bolt A", "45", "Nm")]
+
+def test_conversion_in_parentheses_is_skipped():
+    text = ("Tighten the brake caliper bolts to 35 N·m (26 lb-ft). "
+            "Lower ball joint nut ........ 175 N·m (129 lb-ft) Engine oil capacity with filter: 4.7 L")
+    assert extract(text) == [("Brake Caliper Bolts", "35", "Nm"), ("Lower Ball Joint Nut", "175", "Nm"),
+                             ("Engine Oil Capacity with Filter", "4.7", "L")]
+
+@pytest.fixture
+def spec_index(tmp_path):
+    index = SpecIndex(str(tmp_path))
+    index.replace_file("manual.pdf", [
+        {"component": "Bolts", "spec_type": "Torque", "value": "35", "unit": "Nm", "page_number": 1},
+        {"component": "Wheel Lug Nut", "spec_type": "Torque", "value": "100", "unit": "Nm", "page_number": 2},
+    ])
+    return index
+
+def test_lookup_needs_two_shared_terms(spec_index):
+    assert spec_index.lookup("bolt torque") == ([], 0.0)
+
+def test_lookup_answers_specific_query(spec_index):
+    answer, confidence = spec_index.lookup("wheel lug nut torque")
+    assert answer == [{"component": "Wheel Lug Nut", "spec_type": "Torque", "value": "100", "unit": "Nm"}]
+    assert confidence == 1.0
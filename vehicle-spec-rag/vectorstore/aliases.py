@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+class CollectionAliases:
+    """
+    Maps logical collection names ('vehicle_manuals') to the versioned physical
+    collection currently serving them ('vehicle_manuals__v3').
+
+    Rebuilds write into a fresh version and then `swap` the alias: the JSON file
+    is replaced atomically, so a reader sees either the old or the new version,
+    never a partial one. Names without an alias resolve to themselves, so
+    collections built before aliases existed keep working.
+
+    Readers `acquire` a version for the duration of a query. A version replaced
+    by a swap is retired and handed to `on_drop` once no query holds it any more.
+    Retired versions are recorded in the file as well, so a swap made by another
+    process (or before a restart) is garbage-collected by whichever process
+    loads it next. The file is re-read when its mtime changes.
+    """
+
+    def __init__(self, path: str, on_drop=None):
+        self.path = path
+        # Callable(physical_name) that deletes a collection's data everywhere
+        self.on_drop = on_drop
+        self._aliases: dict[str, str] = {}
+        self._retired: set[str] = set()
+        self._next_version: dict[str, int] = {}
+        self._refs: dict[str, int] = {}
+        self._mtime = None
+        self._lock = threading.RLock()
+        self._reload()
+
+    # --- Persistence ---
+
+    def _reload(self):
+        """Re-reads the alias file if another process changed it."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path) as f:
+            state = json.load(f)
+        self._aliases = state.get("aliases", {})
+        self._retired = set(state.get("retired", []))
+        self._next_version = state.get("next_version", {})
+        self._mtime = mtime
+        self._collect()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"aliases": self._aliases, "retired": sorted(self._retired),
+                       "next_version": self._next_version}, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    # --- Resolution ---
+
+    def resolve(self, name: str) -> str:
+        """Returns the physical collection an alias points to (or the name itself)."""
+        with self._lock:
+            self._reload()
+            return self._aliases.get(name, name)
+
+    @contextmanager
+    def acquire(self, name: str):
+        """
+        Resolves an alias and pins that version until the block exits, so a
+        concurrent swap cannot drop it mid-query.
+        """
+        with self._lock:
+            self._reload()
+            physical = self._aliases.get(name, name)
+            self._refs[physical] = self._refs.get(physical, 0) + 1
+        try:
+            yield physical
+        finally:
+            with self._lock:
+                self._refs[physical] -= 1
+                if not self._refs[physical]:
+                    del self._refs[physical]
+                self._maybe_drop(physical)
+
+    # --- Versioning ---
+
+    def new_version(self, name: str) -> str:
+        """Reserves the name of a fresh shadow collection for an alias."""
+        with self._lock:
+            self._reload()
+            version = self._next_version.get(name, 1)
+            self._next_version[name] = version + 1
+            self._save()
+            return f"{name}__v{version}"
+
+    def swap(self, name: str, physical: str) -> str:
+        """
+        Points an alias at a fully built collection and retires the previous one.
+        Returns:
+            The physical collection the alias pointed to before.
+        """
+        with self._lock:
+            self._reload()
+            previous = self._aliases.get(name, name)
+            self._aliases[name] = physical
+            self._retired.discard(physical)
+            if previous != physical:
+                self._retired.add(previous)
+            self._save()
+            print(f"[INFO] Collection alias '{name}' -> '{physical}' (was '{previous}').")
+            self._maybe_drop(previous)
+            return previous
+
+    def _collect(self):
+        for name in list(self._retired):
+            self._maybe_drop(name)
+
+    def collect_garbage(self):
+        """Drops every retired version nothing reads any more (e.g. after `on_drop` is set)."""
+        with self._lock:
+            self._reload()
+            self._collect()
+
+    def _maybe_drop(self, physical: str):
+        """Drops a retired version once nothing reads it. Called with the lock held."""
+        if physical not in self._retired or self._refs.get(physical) or self.on_drop is None:
+            return
+        self._retired.discard(physical)
+        self._save()
+        # Deleting files can be slow; keep it off the query that released the last reference
+        threading.Thread(target=self._drop, args=(physical,), name=f"drop-{physical}", daemon=True).start()
+
+    def _drop(self, physical: str):
+        try:
+            self.on_drop(physical)
+            print(f"[INFO] Dropped retired collection '{physical}'.")
+        except Exception as e:
+            print(f"[WARN] Failed to drop retired collection '{physical}': {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._reload()
+            return {"aliases": dict(self._aliases), "retired": sorted(self._retired), "in_use": dict(self._refs)}
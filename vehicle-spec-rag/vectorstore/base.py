@@ -0,0 +1,114 @@
+import hashlib
+from abc import ABC, abstractmethod
+
+class VectorStore(ABC):
+    """
+    Interface shared by the vector store backends (ChromaDB, NumPy).
+
+    Chunks are dicts with 'sentence_chunk', 'embedding', 'pdf_file', 'page_number'
+    and optionally 'id' and 'file_hash'. `query` returns Chroma-shaped results:
+    a dict of 'ids', 'documents', 'metadatas' and 'distances', each a list with
+    one inner list per query embedding.
+    """
+
+    def __init__(self):
+        # Bumped on every write so caches can tell when a collection changed
+        self._versions: dict[str, int] = {}
+
+    def get_index_version(self, collection_name: str = "vehicle_manuals") -> int:
+        """Returns a counter that changes whenever the collection is modified in this process."""
+        return self._versions.get(collection_name, 0)
+
+    def _bump_version(self, collection_name: str):
+        self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+
+    @staticmethod
+    def make_chunk_id(pdf_file: str, page_number: int, text: str) -> str:
+        """
+        Builds a stable, content-addressed ID for a chunk.
+        The same manual, page and chunk text always map to the same ID, so
+        re-ingesting a manual only touches the chunks that actually changed.
+        """
+        key = f"{pdf_file}\x1f{int(page_number)}\x1f{text}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _chunk_id(self, item: dict) -> str:
+        """Returns the chunk's precomputed ID or derives it from its content."""
+        if item.get("id"):
+            return item["id"]
+        return self.make_chunk_id(item.get("pdf_file", "unknown"), item.get("page_number", 0), item["sentence_chunk"])
+
+    @staticmethod
+    def _build_metadata(item: dict) -> dict:
+        """Builds the metadata dict for a chunk (primitive types only)."""
+        meta = {
+            "pdf_file": str(item.get("pdf_file", "unknown")),
+            "page_number": int(item.get("page_number", 0))
+        }
+        if item.get("file_hash"):
+            meta["file_hash"] = str(item["file_hash"])
+        return meta
+
+    @abstractmethod
+    def add_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """Adds new chunks and their embeddings."""
+
+    @abstractmethod
+    def upsert_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """Inserts new chunks or overwrites existing ones with the same ID."""
+
+    @abstractmethod
+    def update_metadatas(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """Refreshes the metadata of existing chunks without touching their embeddings."""
+
+    @abstractmethod
+    def delete_documents(self, ids: list[str], collection_name: str = "vehicle_manuals"):
+        """Deletes chunks by ID."""
+
+    @abstractmethod
+    def get_file_state(self, pdf_file: str, collection_name: str = "vehicle_manuals") -> tuple[set, str | None]:
+        """Returns (chunk IDs, shared file hash or None) currently indexed for a manual."""
+
+    @abstractmethod
+    def query(self, query_embeddings: list, n_results: int = 5, collection_name: str = "vehicle_manuals") -> dict:
+        """Returns the n_results nearest chunks for each query embedding."""
+
+    @abstractmethod
+    def get_documents(self, ids: list[str] = None, collection_name: str = "vehicle_manuals",
+                      include_embeddings: bool = False) -> dict:
+        """
+        Returns {'ids', 'documents', 'metadatas'} for the given IDs, or for every chunk if ids is None.
+        With include_embeddings, also 'embeddings' as a float32 matrix aligned with 'ids'.
+        """
+
+    @abstractmethod
+    def count(self, collection_name: str = "vehicle_manuals") -> int:
+        """Returns the number of chunks in the collection."""
+
+    @abstractmethod
+    def reset_collection(self, collection_name: str = "vehicle_manuals"):
+        """Removes all data from the collection."""
+
+    def drop_collection(self, collection_name: str):
+        """Deletes a collection and its data. Backends override this to also free the storage."""
+        self.reset_collection(collection_name)
+
+    def flush(self, collection_name: str = "vehicle_manuals"):
+        """Persists pending writes. Backends that write through can ignore this."""
+
+def create_vector_store(backend: str, persist_directory: str, **options) -> VectorStore:
+    """
+    Builds the configured vector store backend.
+    Args:
+        backend: 'chroma' or 'numpy'.
+        persist_directory: Directory the backend persists to.
+        options: Backend-specific settings (e.g. quantization for 'numpy').
+    """
+    # Imported lazily so the unused backend's dependencies are never loaded
+    if backend == "chroma":
+        from vectorstore.chroma_db import ChromaDBService
+        return ChromaDBService(persist_directory=persist_directory)
+    if backend == "numpy":
+        from vectorstore.numpy_store import NumpyVectorStore
+        return NumpyVectorStore(persist_directory=persist_directory, **options)
+    raise ValueError(f"Unknown vector store backend: {backend}")
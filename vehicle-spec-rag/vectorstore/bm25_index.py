@@ -0,0 +1,242 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+# Keeps decimals, part numbers and hyphenated names ("1.25", "m10x1", "tie-rod") as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+# Ignored in queries: they match most chunks and add nothing but scoring work
+STOP_WORDS = frozenset("""
+a an and are as at be by for from how i in is it of on or the this to what when where which with
+""".split())
+
+class _LexicalCollection:
+    """
+    Inverted index for one collection. Chunks get integer rows; each term's
+    postings are kept as a {row: tf} dict for updates and, once searched, as
+    (rows, tfs) numpy arrays that are rebuilt only after the term changes.
+    """
+
+    def __init__(self):
+        self.doc_terms: dict[str, dict[str, int]] = {}
+        self.rows: dict[str, int] = {}
+        # Row -> chunk ID (None once removed); rows are not reused until `_compact`
+        self.row_ids: list[str | None] = []
+        self.lengths = np.zeros(1024, dtype=np.float32)
+        self.postings: dict[str, dict[int, int]] = {}
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.total_length = 0
+        self.dirty = False
+
+    def add(self, doc_id: str, terms: dict[str, int]):
+        row = self.rows.get(doc_id)
+        if row is None:
+            row = len(self.row_ids)
+            self.rows[doc_id] = row
+            self.row_ids.append(doc_id)
+            if row >= len(self.lengths):
+                self.lengths = np.concatenate([self.lengths, np.zeros(len(self.lengths), dtype=np.float32)])
+        else:
+            self._unpost(doc_id, row)
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.lengths[row] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[row] = tf
+            self._arrays.pop(term, None)
+        self.dirty = True
+
+    def remove(self, doc_id: str):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self._unpost(doc_id, row)
+        del self.doc_terms[doc_id]
+        self.row_ids[row] = None
+        self.dirty = True
+        if len(self.row_ids) > max(1024, 2 * len(self.rows)):
+            self._compact()
+
+    def _unpost(self, doc_id: str, row: int):
+        """Takes a chunk's current terms out of the postings."""
+        self.total_length -= int(self.lengths[row])
+        for term in self.doc_terms[doc_id]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(row, None)
+                self._arrays.pop(term, None)
+                if not posting:
+                    del self.postings[term]
+
+    def _compact(self):
+        """Renumbers the rows once most of them belong to removed chunks."""
+        doc_terms = self.doc_terms
+        self.__init__()
+        for doc_id, terms in doc_terms.items():
+            self.add(doc_id, terms)
+        self.dirty = True
+
+    def arrays(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """The term's postings as (rows, tfs) arrays; callers must not modify them."""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings[term]
+            arrays = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                      np.fromiter(posting.values(), dtype=np.float32, count=len(posting)))
+            self._arrays[term] = arrays
+        return arrays
+
+class BM25Index:
+    """
+    Okapi BM25 lexical index over chunk texts, one inverted index per collection.
+
+    Kept in sync with the vector store by IngestionService and persisted as
+    `<persist_directory>/<collection>.json` (term frequencies per chunk ID; the
+    postings are rebuilt on load).
+
+    Queries skip stop words and terms found in more than `max_df` of the chunks
+    (e.g. "torque" in a torque-spec corpus), which barely change the ranking
+    but have the longest postings. If every term is that common, only the
+    rarest is scored.
+    """
+
+    def __init__(self, persist_directory: str, k1: float = 1.5, b: float = 0.75, max_df: float = 0.25):
+        self.persist_directory = persist_directory
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self._collections: dict[str, _LexicalCollection] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        """Lowercases and splits text; compound tokens also contribute their parts."""
+        tokens = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            tokens.append(token)
+            if any(sep in token for sep in ".-/"):
+                tokens.extend(part for part in re.split(r"[.\-/]", token) if part)
+        return tokens
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.persist_directory, f"{collection_name}.json")
+
+    def _get(self, collection_name: str) -> _LexicalCollection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection = _LexicalCollection()
+                path = self._path(collection_name)
+                if os.path.exists(path):
+                    with open(path) as f:
+                        for doc_id, terms in json.load(f).items():
+                            collection.add(doc_id, terms)
+                    collection.dirty = False
+                    print(f"[INFO] Loaded BM25 index for '{collection_name}' ({len(collection.doc_terms)} chunks).")
+                self._collections[collection_name] = collection
+            return collection
+
+    def upsert(self, ids: list[str], documents: list[str], collection_name: str = "vehicle_manuals"):
+        """Indexes (or re-indexes) documents under their chunk IDs."""
+        with self._lock:
+            collection = self._get(collection_name)
+            for doc_id, document in zip(ids, documents):
+                collection.add(doc_id, dict(Counter(self.tokenize(document))))
+
+    def delete(self, ids: list[str], collection_name: str = "vehicle_manuals"):
+        """Removes chunk IDs from the index."""
+        with self._lock:
+            collection = self._get(collection_name)
+            for doc_id in ids:
+                collection.remove(doc_id)
+
+    def reset(self, collection_name: str = "vehicle_manuals"):
+        """Empties the collection's index."""
+        with self._lock:
+            collection = _LexicalCollection()
+            collection.dirty = True
+            self._collections[collection_name] = collection
+
+    def drop(self, collection_name: str):
+        """Forgets the collection's index and deletes its file."""
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            if os.path.exists(self._path(collection_name)):
+                os.remove(self._path(collection_name))
+
+    def count(self, collection_name: str = "vehicle_manuals") -> int:
+        return len(self._get(collection_name).doc_terms)
+
+    def flush(self, collection_name: str = "vehicle_manuals"):
+        """Persists the collection's index if it changed."""
+        with self._lock:
+            collection = self._get(collection_name)
+            if not collection.dirty:
+                return
+            path = self._path(collection_name)
+            with open(path + ".tmp", "w") as f:
+                json.dump(collection.doc_terms, f)
+            os.replace(path + ".tmp", path)
+            collection.dirty = False
+
+    def rebuild_from(self, vector_store, collection_name: str = "vehicle_manuals"):
+        """Rebuilds the index from every chunk currently in the vector store."""
+        print(f"[INFO] Rebuilding BM25 index for '{collection_name}' from the vector store...")
+        stored = vector_store.get_documents(collection_name=collection_name)
+        with self._lock:
+            self.reset(collection_name)
+            self.upsert(stored["ids"], stored["documents"], collection_name)
+            self.flush(collection_name)
+        print(f"[INFO] BM25 index rebuilt with {len(stored['ids'])} chunks.")
+
+    def _snapshot(self, query: str, collection_name: str):
+        """
+        Copies what scoring the query needs under the lock, so upserts can go on meanwhile.
+        Returns:
+            (number of chunks, average length, chunk lengths, row -> ID list, [(term rows, term tfs)]).
+        """
+        with self._lock:
+            collection = self._get(collection_name)
+            num_docs = len(collection.doc_terms)
+            terms = [term for term in set(self.tokenize(query)) - STOP_WORDS if term in collection.postings]
+            if num_docs == 0 or not terms:
+                return None
+            dfs = {term: len(collection.postings[term]) for term in terms}
+            selective = [term for term in terms if dfs[term] <= self.max_df * num_docs]
+            terms = selective or [min(terms, key=dfs.get)]
+            # Term arrays are replaced, never modified, on update; lengths are rewritten in place, so copied
+            size = len(collection.row_ids)
+            return (num_docs, collection.total_length / num_docs, collection.lengths[:size].copy(),
+                    collection.row_ids, [collection.arrays(term) for term in terms])
+
+    def search(self, query: str, k: int = 20, collection_name: str = "vehicle_manuals") -> list[tuple[str, float]]:
+        """
+        Scores chunks against the query with BM25.
+        Returns:
+            Up to k (chunk ID, score) pairs, best first.
+        """
+        snapshot = self._snapshot(query, collection_name)
+        if snapshot is None:
+            return []
+        num_docs, avg_length, lengths, row_ids, postings = snapshot
+
+        rows = np.concatenate([term_rows for term_rows, _ in postings])
+        tfs = np.concatenate([tfs for _, tfs in postings])
+        idfs = np.concatenate([np.full(len(term_rows), math.log(1 + (num_docs - len(term_rows) + 0.5) /
+                                                                 (len(term_rows) + 0.5)), dtype=np.float32)
+                               for term_rows, _ in postings])
+        norms = tfs + self.k1 * (1 - self.b + self.b * lengths[rows] / avg_length)
+        scores = np.bincount(rows, weights=idfs * tfs * (self.k1 + 1) / norms, minlength=len(lengths))
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        # A chunk removed since the snapshot has its ID cleared; it is dropped rather than returned
+        return [(row_ids[row], float(scores[row])) for row in matched if row_ids[row] is not None]
@@ -1,13 +1,20 @@
 import chromadb
-from chromadb.utils import embedding_functions
-import pandas as pd
+import numpy as np
 import os
-import ast
+import sys
 
-class ChromaDBService:
+# Ensure we can import modules from project root when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.base import VectorStore
+
+# Chroma rejects write calls above its max batch size (~5461 on SQLite).
+MAX_BATCH_SIZE = 5000
+
+class ChromaDBService(VectorStore):
     """Service for managing ChromaDB vector store."""
 
     def __init__(self, persist_directory: str = "chroma_db"):
+        super().__init__()
         self.persist_directory = persist_directory
         print(f"[INFO] Initializing ChromaDB at: {self.persist_directory}")
         # Initialize persistent client
@@ -20,6 +27,12 @@ class ChromaDBService:
         # we will pass the embeddings directly when adding documents.
         return self.client.get_or_create_collection(name=collection_name)
 
+    @staticmethod
+    def _batched(items: list, size: int = MAX_BATCH_SIZE):
+        """Yields successive slices of at most `size` items."""
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+
     def add_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
         """
         Adds text chunks and their embeddings to the collection.
@@ -30,29 +43,89 @@ class ChromaDBService:
         collection = self.get_or_create_collection(collection_name)
         
         print(f"[INFO] Adding {len(chunks)} documents to collection: {collection_name}")
-        
-        ids = [f"id_{i}" for i in range(len(chunks))]
-        documents = [item["sentence_chunk"] for item in chunks]
-        embeddings = [item["embedding"] for item in chunks]
-        
-        # Prepare metadata (filter out non-primitive types if necessary)
-        metadatas = []
-        for item in chunks:
-            # Debugging: Simplifying metadata to check for type errors
-            meta = {
-                "pdf_file": str(item.get("pdf_file", "unknown")),
-                "page_number": int(item.get("page_number", 0)) 
-            }
-            metadatas.append(meta)
-
-        collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+
+        for batch in self._batched(chunks):
+            collection.add(
+                documents=[item["sentence_chunk"] for item in batch],
+                embeddings=[item["embedding"] for item in batch],
+                metadatas=[self._build_metadata(item) for item in batch],
+                ids=[self._chunk_id(item) for item in batch]
+            )
+        self._bump_version(collection_name)
         print("[INFO] Documents added successfully.")
 
+    def upsert_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """
+        Inserts new chunks or overwrites existing ones with the same ID.
+        Args:
+            chunks: List of dictionaries containing 'sentence_chunk', 'embedding', and metadata.
+            collection_name: Name of the collection.
+        """
+        if not chunks:
+            return
+        collection = self.get_or_create_collection(collection_name)
+
+        print(f"[INFO] Upserting {len(chunks)} documents into collection: {collection_name}")
+
+        for batch in self._batched(chunks):
+            collection.upsert(
+                documents=[item["sentence_chunk"] for item in batch],
+                embeddings=[item["embedding"] for item in batch],
+                metadatas=[self._build_metadata(item) for item in batch],
+                ids=[self._chunk_id(item) for item in batch]
+            )
+        self._bump_version(collection_name)
+
+    def update_metadatas(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """
+        Refreshes the metadata of existing chunks without touching their embeddings.
+        Args:
+            chunks: List of chunk dictionaries that are already stored.
+            collection_name: Name of the collection.
+        """
+        if not chunks:
+            return
+        collection = self.get_or_create_collection(collection_name)
+        for batch in self._batched(chunks):
+            collection.update(
+                ids=[self._chunk_id(item) for item in batch],
+                metadatas=[self._build_metadata(item) for item in batch]
+            )
+
+    def delete_documents(self, ids: list[str], collection_name: str = "vehicle_manuals"):
+        """
+        Deletes chunks by ID.
+        Args:
+            ids: Chunk IDs to remove.
+            collection_name: Name of the collection.
+        """
+        if not ids:
+            return
+        collection = self.get_or_create_collection(collection_name)
+
+        print(f"[INFO] Deleting {len(ids)} documents from collection: {collection_name}")
+
+        for batch in self._batched(list(ids)):
+            collection.delete(ids=batch)
+        self._bump_version(collection_name)
+
+    def get_file_state(self, pdf_file: str, collection_name: str = "vehicle_manuals") -> tuple[set, str | None]:
+        """
+        Looks up what is currently indexed for a manual.
+        Args:
+            pdf_file: Manual file name as stored in the 'pdf_file' metadata.
+            collection_name: Name of the collection.
+        Returns:
+            Tuple of (set of chunk IDs, file hash shared by all chunks or None).
+        """
+        collection = self.get_or_create_collection(collection_name)
+        result = collection.get(where={"pdf_file": pdf_file}, include=["metadatas"])
+
+        ids = set(result["ids"])
+        hashes = {(meta or {}).get("file_hash") for meta in result["metadatas"]}
+        file_hash = hashes.pop() if len(hashes) == 1 else None
+        return ids, file_hash
+
     def query(self, query_embeddings: list, n_results: int = 5, collection_name: str = "vehicle_manuals"):
         """
         Queries the collection using embeddings.
@@ -68,6 +141,37 @@ class ChromaDBService:
             n_results=n_results
         )
 
+    def get_documents(self, ids: list[str] = None, collection_name: str = "vehicle_manuals",
+                      include_embeddings: bool = False) -> dict:
+        """
+        Fetches stored chunks.
+        Args:
+            ids: Chunk IDs to fetch, or None for the whole collection.
+            collection_name: Name of the collection.
+            include_embeddings: Also return the 'embeddings' matrix (float32, aligned with 'ids').
+        Returns:
+            Dict with 'ids', 'documents' and 'metadatas' lists.
+        """
+        collection = self.get_or_create_collection(collection_name)
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        result = collection.get(ids=ids, include=include)
+        documents = {"ids": result["ids"], "documents": result["documents"], "metadatas": result["metadatas"]}
+        if include_embeddings:
+            documents["embeddings"] = np.asarray(result["embeddings"], dtype=np.float32)
+        return documents
+
+    def count(self, collection_name: str = "vehicle_manuals") -> int:
+        """Returns the number of chunks in the collection."""
+        return self.get_or_create_collection(collection_name).count()
+
+    def drop_collection(self, collection_name: str):
+        """Deletes a collection without recreating it."""
+        try:
+            self.client.delete_collection(name=collection_name)
+        except ValueError:
+            pass
+        self._bump_version(collection_name)
+
     def reset_collection(self, collection_name: str = "vehicle_manuals"):
         """
         Deletes and recreates the collection to remove all data.
@@ -79,46 +183,38 @@ class ChromaDBService:
             print(f"[WARN] Collection '{collection_name}' does not exist.")
         
         self.get_or_create_collection(collection_name)
+        self._bump_version(collection_name)
         print(f"[INFO] Collection '{collection_name}' recreated.")
 
 if __name__ == "__main__":
-    import sys
-    import numpy as np
-    
+    from vectorstore.snapshot import Snapshot, import_snapshot
+
     # Path setup
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     data_dir = os.path.join(base_dir, "data")
-    csv_path = os.path.join(data_dir, "text_chunks_and_embeddings.csv")
+    snapshot_path = os.path.join(data_dir, "embeddings_snapshot")
     chroma_path = os.path.join(data_dir, "chroma_store")
 
     try:
-        if not os.path.exists(csv_path):
-            print(f"Error: CSV file not found at {csv_path}. Please run embeddings.py first.")
+        if not os.path.exists(snapshot_path):
+            print(f"Error: Snapshot not found at {snapshot_path}. Please run embeddings.py first.")
             sys.exit(1)
 
-        print(f"[INFO] Loading data from {csv_path}...")
-        df = pd.read_csv(csv_path)
-        
-        # Convert string representation of embedding back to list
-        # Using ast.literal_eval is safer than eval()
-        print("[INFO] parsing embeddings...")
-        df["embedding"] = df["embedding"].apply(ast.literal_eval)
-        
-        chunks = df.to_dict(orient="records")
+        # Embeddings are memory-mapped from the snapshot's .npy file; no parsing needed
+        print(f"[INFO] Loading data from {snapshot_path}...")
+        snapshot = Snapshot(snapshot_path)
 
-        # Initialize ChromaDB
+        # Initialize ChromaDB and load the snapshot in batches
         chroma_service = ChromaDBService(persist_directory=chroma_path)
-        
-        # Add documents
-        chroma_service.add_documents(chunks)
-        
+        import_snapshot(snapshot, chroma_service)
+
         # Verify with a fake query (using the first embedding as a query)
         print("[INFO] Verifying with a test query...")
-        test_embedding = chunks[0]["embedding"]
+        test_embedding = snapshot.embeddings[0].tolist()
         results = chroma_service.query(query_embeddings=[test_embedding], n_results=2)
-        
+
         print("\n[RESULT] Top 2 matches:")
         print(results["documents"][0])
-        
+
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+KEY_BYTES = 16
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of text embeddings.
+
+    Entries are keyed by a hash of the model name plus the whitespace-normalized
+    text. Storage is three memory-mapped arrays in `cache_dir/<model>/`:
+    vectors (float32, capacity x dim), slot keys and last-used ticks. The key
+    array doubles as the on-disk index, so the lookup table is rebuilt on load and
+    there is no separate index file to keep consistent. Capacity grows by doubling
+    up to `max_entries`, after which least-recently-used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int, max_entries: int = 200_000,
+                 initial_capacity: int = 1024):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.cache_dir = os.path.join(cache_dir, self._safe_name(model_name))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._tick = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = self._read_meta()
+        if meta and (meta.get("dim") != dim or meta.get("model_name") != model_name):
+            print(f"[WARN] Embedding cache at {self.cache_dir} does not match {model_name} ({dim}d). Resetting.")
+            shutil.rmtree(self.cache_dir)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            meta = None
+
+        capacity = meta["capacity"] if meta else min(initial_capacity, max_entries)
+        self._open(capacity)
+        self._load_index()
+        print(f"[INFO] Embedding cache at {self.cache_dir}: {len(self._slots)} entries, capacity {self.capacity}")
+
+    @staticmethod
+    def _safe_name(model_name: str) -> str:
+        return "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace so trivially different copies share an entry."""
+        return " ".join(text.split())
+
+    def make_key(self, text: str) -> bytes:
+        """Returns the cache key for a text under this cache's model."""
+        payload = f"{self.model_name}\x00{self.normalize(text)}".encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=KEY_BYTES).digest()
+
+    # --- Storage ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _read_meta(self) -> dict | None:
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": self.dim, "capacity": self.capacity}, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _memmap(self, name: str, dtype, shape: tuple) -> np.memmap:
+        """Opens (creating or extending as needed) a raw memory-mapped array file."""
+        path = self._path(name)
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self, capacity: int):
+        self.capacity = capacity
+        self._vectors = self._memmap("vectors.f32", np.float32, (capacity, self.dim))
+        self._keys = self._memmap("keys.bin", np.uint8, (capacity, KEY_BYTES))
+        self._ticks = self._memmap("ticks.i64", np.int64, (capacity,))
+        self._write_meta()
+
+    def _load_index(self):
+        """Rebuilds the key -> slot table from the key array."""
+        self._slots = {}
+        self._free = []
+        used = self._keys.any(axis=1)
+        for slot in range(self.capacity):
+            if used[slot]:
+                self._slots[self._keys[slot].tobytes()] = slot
+            else:
+                self._free.append(slot)
+        # Pop from the end, so hand out low slots first
+        self._free.reverse()
+        self._tick = int(self._ticks.max()) if self.capacity else 0
+
+    def _grow(self, needed: int):
+        """Doubles capacity (up to max_entries) until `needed` free slots exist, if possible."""
+        new_capacity = self.capacity
+        while new_capacity - len(self._slots) < needed and new_capacity < self.max_entries:
+            new_capacity = min(new_capacity * 2, self.max_entries)
+        if new_capacity == self.capacity:
+            return
+        self.flush()
+        old_capacity = self.capacity
+        del self._vectors, self._keys, self._ticks
+        self._open(new_capacity)
+        self._free = list(range(new_capacity - 1, old_capacity - 1, -1)) + self._free
+
+    def _allocate(self, n: int) -> list[int]:
+        """Returns n writable slots, growing the files or evicting LRU entries."""
+        if len(self._free) < n:
+            self._grow(n)
+        shortfall = n - len(self._free)
+        if shortfall > 0:
+            used = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+            oldest = used[np.argpartition(self._ticks[used], shortfall - 1)[:shortfall]]
+            for slot in oldest.tolist():
+                del self._slots[self._keys[slot].tobytes()]
+                self._keys[slot] = 0
+                self._free.append(slot)
+        return [self._free.pop() for _ in range(n)]
+
+    # --- Public API ---
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Looks up embeddings for texts.
+        Returns:
+            List aligned with `texts` holding a vector copy for hits and None for misses.
+        """
+        keys = [self.make_key(text) for text in texts]
+        results = []
+        with self._lock:
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._tick += 1
+                self._ticks[slot] = self._tick
+                results.append(np.array(self._vectors[slot]))
+        return results
+
+    def put_many(self, texts: list[str], vectors):
+        """Stores embeddings for texts, evicting least-recently-used entries when full."""
+        new_items = {}
+        for text, vector in zip(texts, vectors):
+            new_items[self.make_key(text)] = vector
+        with self._lock:
+            new_items = {key: vector for key, vector in new_items.items() if key not in self._slots}
+            if not new_items:
+                return
+            count = min(len(new_items), self.max_entries)
+            items = list(new_items.items())[-count:]
+            for slot, (key, vector) in zip(self._allocate(count), items):
+                self._tick += 1
+                self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+                self._ticks[slot] = self._tick
+                # Key last, so a slot is only visible once its vector is written
+                self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._slots[key] = slot
+
+    def flush(self):
+        """Flushes memory-mapped pages to disk."""
+        for array in (self._vectors, self._ticks, self._keys):
+            array.flush()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None
+        }
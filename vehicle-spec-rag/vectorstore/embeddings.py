@@ -1,12 +1,47 @@
-import torch
-import pandas as pd
-from sentence_transformers import SentenceTransformer
+import os
+import sys
+import numpy as np
 from tqdm.auto import tqdm
 
+# Ensure we can import modules from project root when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.embedding_cache import EmbeddingCache
+
+CPU_BACKENDS = ("torch", "int8", "onnx")
+# Manual-style texts and queries used to check a CPU backend against the reference model
+VALIDATION_TEXTS = [
+    "Torque for brake caliper bolts",
+    "What is the tightening torque of the lower ball joint nut?",
+    "Engine oil capacity with filter",
+    "Tighten the shock absorber upper mount nuts to 63 N·m (46 lb-ft).",
+    "Raise and support the vehicle. Remove the wheel and tire assembly.",
+    "Inspect the tie-rod end boot for tears and replace the tie-rod end if the boot is damaged.",
+    "Install the wheel speed sensor and tighten the bolt to 18 N·m. Connect the electrical connector.",
+    "Drain the coolant, then remove the thermostat housing bolts and the thermostat.",
+    "Stabilizer bar link nuts .......... 70 N·m (52 lb-ft)",
+    "Caution: Always replace the lower arm forward and rearward nuts with new ones. The nuts are self-locking.",
+]
+
 class EmbeddingService:
-    """Service for creating and managing text embeddings."""
+    """
+    Service for creating and managing text embeddings.
+
+    On CPU, `backend` can swap the float32 PyTorch model for a faster one:
+    'int8' (dynamic int8 quantization of the Linear layers) or 'onnx' (the
+    model's ONNX graph on ONNX Runtime). The candidate is only used if its
+    embeddings of VALIDATION_TEXTS agree with the reference model's (cosine
+    >= `min_cosine` for every text), so vectors indexed with the reference
+    model stay comparable and nothing needs re-indexing. Otherwise the
+    reference model is kept.
+    """
+
+    def __init__(self, model_name: str = "all-mpnet-base-v2", device: str = None,
+                 cache_dir: str = None, cache_max_entries: int = 200_000, backend: str = "torch",
+                 num_threads: int = 0, min_cosine: float = 0.99, onnx_file_name: str = None):
+        # torch and sentence-transformers take seconds to import; only pay for it when a model is built
+        import torch
+        from sentence_transformers import SentenceTransformer
 
-    def __init__(self, model_name: str = "all-mpnet-base-v2", device: str = None):
         if device is None:
             # Auto-detect device: CUDA -> MPS (Mac) -> CPU
             if torch.cuda.is_available():
@@ -19,7 +54,80 @@ class EmbeddingService:
             self.device = device
             
         print(f"[INFO] Initializing EmbeddingService with model: {model_name} on device: {self.device}")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name_or_path=model_name, device=self.device)
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        # Backend actually in use and the validation result of the requested one
+        self.backend = "torch"
+        self.validation = None
+        if backend not in CPU_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        if backend != "torch":
+            if self.device != "cpu":
+                print(f"[WARN] Embedding backend '{backend}' is CPU-only; using PyTorch on {self.device}.")
+            else:
+                self._enable_cpu_backend(backend, num_threads, min_cosine, onnx_file_name)
+
+        # Optional on-disk cache so unchanged chunk texts are never re-encoded
+        self.cache = None
+        if cache_dir:
+            self.cache = EmbeddingCache(cache_dir, model_name, self.model.get_sentence_embedding_dimension(),
+                                        max_entries=cache_max_entries)
+
+    def _build_cpu_model(self, backend: str, num_threads: int, onnx_file_name: str = None):
+        """Builds the int8 or ONNX variant of the model (the reference model is left untouched)."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if backend == "int8":
+            # Weights are quantized once; activations are quantized on the fly per batch
+            return torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        # Needs `pip install optimum[onnxruntime]`; the graph is exported on first load if the repo has none
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+            session_options.inter_op_num_threads = 1
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+        if onnx_file_name:
+            # e.g. 'onnx/model_qint8_avx512_vnni.onnx' for a pre-quantized graph
+            model_kwargs["file_name"] = onnx_file_name
+        return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    def _enable_cpu_backend(self, backend: str, num_threads: int, min_cosine: float, onnx_file_name: str = None):
+        """Switches to the CPU backend if it agrees with the reference model, otherwise keeps the reference."""
+        reference = self.model.encode(VALIDATION_TEXTS, convert_to_tensor=False, show_progress_bar=False)
+        try:
+            candidate = self._build_cpu_model(backend, num_threads, onnx_file_name)
+            embeddings = candidate.encode(VALIDATION_TEXTS, convert_to_tensor=False, show_progress_bar=False)
+        except Exception as e:
+            print(f"[WARN] Could not load embedding backend '{backend}' ({e}); using PyTorch float32.")
+            self.validation = {"backend": backend, "accepted": False, "error": str(e)}
+            return
+
+        reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        cosines = np.sum(reference * embeddings, axis=1)
+        accepted = bool(cosines.min() >= min_cosine)
+        self.validation = {"backend": backend, "accepted": accepted, "min_cosine": round(float(cosines.min()), 5),
+                           "mean_cosine": round(float(cosines.mean()), 5), "threshold": min_cosine}
+        if not accepted:
+            print(f"[WARN] Embedding backend '{backend}' disagrees with the reference model "
+                  f"(min cosine {cosines.min():.4f} < {min_cosine}); using PyTorch float32.")
+            return
+
+        print(f"[INFO] Using embedding backend '{backend}' (min cosine {cosines.min():.4f} vs. reference).")
+        self.model = candidate
+        self.backend = backend
+
+    def info(self) -> dict:
+        """Model, device, active backend and the backend validation result."""
+        return {"model": self.model_name, "device": self.device, "backend": self.backend,
+                "validation": self.validation}
 
     def generate_embeddings(self, chunks: list[dict] | list[str], batch_size: int = 32) -> list:
         """
@@ -34,7 +142,27 @@ class EmbeddingService:
             text_chunks = [item["sentence_chunk"] for item in chunks]
         else:
             text_chunks = chunks
-        
+
+        if self.cache is None:
+            return self._encode(text_chunks, batch_size)
+
+        # Only cache misses go to the model
+        cached = self.cache.get_many(text_chunks)
+        miss_indices = [i for i, vector in enumerate(cached) if vector is None]
+        print(f"[INFO] Embedding cache: {len(text_chunks) - len(miss_indices)} hits, {len(miss_indices)} misses.")
+
+        if miss_indices:
+            miss_texts = [text_chunks[i] for i in miss_indices]
+            miss_embeddings = self._encode(miss_texts, batch_size)
+            self.cache.put_many(miss_texts, miss_embeddings)
+            self.cache.flush()
+            for i, embedding in zip(miss_indices, miss_embeddings):
+                cached[i] = embedding
+
+        return np.vstack(cached)
+
+    def _encode(self, text_chunks: list[str], batch_size: int):
+        """Runs the model over the given texts."""
         print("[INFO] Generating embeddings...")
         
         # Encode all chunks at once (batched library side)
@@ -49,24 +177,27 @@ class EmbeddingService:
         # Return the embeddings directly. The caller is responsible for assigning them.
         return embeddings
 
-    def save_embeddings(self, chunks: list[dict], file_path: str):
-        """Saves chunks and embeddings to a CSV file."""
-        df = pd.DataFrame(chunks)
-        print(f"[INFO] Saving {len(df)} embeddings to {file_path}")
-        df.to_csv(file_path, index=False)
+    def encode_queries(self, queries: list[str]):
+        """Encodes a batch of short query strings in one model call (no cache, no progress bar)."""
+        return self.model.encode(queries, batch_size=len(queries), convert_to_tensor=False, show_progress_bar=False)
+
+    def save_embeddings(self, chunks: list[dict], directory: str, collection_name: str = "vehicle_manuals"):
+        """
+        Saves chunks and embeddings as a binary snapshot (float32 .npy matrix + Parquet records).
+        Load it with `vectorstore.snapshot.Snapshot` or `python vectorstore/snapshot.py import`.
+        """
+        from vectorstore.snapshot import write_snapshot
+
+        print(f"[INFO] Saving {len(chunks)} embeddings to {directory}")
+        write_snapshot(chunks, directory, collection_name, model_name=self.model_name)
 
 if __name__ == "__main__":
-    import os
-    import sys
-    
-    # Path setup
-    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from pdf_processing.extract_text import PDFTextExtractor
     from pdf_processing.chunker import TextChunker
 
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     pdf_path = os.path.join(base_dir, "data", "sample-service-manual 1.pdf")
-    output_path = os.path.join(base_dir, "data", "text_chunks_and_embeddings.csv")
+    output_path = os.path.join(base_dir, "data", "embeddings_snapshot")
 
     try:
         # 1. Extract
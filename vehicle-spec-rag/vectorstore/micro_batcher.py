@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text encode requests and runs them as one batched
+    call. A batch is dispatched once `max_batch_size` texts are waiting or
+    `max_wait_ms` has passed since the first one arrived, whichever comes first.
+    All model calls happen on one worker thread, so callers never contend on the model.
+    """
+
+    def __init__(self, encode_fn: Callable[[list[str]], list], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.batch_size_counts: dict[int, int] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queues a text for encoding and returns a future for its embedding."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed.")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: float = None):
+        """Encodes one text through the batcher, blocking until its batch has run."""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self) -> list:
+        """Blocks for the first request, then gathers more until the batch is full or the wait expires."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [item for item in self._collect() if item is not None]
+            if batch:
+                self._dispatch(batch)
+            if self._closed and self._queue.empty():
+                return
+
+    def _dispatch(self, batch: list):
+        texts = [text for text, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            embeddings = self.encode_fn(texts)
+        except BaseException as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+        for future, embedding in zip(futures, embeddings):
+            future.set_result(embedding)
+
+    def close(self):
+        """Stops the worker after the queued requests are served."""
+        self._closed = True
+        # Wake the worker if it is waiting for a first request
+        self._queue.put(None)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items()))
+        }
@@ -0,0 +1,493 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from vectorstore.base import VectorStore
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+# Rows scored per block when codes or a float16 matrix have to be cast to float32 first
+BLOCK_ROWS = 8192
+
+class _Collection:
+    """In-memory state of one collection: a contiguous embedding matrix plus row-aligned records."""
+
+    def __init__(self, matrix: np.ndarray, ids: list, documents: list, metadatas: list,
+                 codes: np.ndarray = None, scales: np.ndarray = None):
+        # `matrix` may have spare capacity; only the first `size` rows are live
+        self.matrix = matrix
+        # Quantized first-pass codes (and per-row int8 scales), row-aligned with `matrix`
+        self.codes = codes
+        self.scales = scales
+        self.size = len(ids)
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.dirty = False
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact-search vector store.
+
+    Each collection keeps its L2-normalized embeddings in one contiguous matrix, saved as `<collection>/embeddings.npy` and memory-mapped on load,
+    with ids, documents and metadata in `<collection>/records.json`. A batch of
+    queries is answered with a single matmul plus `argpartition`. Writes go to an
+    in-memory copy with spare capacity and are persisted by `flush`.
+
+    Distances are squared L2 between unit vectors (2 - 2 * cosine), matching the
+    default space of the Chroma collections.
+
+    With quantization='int8' (1 byte per dimension plus a per-row scale) or
+    'binary' (1 sign bit per dimension), the first pass scans only
+    compact in-RAM codes. The best `k * rescore_multiplier` rows are then rescored
+    exactly against the full-precision matrix, which stays memory-mapped on disk
+    (as float16 or float32, see `rescore_dtype`), so only the shortlist's pages are read.
+    """
+
+    def __init__(self, persist_directory: str = "numpy_store", quantization: str = "none",
+                 rescore_multiplier: int = 4, rescore_dtype: str = "float32"):
+        super().__init__()
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        if rescore_dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported rescore dtype: {rescore_dtype}")
+        self.persist_directory = persist_directory
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self.dtype = np.dtype(rescore_dtype)
+        print(f"[INFO] Initializing NumpyVectorStore at: {self.persist_directory} (quantization: {quantization})")
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self._collections: dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+
+    # --- Persistence ---
+
+    def _paths(self, collection_name: str) -> tuple[str, str]:
+        directory = os.path.join(self.persist_directory, collection_name)
+        return os.path.join(directory, "embeddings.npy"), os.path.join(directory, "records.json")
+
+    def _code_paths(self, collection_name: str) -> tuple[str, str]:
+        directory = os.path.join(self.persist_directory, collection_name)
+        return (os.path.join(directory, f"codes_{self.quantization}.npy"),
+                os.path.join(directory, f"scales_{self.quantization}.npy"))
+
+    def _empty(self) -> _Collection:
+        return _Collection(np.zeros((0, 0), dtype=self.dtype), [], [], [])
+
+    def _load(self, collection_name: str) -> _Collection:
+        matrix_path, records_path = self._paths(collection_name)
+        if not os.path.exists(records_path):
+            return self._empty()
+        with open(records_path) as f:
+            records = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode="r")
+        collection = _Collection(matrix, records["ids"], records["documents"], records["metadatas"])
+        if self.quantization != "none":
+            self._load_codes(collection, collection_name)
+        print(f"[INFO] Loaded {len(records['ids'])} vectors for collection: {collection_name}")
+        return collection
+
+    def _load_codes(self, collection: _Collection, collection_name: str):
+        """Reads the first-pass codes into RAM, building them from the matrix if missing or stale."""
+        codes_path, scales_path = self._code_paths(collection_name)
+        if os.path.exists(codes_path):
+            codes = np.load(codes_path)
+            scales = np.load(scales_path) if os.path.exists(scales_path) else None
+            if len(codes) == collection.size and (self.quantization == "binary" or
+                                                  (scales is not None and len(scales) == collection.size)):
+                collection.codes, collection.scales = codes, scales
+                return
+        print(f"[INFO] Building {self.quantization} codes for collection: {collection_name}")
+        blocks = [self._quantize(np.asarray(collection.matrix[start:start + BLOCK_ROWS], dtype=np.float32))
+                  for start in range(0, collection.size, BLOCK_ROWS)]
+        if not blocks:
+            return
+        collection.codes = np.concatenate([codes for codes, _ in blocks])
+        if self.quantization == "int8":
+            collection.scales = np.concatenate([scales for _, scales in blocks])
+        self._save_codes(collection, collection_name)
+
+    def _save_codes(self, collection: _Collection, collection_name: str):
+        codes_path, scales_path = self._code_paths(collection_name)
+        np.save(codes_path + ".tmp.npy", collection.codes[:collection.size])
+        os.replace(codes_path + ".tmp.npy", codes_path)
+        if collection.scales is not None:
+            np.save(scales_path + ".tmp.npy", collection.scales[:collection.size])
+            os.replace(scales_path + ".tmp.npy", scales_path)
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(collection_name)
+                if collection is None:
+                    collection = self._load(collection_name)
+                    self._collections[collection_name] = collection
+        return collection
+
+    def flush(self, collection_name: str = "vehicle_manuals"):
+        """Writes the collection to disk and re-opens its matrix memory-mapped."""
+        with self._lock:
+            collection = self._get(collection_name)
+            if not collection.dirty:
+                return
+            matrix_path, records_path = self._paths(collection_name)
+            os.makedirs(os.path.dirname(matrix_path), exist_ok=True)
+
+            # Write to temp files and swap in, so readers never see a partial file
+            np.save(matrix_path + ".tmp.npy", np.ascontiguousarray(collection.matrix[:collection.size], dtype=self.dtype))
+            with open(records_path + ".tmp", "w") as f:
+                json.dump({"ids": collection.ids[:collection.size],
+                           "documents": collection.documents[:collection.size],
+                           "metadatas": collection.metadatas[:collection.size]}, f)
+            if collection.codes is not None:
+                self._save_codes(collection, collection_name)
+            os.replace(matrix_path + ".tmp.npy", matrix_path)
+            os.replace(records_path + ".tmp", records_path)
+
+            self._collections[collection_name] = self._load(collection_name)
+            print(f"[INFO] Persisted {collection.size} vectors for collection: {collection_name}")
+
+    # --- Writes ---
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _quantize(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        """
+        Encodes unit vectors for the first pass.
+        Returns:
+            (codes, scales): int8 codes with one float32 scale per row
+            (vector ~= codes * scale), or sign bits packed 8 per byte and None.
+        """
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=1), None
+        max_abs = np.abs(vectors).max(axis=1)
+        max_abs[max_abs == 0] = 1.0
+        scales = (max_abs / 127.0).astype(np.float32)
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    def _reserve(self, collection: _Collection, extra: int, dim: int):
+        """Ensures the matrix (and codes) are writable and have room for `extra` more rows."""
+        needed = collection.size + extra
+        matrix = collection.matrix
+        codes_ready = self.quantization == "none" or (
+            collection.codes is not None and collection.codes.shape[0] >= needed and collection.codes.flags.writeable)
+        if (matrix.shape[0] >= needed and matrix.flags.writeable and matrix.shape[1] == dim
+                and matrix.dtype == self.dtype and codes_ready):
+            return
+        capacity = max(needed, 2 * collection.size, 1024)
+        grown = np.empty((capacity, dim), dtype=self.dtype)
+        if collection.size:
+            grown[:collection.size] = matrix[:collection.size]
+
+        if self.quantization != "none":
+            code_width = (dim + 7) // 8 if self.quantization == "binary" else dim
+            codes = np.empty((capacity, code_width), dtype=np.uint8 if self.quantization == "binary" else np.int8)
+            scales = np.empty(capacity, dtype=np.float32) if self.quantization == "int8" else None
+            if collection.size:
+                codes[:collection.size] = collection.codes[:collection.size]
+                if scales is not None:
+                    scales[:collection.size] = collection.scales[:collection.size]
+            collection.codes, collection.scales = codes, scales
+        collection.matrix = grown
+
+    def upsert_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """
+        Inserts new chunks or overwrites existing ones with the same ID.
+        Args:
+            chunks: List of dictionaries containing 'sentence_chunk', 'embedding', and metadata.
+            collection_name: Name of the collection.
+        """
+        if not chunks:
+            return
+        vectors = self._normalize([item["embedding"] for item in chunks])
+        codes, scales = self._quantize(vectors) if self.quantization != "none" else (None, None)
+        with self._lock:
+            collection = self._get(collection_name)
+            new_count = sum(1 for item in chunks if self._chunk_id(item) not in collection.row_of)
+            # Queries read rows without the lock, so a changed embedding (another embedding backend, a
+            # snapshot import) is not written over a live row: the rows go into a copy that is swapped
+            # in once fully written, as deletes do
+            rewrites = any(self._embedding_changed(collection, self._chunk_id(item), vector)
+                           for item, vector in zip(chunks, vectors))
+            if rewrites:
+                collection = self._copy(collection)
+            self._reserve(collection, new_count, vectors.shape[1])
+
+            for i, (item, vector) in enumerate(zip(chunks, vectors)):
+                chunk_id = self._chunk_id(item)
+                row = collection.row_of.get(chunk_id)
+                is_new = row is None
+                if is_new:
+                    row = collection.size
+                    collection.ids.append(chunk_id)
+                    collection.documents.append(item["sentence_chunk"])
+                    collection.metadatas.append(self._build_metadata(item))
+                    collection.row_of[chunk_id] = row
+                else:
+                    # Each is a single reference swap, so a concurrent query sees the old or the new value
+                    collection.documents[row] = item["sentence_chunk"]
+                    collection.metadatas[row] = self._build_metadata(item)
+                    if not rewrites:
+                        # Same embedding as stored
+                        continue
+                collection.matrix[row] = vector
+                if codes is not None:
+                    collection.codes[row] = codes[i]
+                    if scales is not None:
+                        collection.scales[row] = scales[i]
+                if is_new:
+                    # Publish the row only after it is fully written
+                    collection.size += 1
+            collection.dirty = True
+            if rewrites:
+                self._collections[collection_name] = collection
+            self._bump_version(collection_name)
+
+    def _embedding_changed(self, collection: _Collection, chunk_id: str, vector: np.ndarray) -> bool:
+        """True if the chunk is stored with a different embedding than `vector`."""
+        row = collection.row_of.get(chunk_id)
+        return row is not None and not np.array_equal(collection.matrix[row], vector.astype(collection.matrix.dtype))
+
+    @staticmethod
+    def _copy(collection: _Collection) -> _Collection:
+        """A private copy of the collection's live rows, for writes that must not touch rows being read."""
+        size = collection.size
+        return _Collection(
+            np.array(collection.matrix[:size]),
+            list(collection.ids), list(collection.documents), list(collection.metadatas),
+            codes=np.array(collection.codes[:size]) if collection.codes is not None else None,
+            scales=np.array(collection.scales[:size]) if collection.scales is not None else None
+        )
+
+    def add_documents(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """Adds text chunks and their embeddings to the collection."""
+        print(f"[INFO] Adding {len(chunks)} documents to collection: {collection_name}")
+        self.upsert_documents(chunks, collection_name)
+
+    def update_metadatas(self, chunks: list[dict], collection_name: str = "vehicle_manuals"):
+        """Refreshes the metadata of existing chunks without touching their embeddings."""
+        if not chunks:
+            return
+        with self._lock:
+            collection = self._get(collection_name)
+            for item in chunks:
+                row = collection.row_of.get(self._chunk_id(item))
+                if row is not None:
+                    collection.metadatas[row] = self._build_metadata(item)
+            collection.dirty = True
+
+    def delete_documents(self, ids: list[str], collection_name: str = "vehicle_manuals"):
+        """Deletes chunks by ID, compacting the matrix."""
+        if not ids:
+            return
+        with self._lock:
+            collection = self._get(collection_name)
+            doomed = {collection.row_of[chunk_id] for chunk_id in ids if chunk_id in collection.row_of}
+            if not doomed:
+                return
+            print(f"[INFO] Deleting {len(doomed)} documents from collection: {collection_name}")
+            keep = [row for row in range(collection.size) if row not in doomed]
+            # Build a fresh collection so in-flight queries keep a consistent snapshot
+            compacted = _Collection(
+                np.ascontiguousarray(collection.matrix[keep]),
+                [collection.ids[row] for row in keep],
+                [collection.documents[row] for row in keep],
+                [collection.metadatas[row] for row in keep],
+                codes=collection.codes[keep] if collection.codes is not None else None,
+                scales=collection.scales[keep] if collection.scales is not None else None
+            )
+            compacted.dirty = True
+            self._collections[collection_name] = compacted
+            self._bump_version(collection_name)
+
+    def reset_collection(self, collection_name: str = "vehicle_manuals"):
+        """Removes all data from the collection."""
+        with self._lock:
+            collection = self._empty()
+            collection.dirty = True
+            self._collections[collection_name] = collection
+            self._bump_version(collection_name)
+        print(f"[INFO] Collection '{collection_name}' reset.")
+
+    def replace_collection(self, embeddings: np.ndarray, ids: list, documents: list, metadatas: list,
+                           collection_name: str = "vehicle_manuals"):
+        """
+        Replaces a collection wholesale (e.g. from a snapshot) without per-chunk upserts.
+        Args:
+            embeddings: (n, dim) matrix, possibly memory-mapped; normalized block by block.
+            ids, documents, metadatas: Row-aligned records.
+            collection_name: Name of the collection.
+        """
+        matrix = np.empty((len(ids), embeddings.shape[1] if len(ids) else 0), dtype=self.dtype)
+        for start in range(0, len(ids), BLOCK_ROWS):
+            matrix[start:start + BLOCK_ROWS] = self._normalize(embeddings[start:start + BLOCK_ROWS])
+        collection = _Collection(matrix, list(ids), list(documents), [dict(meta) for meta in metadatas])
+        if self.quantization != "none" and len(ids):
+            blocks = [self._quantize(np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32))
+                      for start in range(0, len(ids), BLOCK_ROWS)]
+            collection.codes = np.concatenate([codes for codes, _ in blocks])
+            if self.quantization == "int8":
+                collection.scales = np.concatenate([scales for _, scales in blocks])
+        collection.dirty = True
+        with self._lock:
+            self._collections[collection_name] = collection
+            self._bump_version(collection_name)
+
+    def drop_collection(self, collection_name: str):
+        """Forgets a collection and deletes its files."""
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            shutil.rmtree(os.path.join(self.persist_directory, collection_name), ignore_errors=True)
+            self._bump_version(collection_name)
+
+    # --- Reads ---
+
+    def get_file_state(self, pdf_file: str, collection_name: str = "vehicle_manuals") -> tuple[set, str | None]:
+        """Returns (chunk IDs, shared file hash or None) currently indexed for a manual."""
+        collection = self._get(collection_name)
+        ids, hashes = set(), set()
+        for chunk_id, meta in zip(collection.ids[:collection.size], collection.metadatas[:collection.size]):
+            if meta.get("pdf_file") == pdf_file:
+                ids.add(chunk_id)
+                hashes.add(meta.get("file_hash"))
+        file_hash = hashes.pop() if len(hashes) == 1 else None
+        return ids, file_hash
+
+    def get_documents(self, ids: list[str] = None, collection_name: str = "vehicle_manuals",
+                      include_embeddings: bool = False) -> dict:
+        """
+        Returns {'ids', 'documents', 'metadatas'} for the given IDs, or for every chunk if ids is None.
+        With include_embeddings, also 'embeddings' (the stored unit vectors, as float32).
+        """
+        collection = self._get(collection_name)
+        size = collection.size
+        if ids is None:
+            rows = range(size)
+        else:
+            rows = [collection.row_of[chunk_id] for chunk_id in ids
+                    if collection.row_of.get(chunk_id, size) < size]
+        documents = {"ids": [collection.ids[row] for row in rows],
+                     "documents": [collection.documents[row] for row in rows],
+                     "metadatas": [collection.metadatas[row] for row in rows]}
+        if include_embeddings:
+            rows = np.arange(size) if ids is None else np.asarray(rows, dtype=np.int64)
+            documents["embeddings"] = np.asarray(collection.matrix[rows], dtype=np.float32)
+        return documents
+
+    def count(self, collection_name: str = "vehicle_manuals") -> int:
+        """Returns the number of chunks in the collection."""
+        return self._get(collection_name).size
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the rows and scores of the k highest scores per column, best first."""
+        size = scores.shape[0]
+        if k < size:
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        else:
+            top = np.broadcast_to(np.arange(size)[:, None], scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=0)
+        order = np.argsort(-top_scores, axis=0)
+        return np.take_along_axis(top, order, axis=0), np.take_along_axis(top_scores, order, axis=0)
+
+    @staticmethod
+    def _exact_scores(matrix: np.ndarray, size: int, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every live row with every query, (size x num_queries)."""
+        if matrix.dtype == np.float32:
+            return matrix[:size] @ queries.T
+        # Cast reduced-precision rows block by block to keep the float32 copy small
+        return np.concatenate([np.asarray(matrix[start:min(start + BLOCK_ROWS, size)], dtype=np.float32) @ queries.T
+                               for start in range(0, size, BLOCK_ROWS)])
+
+    def _approx_scores(self, collection: _Collection, size: int, queries: np.ndarray) -> np.ndarray:
+        """First-pass scores from the quantized codes (higher is better), (size x num_queries)."""
+        blocks = []
+        if self.quantization == "binary":
+            dim = queries.shape[1]
+            for start in range(0, size, BLOCK_ROWS):
+                # Asymmetric: the float query against the {0, 1} sign bits; q . (2b - 1) ranks like q . b
+                bits = np.unpackbits(collection.codes[start:min(start + BLOCK_ROWS, size)], axis=1, count=dim)
+                blocks.append(bits.astype(np.float32) @ queries.T)
+        else:
+            for start in range(0, size, BLOCK_ROWS):
+                end = min(start + BLOCK_ROWS, size)
+                codes = collection.codes[start:end].astype(np.float32)
+                blocks.append((codes @ queries.T) * collection.scales[start:end, None])
+        return np.concatenate(blocks)
+
+    def query(self, query_embeddings: list, n_results: int = 5, collection_name: str = "vehicle_manuals") -> dict:
+        """
+        Exact top-k search for a batch of query embeddings.
+        With quantization enabled, a quantized first pass picks `n_results * rescore_multiplier`
+        candidates per query which are then rescored at full precision.
+        Args:
+            query_embeddings: List of embedding vectors.
+            n_results: Number of results per query.
+        Returns:
+            Chroma-shaped results with 'ids', 'documents', 'metadatas' and 'distances'.
+        """
+        collection = self._get(collection_name)
+        # Snapshot the live row count. Rows below it are read without the lock: new rows are published
+        # only after they are written, and deletes and changed embeddings swap in a fresh collection
+        # (see upsert_documents), so a row's vector and codes never change under a query.
+        size = collection.size
+        matrix = collection.matrix
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        queries = self._normalize(query_embeddings)
+        k = min(n_results, size)
+        if k == 0:
+            for _ in range(len(queries)):
+                for key in results:
+                    results[key].append([])
+            return results
+
+        if self.quantization == "none" or collection.codes is None:
+            # (size x dim) @ (dim x num_queries) -> cosine similarity per row and query
+            top, top_scores = self._top_k(self._exact_scores(matrix, size, queries), k)
+        else:
+            shortlist, _ = self._top_k(self._approx_scores(collection, size, queries),
+                                       min(size, k * self.rescore_multiplier))
+            top = np.empty((k, len(queries)), dtype=np.int64)
+            top_scores = np.empty((k, len(queries)), dtype=np.float32)
+            for j in range(len(queries)):
+                # Sorted rows read the memory-mapped matrix in file order
+                rows = np.sort(shortlist[:, j])
+                exact = np.asarray(matrix[rows], dtype=np.float32) @ queries[j]
+                best, best_scores = self._top_k(exact[:, None], k)
+                top[:, j] = rows[best[:, 0]]
+                top_scores[:, j] = best_scores[:, 0]
+
+        for j in range(queries.shape[0]):
+            rows = top[:, j].tolist()
+            results["ids"].append([collection.ids[row] for row in rows])
+            results["documents"].append([collection.documents[row] for row in rows])
+            results["metadatas"].append([collection.metadatas[row] for row in rows])
+            results["distances"].append((2.0 - 2.0 * top_scores[:, j]).tolist())
+        return results
+
+    def index_stats(self, collection_name: str = "vehicle_manuals") -> dict:
+        """Returns the row count and bytes used by the first-pass index (RAM) and the rescoring matrix (disk)."""
+        collection = self._get(collection_name)
+        size = collection.size
+        dim = collection.matrix.shape[1] if collection.matrix.ndim == 2 else 0
+        matrix_bytes = size * dim * self.dtype.itemsize
+        if collection.codes is None:
+            first_pass_bytes = matrix_bytes
+        else:
+            first_pass_bytes = size * collection.codes.shape[1] * collection.codes.itemsize
+            if collection.scales is not None:
+                first_pass_bytes += size * collection.scales.itemsize
+        return {"vectors": size, "dim": dim, "quantization": self.quantization,
+                "first_pass_bytes": first_pass_bytes, "rescore_bytes": matrix_bytes if collection.codes is not None else 0}
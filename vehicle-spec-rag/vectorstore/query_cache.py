@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with single-flight computation:
+    concurrent requests for the same normalized query share one in-flight
+    encode instead of each running the model.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case-folds and collapses whitespace so trivially different queries share an entry."""
+        return " ".join(query.split()).casefold()
+
+    def get_or_compute(self, query: str, compute):
+        """
+        Returns the cached value for the query, computing it with `compute(query)` on a miss.
+        Values are shared between callers and must not be mutated.
+        """
+        key = self.normalize(query)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute(query)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def get_many(self, queries: list[str]) -> list:
+        """Returns the cached value for each query, or None where it is not cached."""
+        values = []
+        with self._lock:
+            for query in queries:
+                key = self.normalize(query)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    values.append(self._entries[key])
+                else:
+                    self.misses += 1
+                    values.append(None)
+        return values
+
+    def put_many(self, queries: list[str], values: list):
+        """Stores values computed outside `get_or_compute` (e.g. one batched encode)."""
+        with self._lock:
+            for query, value in zip(queries, values):
+                key = self.normalize(query)
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / total, 4) if total else None
+        }
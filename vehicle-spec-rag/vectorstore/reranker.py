@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+class RerankerService:
+    """
+    Reorders retrieved chunks with a small cross-encoder that scores each
+    (query, chunk) pair jointly, which ranks far better than embedding distance.
+
+    Scoring runs on a worker thread under a hard per-request time budget. If the
+    budget runs out, the chunks are returned in their original vector order.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", device: str = "cpu",
+                 batch_size: int = 16, budget_ms: float = 250.0, max_workers: int = 2):
+        from sentence_transformers import CrossEncoder
+
+        print(f"[INFO] Initializing RerankerService with model: {model_name} on device: {device}")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device=device)
+        self.batch_size = batch_size
+        self.budget = budget_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reranker")
+        self.reranked = 0
+        self.fallbacks = 0
+        self.total_ms = 0.0
+
+    def _score(self, query: str, texts: list[str], deadline: float) -> list[float] | None:
+        """Scores texts in small batches; gives up between batches once the deadline passed."""
+        scores = []
+        for start in range(0, len(texts), self.batch_size):
+            if time.perf_counter() > deadline:
+                return None
+            pairs = [(query, text) for text in texts[start:start + self.batch_size]]
+            scores.extend(float(score) for score in self.model.predict(pairs, batch_size=self.batch_size,
+                                                                       show_progress_bar=False))
+        return scores
+
+    def rerank(self, query: str, items: list[dict], top_n: int) -> tuple[list[dict], dict]:
+        """
+        Keeps the top_n chunks by cross-encoder score.
+        Args:
+            query: The user query string.
+            items: Retrieved chunks (dicts with 'sentence_chunk') in vector order.
+            top_n: Number of chunks to keep.
+        Returns:
+            (chunks, info) where info has 'applied' (False on timeout or error, in
+            which case the first top_n chunks in vector order are returned) and 'ms'.
+        """
+        if not items:
+            return [], {"applied": False, "ms": 0.0}
+
+        start = time.perf_counter()
+        deadline = start + self.budget
+        future = self._executor.submit(self._score, query, [item["sentence_chunk"] for item in items], deadline)
+        try:
+            scores = future.result(timeout=self.budget)
+        except FutureTimeoutError:
+            # The worker stops at its next batch boundary; don't wait for it
+            scores = None
+        except Exception as e:
+            print(f"[ERROR] Reranking failed: {e}")
+            scores = None
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+        if scores is None:
+            self.fallbacks += 1
+            print(f"[INFO] Reranking did not finish within {self.budget * 1000:.0f} ms; using vector order.")
+            return items[:top_n], {"applied": False, "ms": round(elapsed_ms, 2)}
+
+        self.reranked += 1
+        self.total_ms += elapsed_ms
+        order = sorted(range(len(items)), key=lambda i: scores[i], reverse=True)[:top_n]
+        ranked = [{**items[i], "rerank_score": scores[i]} for i in order]
+        return ranked, {"applied": True, "ms": round(elapsed_ms, 2)}
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "budget_ms": self.budget * 1000.0,
+            "reranked": self.reranked,
+            "fallbacks": self.fallbacks,
+            "avg_ms": round(self.total_ms / self.reranked, 2) if self.reranked else None
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
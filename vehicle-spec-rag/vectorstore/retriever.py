@@ -1,18 +1,87 @@
 import os
 import sys
+from contextlib import contextmanager
 
 # Ensure we can import modules from project root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from vectorstore.chroma_db import ChromaDBService
+from vectorstore.base import VectorStore
 from vectorstore.embeddings import EmbeddingService
+from vectorstore.query_cache import QueryEmbeddingCache
+from vectorstore.micro_batcher import MicroBatcher
+from vectorstore.bm25_index import BM25Index
+from vectorstore.aliases import CollectionAliases
+from services.metrics import span
 
 class Retriever:
     """Service for retrieving documents relevant to a query."""
 
-    def __init__(self, chroma_service: ChromaDBService, embedding_service: EmbeddingService):
-        self.chroma_service = chroma_service
+    def __init__(self, vector_store: VectorStore, embedding_service: EmbeddingService,
+                 query_cache_size: int = 1024, batcher: MicroBatcher = None,
+                 lexical_index: BM25Index = None, mode: str = "hybrid", rrf_k: int = 60, candidates: int = 20,
+                 aliases: CollectionAliases = None):
+        self.vector_store = vector_store
+        # Optional alias map: collection names are resolved to the version currently being served
+        self.aliases = aliases
         self.embedding_service = embedding_service
+        self.query_cache = QueryEmbeddingCache(maxsize=query_cache_size)
+        # Optional micro-batcher that merges concurrent query encodes into one model call
+        self.batcher = batcher
+        # Hybrid mode fuses the dense ranking with BM25 via reciprocal rank fusion;
+        # without a lexical index it behaves like 'dense'
+        if mode not in ("hybrid", "dense"):
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        self.lexical_index = lexical_index
+        self.mode = mode
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+
+    @contextmanager
+    def collection(self, collection_name: str):
+        """
+        Yields the physical collection behind a name and keeps that version
+        alive until the block exits, so a rebuild swapping the alias mid-query
+        cannot drop it. Without aliases the name is used as is.
+        """
+        if self.aliases is None:
+            yield collection_name
+            return
+        with self.aliases.acquire(collection_name) as physical:
+            yield physical
+
+    def _encode_query(self, query: str):
+        # Only cache misses reach here; with micro-batching this includes the wait for the batch
+        with span("query_embed"):
+            if self.batcher:
+                embedding = self.batcher.encode(query)
+            else:
+                embedding = self.embedding_service.model.encode(query, convert_to_tensor=False)
+        # Cached arrays are shared between requests
+        embedding.flags.writeable = False
+        return embedding
+
+    def embed_query(self, query: str):
+        """
+        Returns the embedding for a query string (numpy array), served from the
+        LRU cache when the normalized query was seen before.
+        """
+        return self.query_cache.get_or_compute(query, self._encode_query)
+
+    def embed_queries(self, queries: list[str]) -> list:
+        """
+        Returns embeddings for many queries, encoding all cache misses in a single model call.
+        """
+        embeddings = self.query_cache.get_many(queries)
+        misses = list(dict.fromkeys(q for q, emb in zip(queries, embeddings) if emb is None))
+        if misses:
+            with span("query_embed"):
+                encoded = list(self.embedding_service.encode_queries(misses))
+            for embedding in encoded:
+                embedding.flags.writeable = False
+            self.query_cache.put_many(misses, encoded)
+            by_query = dict(zip(misses, encoded))
+            embeddings = [emb if emb is not None else by_query[q] for q, emb in zip(queries, embeddings)]
+        return embeddings
 
     def retrieve(self, query: str, k: int = 5, collection_name: str = "vehicle_manuals") -> list[str]:
         """
@@ -26,12 +95,122 @@ class Retriever:
         """
         print(f"[INFO] Retrieving top {k} documents for query: '{query}'")
         
-        # 1. Generate embedding for the query
-        # user model.encode returns a numpy array or tensor, we need to make sure it's a list for Chroma
-        query_embedding = self.embedding_service.model.encode(query, convert_to_tensor=False).tolist()
+        # 1. Generate (or reuse) the embedding for the query
+        # model.encode returns a numpy array, we need to make sure it's a list for the vector store
+        query_embedding = self.embed_query(query).tolist()
+
+        # 2. Retrieve based on embedding (and keywords in hybrid mode)
+        return [item["sentence_chunk"] for item in self.search(query, query_embedding, k, collection_name)]
+
+    def search(self, query: str, query_embedding: list, k: int = 5, collection_name: str = "vehicle_manuals") -> list[dict]:
+        """
+        Retrieves top k chunks for a query using the configured retrieval mode.
+
+        In hybrid mode the top `candidates` dense hits and the top `candidates`
+        BM25 hits are merged with reciprocal rank fusion: each chunk scores
+        sum(1 / (rrf_k + rank)) over the rankings it appears in. This lets exact
+        part numbers, torque values and acronyms that embed poorly still surface.
+        Args:
+            query: The user query string (used for keyword matching).
+            query_embedding: The query embedding vector (list).
+            k: Number of documents to retrieve.
+            collection_name: Target collection.
+        Returns:
+            Same dicts as `search_by_embedding`, plus an 'rrf_score' in hybrid mode.
+            'distance' is None for chunks found by keywords only.
+        """
+        return self.search_many([query], [query_embedding], k, collection_name)[0]
+
+    def search_many(self, queries: list[str], query_embeddings: list, k: int = 5,
+                    collection_name: str = "vehicle_manuals") -> list[list[dict]]:
+        """
+        Like `search` for a batch of queries, with one multi-vector vector store query.
+        Returns:
+            One list of chunk dicts per query, in input order.
+        """
+        # Dense, lexical and hydration lookups all read the same version
+        with self.collection(collection_name) as physical:
+            if self.mode == "dense" or self.lexical_index is None:
+                return self._dense_search(query_embeddings, k, physical)
+
+            depth = max(self.candidates, k)
+            return [self._fuse(query, dense, k, physical)
+                    for query, dense in zip(queries, self._dense_search(query_embeddings, depth, physical))]
+
+    def _fuse(self, query: str, dense: list[dict], k: int, collection_name: str) -> list[dict]:
+        """Merges a dense ranking with the BM25 ranking for the query using reciprocal rank fusion."""
+        with span("lexical_search"):
+            lexical = self.lexical_index.search(query, max(self.candidates, k), collection_name)
+
+        scores: dict[str, float] = {}
+        for rank, item in enumerate(dense, start=1):
+            scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (self.rrf_k + rank)
+        for rank, (chunk_id, _) in enumerate(lexical, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank)
+        top_ids = sorted(scores, key=scores.get, reverse=True)[:k]
 
-        # 2. Retrieve based on embedding
-        return self.retrieve_by_embedding(query_embedding, k, collection_name)
+        # Keyword-only hits are not in the dense results; fetch their text and metadata
+        items = {item["id"]: item for item in dense}
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in items]
+        if missing:
+            with span("hydrate"):
+                stored = self.vector_store.get_documents(ids=missing, collection_name=collection_name)
+            for chunk_id, doc, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                meta = meta or {}
+                items[chunk_id] = {"id": chunk_id, "sentence_chunk": doc, "pdf_file": meta.get("pdf_file"),
+                                   "page_number": meta.get("page_number"), "distance": None}
+
+        results = []
+        for chunk_id in top_ids:
+            # A chunk can be missing if it was deleted between the two lookups
+            if chunk_id in items:
+                results.append({**items[chunk_id], "rrf_score": scores[chunk_id]})
+        return results
+
+    def _dense_search(self, query_embeddings: list, k: int, collection_name: str) -> list[list[dict]]:
+        """Runs one vector store query for all embeddings and unpacks the per-query results."""
+        with span("vector_search"):
+            results = self.vector_store.query(query_embeddings=query_embeddings, n_results=k,
+                                              collection_name=collection_name)
+
+        # results['documents'] etc. are lists of lists (one list per query)
+        results = results or {}
+        all_documents = results.get('documents') or []
+        all_metadatas = results.get('metadatas') or []
+        all_distances = results.get('distances') or []
+        batches = []
+        for j in range(len(query_embeddings)):
+            if j >= len(all_documents):
+                batches.append([])
+                continue
+            items = []
+            metadatas = (all_metadatas[j] if j < len(all_metadatas) else None) or []
+            distances = (all_distances[j] if j < len(all_distances) else None) or []
+            for i, doc in enumerate(all_documents[j] or []):
+                meta = metadatas[i] if i < len(metadatas) and metadatas[i] else {}
+                items.append({
+                    "id": results['ids'][j][i],
+                    "sentence_chunk": doc,
+                    "pdf_file": meta.get("pdf_file"),
+                    "page_number": meta.get("page_number"),
+                    "distance": distances[i] if i < len(distances) else None
+                })
+            batches.append(items)
+        return batches
+
+    def search_by_embedding(self, query_embedding: list, k: int = 5, collection_name: str = "vehicle_manuals") -> list[dict]:
+        """
+        Retrieves top k chunks with their metadata based on a pre-computed embedding.
+        Args:
+            query_embedding: The query embedding vector (list).
+            k: Number of documents to retrieve.
+            collection_name: Target collection.
+        Returns:
+            List of dicts with 'id', 'sentence_chunk', 'pdf_file', 'page_number' and 'distance'.
+        """
+        # Wrap in list because query expects a list of embeddings
+        with self.collection(collection_name) as physical:
+            return self._dense_search([query_embedding], k, physical)[0]
 
     def retrieve_by_embedding(self, query_embedding: list, k: int = 5, collection_name: str = "vehicle_manuals") -> list[str]:
         """
@@ -43,16 +222,11 @@ class Retriever:
         Returns:
             List of document texts.
         """
-        # Wrap in list because query expects a list of embeddings
-        results = self.chroma_service.query(query_embeddings=[query_embedding], n_results=k, collection_name=collection_name)
-        
-        # Extract documents from results
-        # results['documents'] is a list of lists (one list per query)
-        if results and results['documents']:
-            return results['documents'][0]
-        return []
+        return [item["sentence_chunk"] for item in self.search_by_embedding(query_embedding, k, collection_name)]
 
 if __name__ == "__main__":
+    from vectorstore.chroma_db import ChromaDBService
+
     # Setup paths
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     chroma_path = os.path.join(base_dir, "data", "chroma_store")
@@ -63,7 +237,7 @@ if __name__ == "__main__":
         chroma = ChromaDBService(persist_directory=chroma_path)
         
         # Initialize Retriever
-        retriever = Retriever(chroma_service=chroma, embedding_service=embedder)
+        retriever = Retriever(vector_store=chroma, embedding_service=embedder)
         
         # Test Query
         query = "How do I inspect the suspension system?"
@@ -0,0 +1,258 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ensure we can import modules from project root when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vectorstore.base import VectorStore
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.parquet"
+# Rows fetched from / written to a store per call
+BATCH_SIZE = 5000
+
+def _sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_records(path: str, ids: list, documents: list, metadatas: list):
+    """Writes ids, documents and one column per metadata key as a Parquet table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    keys = sorted({key for meta in metadatas for key in meta})
+    columns = {"id": ids, "document": documents}
+    for key in keys:
+        columns[f"meta.{key}"] = [meta.get(key) for meta in metadatas]
+    pq.write_table(pa.table(columns), path)
+
+def _finish(directory: str, collection_name: str, count: int, dim: int, model_name: str = None) -> dict:
+    """Writes the manifest last, so a snapshot without one is known to be incomplete."""
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "count": count,
+        "dim": dim,
+        "dtype": "float32",
+        "model_name": model_name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {name: {"bytes": os.path.getsize(os.path.join(directory, name)),
+                         "sha256": _sha256(os.path.join(directory, name))}
+                  for name in (EMBEDDINGS_FILE, RECORDS_FILE)}
+    }
+    with open(os.path.join(directory, MANIFEST_FILE + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(directory, MANIFEST_FILE + ".tmp"), os.path.join(directory, MANIFEST_FILE))
+    print(f"[INFO] Wrote snapshot of {count} vectors ({dim} dims) to {directory}")
+    return manifest
+
+def write_snapshot(chunks: list[dict], directory: str, collection_name: str = "vehicle_manuals",
+                   model_name: str = None) -> dict:
+    """
+    Saves embedded chunks as a snapshot: a float32 `.npy` matrix, a Parquet
+    table of ids, texts and metadata, and a manifest.
+    Args:
+        chunks: Dicts with 'sentence_chunk', 'embedding' and any other fields (kept as metadata).
+        directory: Output directory (created if needed).
+        collection_name: Collection name recorded in the manifest.
+        model_name: Embedding model recorded in the manifest.
+    Returns:
+        The manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        os.remove(os.path.join(directory, MANIFEST_FILE))
+    matrix = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+    np.save(os.path.join(directory, EMBEDDINGS_FILE), matrix)
+
+    ids = [chunk.get("id") or VectorStore.make_chunk_id(chunk.get("pdf_file", "unknown"), chunk.get("page_number", 0),
+                                                         chunk["sentence_chunk"]) for chunk in chunks]
+    metadatas = [{key: value for key, value in chunk.items() if key not in ("id", "sentence_chunk", "embedding")}
+                 for chunk in chunks]
+    _write_records(os.path.join(directory, RECORDS_FILE), ids, [chunk["sentence_chunk"] for chunk in chunks],
+                   metadatas)
+    return _finish(directory, collection_name, len(chunks), matrix.shape[1] if matrix.ndim == 2 else 0, model_name)
+
+def export_collection(vector_store: VectorStore, directory: str, collection_name: str = "vehicle_manuals",
+                      model_name: str = None, batch_size: int = BATCH_SIZE, alias: str = None) -> dict:
+    """
+    Exports a collection to a snapshot, streaming the embeddings into the
+    `.npy` file batch by batch. `alias` is the logical name recorded in the
+    manifest when `collection_name` is a versioned physical collection.
+    Returns:
+        The manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        os.remove(os.path.join(directory, MANIFEST_FILE))
+    all_ids = vector_store.get_documents(collection_name=collection_name)["ids"]
+    print(f"[INFO] Exporting {len(all_ids)} vectors from collection: {collection_name}")
+
+    matrix, ids, documents, metadatas = None, [], [], []
+    for start in range(0, len(all_ids), batch_size):
+        batch = vector_store.get_documents(all_ids[start:start + batch_size], collection_name,
+                                           include_embeddings=True)
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(os.path.join(directory, EMBEDDINGS_FILE), mode="w+",
+                                               dtype=np.float32, shape=(len(all_ids), batch["embeddings"].shape[1]))
+        # Rows follow the order the store returned them in, which may differ from the requested IDs
+        matrix[len(ids):len(ids) + len(batch["ids"])] = batch["embeddings"]
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"])
+    if matrix is None:
+        np.save(os.path.join(directory, EMBEDDINGS_FILE), np.zeros((0, 0), dtype=np.float32))
+        dim = 0
+    else:
+        matrix.flush()
+        dim = matrix.shape[1]
+        del matrix
+
+    _write_records(os.path.join(directory, RECORDS_FILE), ids, documents, metadatas)
+    return _finish(directory, alias or collection_name, len(ids), dim, model_name)
+
+class Snapshot:
+    """
+    A snapshot opened for reading. The embedding matrix is memory-mapped and
+    the Parquet table is read through a memory map, so opening costs almost
+    nothing until rows are used.
+    """
+
+    def __init__(self, directory: str, verify: bool = False):
+        import pyarrow.parquet as pq
+
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No snapshot manifest in {directory} (missing or incomplete export).")
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {self.manifest.get('format_version')}")
+        if verify:
+            for name, expected in self.manifest["files"].items():
+                if _sha256(os.path.join(directory, name)) != expected["sha256"]:
+                    raise ValueError(f"Snapshot file {name} does not match its manifest checksum.")
+
+        self.directory = directory
+        self.embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        self.records = pq.read_table(os.path.join(directory, RECORDS_FILE), memory_map=True)
+        if len(self.embeddings) != self.records.num_rows or len(self.embeddings) != self.manifest["count"]:
+            raise ValueError(f"Snapshot in {directory} is inconsistent: {len(self.embeddings)} vectors, "
+                             f"{self.records.num_rows} records, manifest count {self.manifest['count']}.")
+
+    def __len__(self) -> int:
+        return self.records.num_rows
+
+    @property
+    def collection_name(self) -> str:
+        return self.manifest["collection"]
+
+    def _meta_columns(self) -> list[str]:
+        return [name for name in self.records.column_names if name.startswith("meta.")]
+
+    def read(self, start: int = 0, stop: int = None) -> tuple[list, list, list]:
+        """Returns (ids, documents, metadatas) for a row range."""
+        table = self.records.slice(start, (stop if stop is not None else len(self)) - start)
+        ids = table.column("id").to_pylist()
+        documents = table.column("document").to_pylist()
+        columns = {name[len("meta."):]: table.column(name).to_pylist() for name in self._meta_columns()}
+        metadatas = [{key: values[i] for key, values in columns.items() if values[i] is not None}
+                     for i in range(len(ids))]
+        return ids, documents, metadatas
+
+    def iter_chunks(self, batch_size: int = BATCH_SIZE):
+        """Yields lists of chunk dicts ('id', 'sentence_chunk', 'embedding' row view, metadata fields)."""
+        for start in range(0, len(self), batch_size):
+            ids, documents, metadatas = self.read(start, start + batch_size)
+            embeddings = self.embeddings[start:start + batch_size]
+            yield [{**meta, "id": chunk_id, "sentence_chunk": document, "embedding": embedding}
+                   for chunk_id, document, meta, embedding in zip(ids, documents, metadatas, embeddings)]
+
+def import_snapshot(snapshot: Snapshot, vector_store: VectorStore, collection_name: str = None,
+                    batch_size: int = BATCH_SIZE):
+    """
+    Replaces a collection with the contents of a snapshot.
+    The NumPy backend takes the whole matrix at once; other backends are
+    filled with batched upserts.
+    """
+    from vectorstore.numpy_store import NumpyVectorStore
+
+    collection_name = collection_name or snapshot.collection_name
+    start = time.perf_counter()
+    if isinstance(vector_store, NumpyVectorStore):
+        ids, documents, metadatas = snapshot.read()
+        vector_store.replace_collection(snapshot.embeddings, ids, documents, metadatas, collection_name)
+    else:
+        vector_store.reset_collection(collection_name)
+        for chunks in snapshot.iter_chunks(batch_size):
+            vector_store.upsert_documents(chunks, collection_name)
+    vector_store.flush(collection_name)
+    print(f"[INFO] Imported {len(snapshot)} vectors into '{collection_name}' in {time.perf_counter() - start:.2f}s")
+
+def _open_store(backend: str, path: str = None) -> VectorStore:
+    from config import settings
+    from vectorstore.base import create_vector_store
+
+    if backend == "numpy":
+        return create_vector_store("numpy", path or settings.NUMPY_STORE_PATH,
+                                   quantization=settings.VECTOR_QUANTIZATION,
+                                   rescore_multiplier=settings.VECTOR_RESCORE_MULTIPLIER,
+                                   rescore_dtype=settings.VECTOR_RESCORE_DTYPE)
+    return create_vector_store(backend, path or settings.CHROMA_DB_PATH)
+
+def _rebuild_indexes(vector_store: VectorStore, collection_name: str):
+    """Rebuilds the BM25 and spec indexes the API uses, so they match the imported chunks."""
+    from config import settings
+
+    if settings.RETRIEVAL_MODE == "hybrid":
+        from vectorstore.bm25_index import BM25Index
+        BM25Index(settings.LEXICAL_INDEX_PATH).rebuild_from(vector_store, collection_name)
+    if settings.SPEC_INDEX_ENABLED:
+        from pdf_processing.spec_extractor import SpecExtractor
+        from vectorstore.spec_index import SpecIndex
+        SpecIndex(settings.SPEC_INDEX_PATH, min_confidence=settings.SPEC_INDEX_MIN_CONFIDENCE).rebuild_from(
+            vector_store, SpecExtractor(), collection_name)
+
+if __name__ == "__main__":
+    from config import settings
+    from vectorstore.aliases import CollectionAliases
+
+    parser = argparse.ArgumentParser(description="Export a collection to a binary snapshot or import one.")
+    parser.add_argument("command", choices=["export", "import", "info"])
+    parser.add_argument("directory", help="Snapshot directory.")
+    parser.add_argument("--backend", default=settings.VECTOR_STORE_BACKEND, choices=["chroma", "numpy"])
+    parser.add_argument("--store-path", default=None, help="Vector store directory (default: from settings).")
+    parser.add_argument("--collection", default=None, help="Collection (default: vehicle_manuals / the snapshot's).")
+    parser.add_argument("--model-name", default=None, help="Embedding model to record in the manifest on export.")
+    parser.add_argument("--skip-indexes", action="store_true", help="Do not rebuild the BM25 and spec indexes.")
+    parser.add_argument("--verify", action="store_true", help="Check file checksums before importing.")
+    args = parser.parse_args()
+
+    aliases = CollectionAliases(settings.COLLECTION_ALIASES_PATH)
+    if args.command == "export":
+        store = _open_store(args.backend, args.store_path)
+        collection = args.collection or "vehicle_manuals"
+        export_collection(store, args.directory, aliases.resolve(collection), args.model_name, alias=collection)
+    elif args.command == "info":
+        snapshot = Snapshot(args.directory, verify=args.verify)
+        print(json.dumps(snapshot.manifest, indent=2))
+    else:
+        snapshot = Snapshot(args.directory, verify=args.verify)
+        collection = args.collection or snapshot.collection_name
+        store = _open_store(args.backend, args.store_path)
+        # Import into a new version and swap the alias, so a running API keeps serving the old one
+        shadow = aliases.new_version(collection)
+        import_snapshot(snapshot, store, shadow)
+        if not args.skip_indexes:
+            _rebuild_indexes(store, shadow)
+        aliases.swap(collection, shadow)
@@ -0,0 +1,204 @@
+import json
+import os
+import re
+import threading
+
+# Query words that say what kind of spec is wanted
+SPEC_TYPE_KEYWORDS = {
+    "Torque": {"torque", "tighten", "tightening", "nm", "lb-ft", "ft-lb"},
+    "Capacity": {"capacity", "capacities", "fill", "volume", "quantity", "liters", "litres", "quarts"},
+    "Pressure": {"pressure", "inflation", "kpa", "psi"},
+    "Dimension": {"clearance", "gap", "thickness", "runout", "diameter", "length", "width", "mm"},
+}
+METRIC_UNITS = {"Nm", "L", "mL", "kPa", "bar", "mm"}
+_SPEC_WORDS = set().union(*SPEC_TYPE_KEYWORDS.values())
+_STOP_WORDS = {"a", "an", "the", "for", "of", "on", "in", "to", "and", "or", "what", "whats", "is", "are",
+               "spec", "specs", "specification", "specifications", "value", "values", "please", "tell", "me",
+               "how", "much", "give", "find", "required", "correct", "recommended", "with"}
+
+def _stem(word: str) -> str:
+    """Crude singularization so 'nuts' matches 'nut' and 'bolts' matches 'bolt'."""
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def component_terms(text: str) -> frozenset:
+    """Content words of a component name or query, lowercased and singularized."""
+    words = re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.lower())
+    return frozenset(_stem(word) for word in words if word not in _STOP_WORDS and word not in _SPEC_WORDS)
+
+class _SpecCollection:
+    """Spec records of one collection, grouped by manual, with an inverted index over component terms."""
+
+    def __init__(self):
+        self.by_file: dict[str, list[dict]] = {}
+        self.records: list[dict] = []
+        self.terms: list[frozenset] = []
+        self.postings: dict[str, list[int]] = {}
+        self.dirty = False
+
+    def rebuild(self):
+        self.records = [spec for specs in self.by_file.values() for spec in specs]
+        self.terms = [component_terms(spec["component"]) for spec in self.records]
+        self.postings = {}
+        for i, terms in enumerate(self.terms):
+            for term in terms:
+                self.postings.setdefault(term, []).append(i)
+
+class SpecIndex:
+    """
+    Structured (component, spec_type, value, unit) index built at ingestion time.
+
+    High-confidence lookups answer a query without embeddings or an LLM call.
+    A lookup is confident when one component's terms match the query's terms
+    (ignoring stop words and spec-type words) with at least `min_confidence`
+    overlap, the match rests on at least `min_shared_terms` terms (a vague
+    "bolt torque" is left to retrieval) and all matching records agree on one
+    value per spec type.
+    Persisted as `<persist_directory>/<collection>.json`.
+    """
+
+    def __init__(self, persist_directory: str, min_confidence: float = 0.85, min_shared_terms: int = 2):
+        self.persist_directory = persist_directory
+        self.min_confidence = min_confidence
+        self.min_shared_terms = min_shared_terms
+        self._collections: dict[str, _SpecCollection] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.persist_directory, exist_ok=True)
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.persist_directory, f"{collection_name}.json")
+
+    def exists(self, collection_name: str = "vehicle_manuals") -> bool:
+        return collection_name in self._collections or os.path.exists(self._path(collection_name))
+
+    def _get(self, collection_name: str) -> _SpecCollection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection = _SpecCollection()
+                path = self._path(collection_name)
+                if os.path.exists(path):
+                    with open(path) as f:
+                        collection.by_file = json.load(f)
+                    collection.rebuild()
+                    print(f"[INFO] Loaded spec index for '{collection_name}' ({len(collection.records)} specs).")
+                self._collections[collection_name] = collection
+            return collection
+
+    def replace_file(self, pdf_file: str, specs: list[dict], collection_name: str = "vehicle_manuals"):
+        """Replaces every spec of a manual with the given ones."""
+        # Keep one record per (component, spec type, value, unit) and page
+        unique = list({(s["component"], s["spec_type"], s["value"], s["unit"], s["page_number"]): s
+                       for s in specs}.values())
+        with self._lock:
+            collection = self._get(collection_name)
+            collection.by_file[pdf_file] = unique
+            collection.rebuild()
+            collection.dirty = True
+        print(f"[INFO] Spec index: {len(unique)} specs for '{pdf_file}'.")
+
+    def reset(self, collection_name: str = "vehicle_manuals"):
+        with self._lock:
+            collection = _SpecCollection()
+            collection.dirty = True
+            self._collections[collection_name] = collection
+
+    def drop(self, collection_name: str):
+        """Forgets the collection's index and deletes its file."""
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            if os.path.exists(self._path(collection_name)):
+                os.remove(self._path(collection_name))
+
+    def count(self, collection_name: str = "vehicle_manuals") -> int:
+        return len(self._get(collection_name).records)
+
+    def flush(self, collection_name: str = "vehicle_manuals"):
+        """Persists the collection's specs if they changed."""
+        with self._lock:
+            collection = self._get(collection_name)
+            if not collection.dirty:
+                return
+            path = self._path(collection_name)
+            with open(path + ".tmp", "w") as f:
+                json.dump(collection.by_file, f)
+            os.replace(path + ".tmp", path)
+            collection.dirty = False
+
+    @staticmethod
+    def _wanted_spec_types(query: str) -> set:
+        words = set(re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", query.lower()))
+        return {spec_type for spec_type, keywords in SPEC_TYPE_KEYWORDS.items() if words & keywords}
+
+    def lookup(self, query: str, collection_name: str = "vehicle_manuals") -> tuple[list[dict], float]:
+        """
+        Finds the specs a query asks for.
+        Args:
+            query: The user query string.
+            collection_name: Target collection.
+        Returns:
+            (answer, confidence): answer is a list of {component, spec_type, value, unit}
+            dicts (empty if nothing is confident enough) and confidence is the best
+            term overlap found among matches sharing at least `min_shared_terms` terms, between 0 and 1.
+        """
+        query_terms = component_terms(query)
+        if len(query_terms) < self.min_shared_terms:
+            return [], 0.0
+        wanted_types = self._wanted_spec_types(query)
+
+        with self._lock:
+            collection = self._get(collection_name)
+            candidates = {i for term in query_terms for i in collection.postings.get(term, ())}
+            best, best_score = [], 0.0
+            for i in candidates:
+                record = collection.records[i]
+                if wanted_types and record["spec_type"] not in wanted_types:
+                    continue
+                terms = collection.terms[i]
+                shared = len(query_terms & terms)
+                if shared < self.min_shared_terms:
+                    continue
+                score = shared / max(len(query_terms), len(terms))
+                if score > best_score:
+                    best, best_score = [i], score
+                elif score == best_score:
+                    best.append(i)
+            best = [(collection.records[i], collection.terms[i]) for i in best]
+
+        if best_score < self.min_confidence:
+            return [], best_score
+
+        answer = {}
+        for record, terms in best:
+            key = (terms, record["spec_type"], record["unit"])
+            answer.setdefault(key, {k: record[k] for k in ("component", "spec_type", "value", "unit")})
+            if answer[key]["value"] != record["value"]:
+                # Manuals disagree (e.g. different models); let the RAG path sort it out
+                return [], best_score
+
+        # One unit per component and spec type; prefer metric like the prompt examples
+        chosen = {}
+        for (terms, spec_type, _), spec in answer.items():
+            current = chosen.get((terms, spec_type))
+            if current is None or (spec["unit"] in METRIC_UNITS and current["unit"] not in METRIC_UNITS):
+                chosen[(terms, spec_type)] = spec
+        return list(chosen.values()), best_score
+
+    def rebuild_from(self, vector_store, extractor, collection_name: str = "vehicle_manuals"):
+        """Builds the index from the chunk texts already in the vector store (tables are not re-read)."""
+        print(f"[INFO] Building spec index for '{collection_name}' from the vector store...")
+        stored = vector_store.get_documents(collection_name=collection_name)
+        specs_by_file: dict[str, list[dict]] = {}
+        for document, meta in zip(stored["documents"], stored["metadatas"]):
+            meta = meta or {}
+            pdf_file = meta.get("pdf_file", "unknown")
+            specs_by_file.setdefault(pdf_file, []).extend(
+                extractor.extract_from_text(document, pdf_file, meta.get("page_number", 0)))
+        with self._lock:
+            self.reset(collection_name)
+            for pdf_file, specs in specs_by_file.items():
+                self.replace_file(pdf_file, specs, collection_name)
+            self.flush(collection_name)